@@ -14,6 +14,7 @@ randomSeeds = tl.getRandomSeeds( { 	# None means generate a random seed
 pipeline = Pipeline( [
 ('vectorizer', CountVectorizer(
 #('vectorizer', TfidfVectorizer(
+#('vectorizer', skHelper.CountOnceVectorizer( # faster min_df/max_df grids
                 strip_accents=None,	# if done in preprocessing
                 decode_error='strict',	# if handled in preproc
                 lowercase=False,	# if done in preprocessing
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+#
+# Script to take a pickled (trained) Pipeline, compact it, and save the
+#   compacted Pipeline in a new pickle file - smaller and faster to load
+#   for predict.py.
+# Refuses (unless --force) if the vectorizer normalizes (e.g., tfidf w/
+#   norm='l2') since removing features then changes the predictions.
+#
+# Compacting drops the vectorizer's stop_words_ (only kept for information)
+#   and the features whose classifier coefficient magnitude is at or below
+#   a threshold, remapping the vectorizer vocabulary and the classifier coef_.
+#   See MLfeatures.compactPipeline()
+# Optionally, also replaces the vocabulary dict by a CompactVocabulary.
+#
+# Reports the size reduction, and if given a sample file, how often the
+#   compacted model makes the same predictions as the original.
+#
+import sys
+import os.path
+import time
+import pickle
+import argparse
+from miscPyUtils import importPyFile
+import MLfeatures as mlFeatures
+
+DEFAULT_SAMPLE_TYPE  = "BaseSample"
+DEFAULT_SAMPLEDATALIB  = "MLbaseSample"
+#-----------------------------------
+
+def parseCmdLine():
+    parser = argparse.ArgumentParser( \
+        description='compact a trained Pipeline pkl file. Write report to stdout')
+
+    parser.add_argument('pkl_input')
+    parser.add_argument('pkl_output')
+
+    parser.add_argument('--threshold', dest='threshold', type=float,
+        default=0.0,
+        help='remove features whose |coefficient| is <= this. ' +
+        'Default: 0.0 (only features w/ coefficient 0)')
+
+    parser.add_argument('--vectorizer', dest='vectorizerStep',
+        default='vectorizer',
+        help="the vectorizer step of the Pipeline. Default: vectorizer")
+
+    parser.add_argument('--classifier', dest='classifierStep',
+        default='classifier',
+        help="the classifier step of the Pipeline. Default: classifier")
+
+    parser.add_argument('--force', dest='force', action='store_true',
+        default=False,
+        help='compact even if the vectorizer normalizes (e.g., tfidf ' +
+        "norm='l2') so the compacted model's predictions can differ. " +
+        'Default: refuse')
+
+    parser.add_argument('--compactvocab', dest='compactVocab',
+        action='store_true', default=False,
+        help='store the vocabulary as a CompactVocabulary (less memory, ' +
+        'faster loading, somewhat slower vectorizing). Default: keep dict')
+
+    parser.add_argument('-s', '--samples', dest='sampleFile', default=None,
+        help='sample file to compare the original & compacted predictions on')
+
+    parser.add_argument('-p', '--preprocessor', metavar='PREPROCESSOR',
+        dest='preprocessors', action='append', required=False, default=None,
+        help='preprocessor for the samples, multiples are applied in order. ' +
+        'Default is none.' )
+
+    parser.add_argument('--sampledatalib', dest='sampleDataLib',
+        default=DEFAULT_SAMPLEDATALIB,
+        help="Module to import that defines python sample class. " +
+                                        "Default: %s" % DEFAULT_SAMPLEDATALIB)
+
+    parser.add_argument('--sampletype', dest='sampleObjTypeName',
+        default=DEFAULT_SAMPLE_TYPE,
+        help="Sample class name to use if not specified in sample file. " +
+                                        "Default: %s" % DEFAULT_SAMPLE_TYPE)
+
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
+        default=True, help="include helpful messages to stderr, default")
+
+    parser.add_argument('-q', '--quiet', dest='verbose', action='store_false',
+        help="skip helpful messages to stderr")
+
+    return parser.parse_args()
+#----------------------
+
+args = parseCmdLine()
+sampleDataLib = importPyFile(args.sampleDataLib)
+
+#----------------------
+def main():
+#----------------------
+    original, loadTime = loadModel(args.pkl_input)
+
+    docs = None
+    if args.sampleFile:
+        docs = getDocuments(args.sampleFile)
+        verbose("Predicting w/ the original model\n")
+        origPredictions = original.predict(docs)
+
+    verbose("Compacting\n")
+    try:
+        numBefore, numAfter = mlFeatures.compactPipeline(original,
+                                    threshold=args.threshold,
+                                    vectorizerName=args.vectorizerStep,
+                                    classifierName=args.classifierStep,
+                                    force=args.force)
+    except ValueError as e:
+        sys.stderr.write("Cannot compact '%s': %s\n" % (args.pkl_input, e))
+        exit(5)
+    compacted = original        # compacted in place
+    if args.compactVocab:
+        mlFeatures.compactVocabulary( \
+                                compacted.named_steps[args.vectorizerStep])
+
+    with open(args.pkl_output, 'wb') as fp:
+        pickle.dump(compacted, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    verbose("Compacted model written to '%s'\n" % \
+                                            os.path.abspath(args.pkl_output))
+    compacted, newLoadTime = loadModel(args.pkl_output)
+
+    sizeBefore = os.path.getsize(args.pkl_input)
+    sizeAfter  = os.path.getsize(args.pkl_output)
+    output  = "Features:  %d -> %d  (%d removed, |coef| <= %g)\n" % \
+                (numBefore, numAfter, numBefore - numAfter, args.threshold)
+    output += "File size: %d -> %d bytes  (%.1f%% smaller)\n" % \
+                (sizeBefore, sizeAfter, percent(sizeBefore-sizeAfter, sizeBefore))
+    output += "Load time: %.3f -> %.3f seconds\n" % (loadTime, newLoadTime)
+
+    if docs is not None:
+        verbose("Predicting w/ the compacted model\n")
+        newPredictions = compacted.predict(docs)
+        numSame = int((newPredictions == origPredictions).sum())
+        output += "Predictions: %d of %d the same (%.2f%%) on '%s'\n" % \
+                    (numSame, len(docs), percent(numSame, len(docs)),
+                                                            args.sampleFile)
+    sys.stdout.write(output)
+# ---------------------------
+
+def loadModel(fileName):
+    """ Return (the Pipeline from the pkl fileName, seconds to load it) """
+    verbose("Loading model '%s'\n" % fileName)
+    startTime = time.time()
+    with open(fileName, 'rb') as fp:
+        model = pickle.load(fp)
+    loadTime = time.time() - startTime
+    verbose("...done\n")
+    return model, loadTime
+# ---------------------------
+
+def getDocuments(fileName):
+    """ Return the (preprocessed) documents of the samples in fileName """
+    if not hasattr(sampleDataLib, args.sampleObjTypeName):
+        sys.stderr.write("invalid sample class name '%s'\n" \
+                                                    % args.sampleObjTypeName)
+        exit(5)
+    sampleObjType = getattr(sampleDataLib, args.sampleObjTypeName)
+
+    verbose("Reading '%s' ...\n" % fileName)
+    sampleSet = sampleDataLib.SampleSet(sampleObjType).read(fileName)
+    verbose("...done %d total documents.\n" % sampleSet.getNumSamples())
+
+    if args.preprocessors:
+        verbose("Running preprocessors %s\n" % str(args.preprocessors))
+        rejects = sampleSet.preprocess(args.preprocessors)
+        verbose("...done\n")
+    return sampleSet.getDocuments()
+# ---------------------------
+
+def percent(part, whole):
+    if whole == 0: return 0.0
+    return 100.0 * part / whole
+# ---------------------------
+
+def verbose(text):
+    if args.verbose:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+# ---------------------------
+
+if __name__ == "__main__": main()
@@ -16,6 +16,7 @@
 # Author: Jim Kadin
 #
 import sys
+import os.path
 import string
 import pickle
 import argparse
@@ -59,6 +60,19 @@ def parseCmdLine():
     parser.add_argument('--beta', dest='beta', default=2, type=int, 
         help="beta for f-score in performance metrics. Default: 2")
 
+    parser.add_argument('--numjobs', dest='numJobs', type=int, default=None,
+        help='number of processes for StemmingPreprocessor steps in the ' +
+                'model, -1 for all cpus. Default: as the model was trained')
+
+    parser.add_argument('--cachedir', dest='cacheDir', default=None,
+        help='directory to cache vectorized docs in. If the model\'s ' +
+        'vectorizer was already run on the same docs, skip vectorizing. ' +
+        'Default: None')
+
+    parser.add_argument('--stemcache', dest='stemCacheFile', default=None,
+        help='file to load the stemming memo table from (if it exists) ' +
+        'and save it to when done, so later runs start w/ it. Default: None')
+
     parser.add_argument('--fieldsep', dest='outputFieldSep',
         default=DEFAULT_OUTPUT_FIELDSEP,
         help="prediction output field separator. Default: '%s'" \
@@ -97,6 +111,7 @@ def main():
     sampleObjType = getattr(sampleDataLib, args.sampleObjTypeName)
 
     model = getPipeline()
+    loadStemCache()
     sampleSet = getSampleSet(sampleObjType)
 
     if sampleSet.getNumSamples() == 0:
@@ -109,17 +124,36 @@ def main():
         rejects = sampleSet.preprocess(args.preprocessors)
         verbose("...done\n")
 
-    verbose("Predicting\n")
-    y_predicted = model.predict(sampleSet.getDocuments(),)
+    # predictor & docs: the model & the sample docs, or if using the cache,
+    #   the rest of the model after the vectorizer & the vectorized docs
+    predictor = model
+    docs = sampleSet.getDocuments()
+    if args.cacheDir:
+        predictor, docs = vectorizeWithCache(model, docs)
+
+    y_predicted, confidences = getPredictions(predictor, docs, sampleSet)
     classNames = sampleSet.getSampleClassNames()
     predictedClasses = [ classNames[y] for y in y_predicted ]
-    verbose("...done\n")
-
-    confidences = getConfidences(model, sampleSet)
 
     writePredictions(model, sampleSet, predictedClasses, confidences)
 
     writePerformance(sampleSet, y_predicted)
+
+    saveStemCache()
+# ---------------------------
+
+def loadStemCache():
+    if args.stemCacheFile and os.path.exists(args.stemCacheFile):
+        verbose("Loading stem cache '%s'\n" % args.stemCacheFile)
+        skHelper.stemCache.load(args.stemCacheFile)
+# ---------------------------
+
+def saveStemCache():
+    report = trl.getStemCacheReport(skHelper.stemCache, sstart='')
+    if report: verbose(report.strip() + '\n')
+    if args.stemCacheFile:
+        skHelper.stemCache.save(args.stemCacheFile)
+        verbose("Stem cache written to '%s'\n" % args.stemCacheFile)
 # ---------------------------
 
 def writePerformance(sampleSet, y_predicted):
@@ -160,23 +194,42 @@ def writePerformance(sampleSet, y_predicted):
     fp.write(output)
 # ---------------------------
 
-def getConfidences(model, sampleSet):
+def vectorizeWithCache(model, docs):
     """
-    Return list of prediction confidences (floats).
-    One confidence for each sample.
+    Run the model up to its vectorizer on the docs using the vectorized doc
+        cache.
+    Return (the rest of the model, the vectorized docs)
+    """
+    cache = skHelper.VectorizedDocCache(args.cacheDir)
+    front, rest = skHelper.splitPipeline(model)
+
+    verbose("Vectorizing\n")
+    X = cache.transform(front, docs)
+    if cache.getNumHits(): verbose("...using cached vectorized docs\n")
+    verbose("...done\n")
+    return rest, X
+# ---------------------------
+
+def getPredictions(model, docs, sampleSet):
+    """
+    Return (predictions, confidences): predicted y values and prediction
+        confidences (floats). One of each for each sample (doc).
+    The docs are only vectorized once for both.
     """
     if args.noConfidence:
-        return [ 0.0 for x in range(sampleSet.getNumSamples()) ]
-
-    verbose("Getting prediction confidence values\n")
-    confidences = skHelper.getConfidenceValues(model,
-                        sampleSet.getDocuments(),
-                        positiveClass=sampleSet.getY_positive(),)
-    if not confidences:
-        verbose("no confidence values available for this model\n")
+        verbose("Predicting\n")
+    else:
+        verbose("Predicting and getting prediction confidence values\n")
+
+    y_predicted, confidences = skHelper.predictWithConfidences(model, docs,
+                                positiveClass=sampleSet.getY_positive(),
+                                doConfidences=not args.noConfidence)
+    if confidences is None:
+        if not args.noConfidence:
+            verbose("no confidence values available for this model\n")
         confidences = [ 0.0 for x in range(sampleSet.getNumSamples()) ]
     verbose("...done\n")
-    return confidences
+    return y_predicted, confidences
 # ---------------------------
 
 def getSampleSet(sampleObjType):
@@ -209,6 +262,11 @@ def getPipeline():
                 #   need more logic to figure out the name of the "verbose"
                 #   argument.
     model.set_params(classifier__verbose=0)
+
+    if args.numJobs is not None:
+        for name, step in model.steps:
+            if isinstance(step, skHelper.StemmingPreprocessor):
+                step.set_params(n_jobs=args.numJobs)
     verbose("...done\n")
     return model
 # ---------------------------
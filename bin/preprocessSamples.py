@@ -51,6 +51,15 @@ def parseCmdLine():
         help="Sample class name to use if not specified in sample file. " +
                                         "Default: %s" % DEFAULT_SAMPLE_TYPE)
 
+    parser.add_argument('--figwords', dest='figWords', default=None,
+        help="comma separated numWords values. After the preprocessors, " +
+            "apply the figureText preprocessor w/ each numWords, writing " +
+            "one output file per numWords instead of stdout. Default: none")
+
+    parser.add_argument('--outprefix', dest='outPrefix', default='figWords',
+        help="with --figwords, output file name prefix, files are " +
+            "<outprefix><numWords>.txt. Default: figWords")
+
     parser.add_argument('--report', dest='preprocessorReport',
         default=None,
         help="Write a preprocessor report to the specified file. " +
@@ -79,6 +88,12 @@ def main():
     sampleObjType = getattr(sampleDataLib, args.sampleObjTypeName)
 
     verbose("Preprocessing steps: %s\n" % ' '.join(args.preprocessors)) 
+
+    if args.figWords:   # one output file per numWords
+        numWordsList = [ int(x) for x in args.figWords.split(',') ]
+        outFiles = { n : open('%s%d.txt' % (args.outPrefix, n), 'w')
+                                                    for n in numWordsList }
+        verbose("figureText numWords: %s\n" % args.figWords)
     totNumSamples = 0
     totNumRejects = 0
     firstFile = True
@@ -103,7 +118,12 @@ def main():
 
         rejected = sampleSet.preprocess(args.preprocessors)
 
-        sampleSet.write(sys.stdout, writeHeader=firstFile,
+        if args.figWords:
+            for n, ss in sampleSet.figureTextMulti(numWordsList).items():
+                ss.write(outFiles[n], writeHeader=firstFile,
+                            writeMeta=firstFile, omitRejects=args.omitRejects)
+        else:
+            sampleSet.write(sys.stdout, writeHeader=firstFile,
                             writeMeta=firstFile, omitRejects=args.omitRejects)
         firstFile = False
         numSamples = sampleSet.getNumSamples()
@@ -113,6 +133,11 @@ def main():
         verbose('...done. %d samples, %d marked as reject\n' % \
                                                     (numSamples, numRejects))
 
+    if args.figWords:
+        for n, fp in outFiles.items():
+            fp.close()
+            verbose("Wrote '%s'\n" % fp.name)
+
     if args.omitRejects: numWritten = totNumSamples - totNumRejects
     else: numWritten = totNumSamples
 
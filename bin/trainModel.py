@@ -9,17 +9,27 @@
 # If the Pipeline has a method to get features and their weights/coefficients,
 #   also write a top weighted feature report after training.
 #
+# With --stream, the training samples are never all in memory: they are read
+#   from the input files in minibatches and the Pipeline is trained w/
+#   partial_fit() over several epochs (shuffling the input file order each
+#   epoch). This needs a Pipeline w/ a stateless vectorizer (HashingVectorizer)
+#   and a classifier w/ partial_fit() (e.g., SGDClassifier).
+#
 import sys
 import os.path
 import argparse
 import pickle
+import random
 
 from miscPyUtils import importPyFile
 import MLtuningReports as trl
 import MLsklearnHelper as skHelper
+import MLfeatures as mlFeatures
 from sklearn.pipeline import Pipeline
 
 NUM_TOP_FEATURES=50	# number of highly weighted features to report
+STREAM_BATCH_SIZE = 1000	# num of samples per minibatch for --stream
+STREAM_EPOCHS = 5		# num of passes over the input files for --stream
 PIPELINE_FILE = "goodPipelines.py"
 OUTPUT_PICKLE_FILE   = "goodModel.pkl"
 DEFAULT_SAMPLEDATALIB  = "MLbaseSample"
@@ -56,6 +66,34 @@ def parseCmdLine():
         help='num of top weighted features to output. Default: %d' % \
                                                             NUM_TOP_FEATURES)
 
+    parser.add_argument('--cachedir', dest='cacheDir', default=None,
+        help='directory to cache vectorized docs in. If the same vectorizer' +
+        ' was already run on the same docs, skip vectorizing. Default: None')
+
+    parser.add_argument('--stemcache', dest='stemCacheFile', default=None,
+        help='file to load the stemming memo table from (if it exists) ' +
+        'and save it to when done, so later runs start w/ it. Default: None')
+
+    parser.add_argument('--stream', dest='stream', action='store_true',
+        default=False,
+        help='train out-of-core: read samples in minibatches & partial_fit()' +
+        ' the Pipeline. Needs a stateless vectorizer (HashingVectorizer) and' +
+        ' a classifier w/ partial_fit(). Input files cannot be -')
+
+    parser.add_argument('--batchsize', dest='batchSize', type=int,
+        default=STREAM_BATCH_SIZE,
+        help='num of samples per minibatch for --stream. Default: %d' % \
+                                                            STREAM_BATCH_SIZE)
+
+    parser.add_argument('--epochs', dest='epochs', type=int,
+        default=STREAM_EPOCHS,
+        help='num of passes over the input files for --stream. Default: %d' \
+                                                            % STREAM_EPOCHS)
+
+    parser.add_argument('--seed', dest='seed', type=int, default=None,
+        help='random seed for shuffling the minibatches for --stream. ' +
+        'Default: None (random)')
+
     parser.add_argument('--sampledatalib', dest='sampleDataLib',
         default=DEFAULT_SAMPLEDATALIB,
         help="Module to import that defines python sample class. " + 
@@ -89,16 +127,26 @@ def main():
     sampleObjType = getattr(sampleDataLib, args.sampleObjTypeName)
 
     pipeline = getPipeline()
-    trainSet = getTrainingSet(sampleObjType)
+    loadStemCache()
 
-    if args.preprocessors:
-        verbose("Running preprocessors %s\n" % str(args.preprocessors))
-        rejects = trainSet.preprocess(args.preprocessors)
-        verbose("...done\n")
+    if args.stream:
+        verbose("Training on minibatches...\n")
+        pipeline = fitStreaming(pipeline, sampleObjType)
+        verbose("Done\n")
+    else:
+        trainSet = getTrainingSet(sampleObjType)
 
-    verbose("Training...\n")
-    pipeline.fit(trainSet.getDocuments(), trainSet.getKnownYvalues())
-    verbose("Done\n")
+        if args.preprocessors:
+            verbose("Running preprocessors %s\n" % str(args.preprocessors))
+            rejects = trainSet.preprocess(args.preprocessors)
+            verbose("...done\n")
+
+        verbose("Training...\n")
+        if args.cacheDir:
+            pipeline = fitWithCache(pipeline, trainSet)
+        else:
+            pipeline.fit(trainSet.getDocuments(), trainSet.getKnownYvalues())
+        verbose("Done\n")
 
     with open(args.outputPklFile, 'wb') as fp:
         pickle.dump(pipeline, fp)
@@ -107,12 +155,103 @@ def main():
 
     if args.featureFile:
         writeFeaturesFile(pipeline, args.featureFile)
+
+    saveStemCache()
+#-----------------------
+
+def loadStemCache():
+    if args.stemCacheFile and os.path.exists(args.stemCacheFile):
+        verbose("Loading stem cache '%s'\n" % \
+                                        os.path.abspath(args.stemCacheFile))
+        skHelper.stemCache.load(args.stemCacheFile)
+#-----------------------
+
+def saveStemCache():
+    report = trl.getStemCacheReport(skHelper.stemCache, sstart='')
+    if report: verbose(report.strip() + '\n')
+    if args.stemCacheFile:
+        skHelper.stemCache.save(args.stemCacheFile)
+        verbose("Stem cache written to '%s'\n" % \
+                                        os.path.abspath(args.stemCacheFile))
+#-----------------------
+
+def fitWithCache(pipeline, trainSet):
+    """
+    Fit the pipeline up to its vectorizer using the vectorized doc cache,
+        then fit the rest of the pipeline on the vectorized docs.
+    Return the fitted pipeline (pipeline itself w/ its front steps replaced
+        by the cached ones, so its other params are kept).
+    """
+    cache = skHelper.VectorizedDocCache(args.cacheDir)
+    front, rest = skHelper.splitPipeline(pipeline)
+    y = trainSet.getKnownYvalues()
+
+    front, X = cache.fitTransform(front, trainSet.getDocuments(), y)
+    if cache.getNumHits(): verbose("...using cached vectorized docs\n")
+    rest.fit(X, y)
+    pipeline.set_params(**dict(front.steps))
+    return pipeline
+#-----------------------
+
+def fitStreaming(pipeline, sampleObjType):
+    """
+    Train the pipeline w/ partial_fit() on minibatches read from the input
+        files, args.epochs times. Each epoch reads the files in a new random
+        order, and the samples in each minibatch are shuffled.
+    Return the fitted pipeline.
+    """
+    if '-' in args.inputFiles:
+        sys.stderr.write("--stream cannot read samples from stdin\n")
+        exit(5)
+    if args.cacheDir:
+        sys.stderr.write("--cachedir cannot be used with --stream\n")
+        exit(5)
+    try:
+        skHelper.checkPartialFitPipeline(pipeline)
+    except ValueError as e:
+        sys.stderr.write("Cannot train this Pipeline with --stream: %s\n" % e)
+        exit(5)
+
+    random.seed(args.seed)
+    classes = sorted([sampleObjType.getY_negative(),
+                                                sampleObjType.getY_positive()])
+    return skHelper.partialFitPipeline(pipeline,
+                                        getMinibatches(sampleObjType), classes)
+#-----------------------
+
+def getMinibatches(sampleObjType):
+    """
+    Generator: yield (docs, y) minibatches from the input files for all
+        the epochs.
+    """
+    for epoch in range(args.epochs):
+        fileNames = list(args.inputFiles)
+        random.shuffle(fileNames)
+        numSamples = 0
+        for fn in fileNames:
+            sampleSet = sampleDataLib.ClassifiedSampleSet( \
+                                                sampleObjType=sampleObjType)
+            for batch in sampleSet.readBatches(fn, batchSize=args.batchSize):
+                if args.preprocessors:
+                    rejects = batch.preprocess(args.preprocessors)
+
+                docs = batch.getDocuments()
+                y    = batch.getKnownYvalues()
+                order = list(range(len(docs)))
+                random.shuffle(order)
+                numSamples += len(docs)
+                yield [ docs[i] for i in order ], [ y[i] for i in order ]
+        verbose("...epoch %d: %d documents\n" % (epoch+1, numSamples))
 #-----------------------
 
 def writeFeaturesFile(pipeline, fileName):
     vectorizer = pipeline.named_steps['vectorizer']
     classifier = pipeline.named_steps['classifier']
-    orderedFeatures = skHelper.getOrderedFeatures(vectorizer, classifier)
+    if not mlFeatures.hasFeatureNames(vectorizer):
+        verbose("No feature names are available for this Pipeline\n")
+        return
+    orderedFeatures = mlFeatures.getTopFeatures(vectorizer, classifier,
+                                                        args.numTopFeatures)
 
     if len(orderedFeatures) == 0: 
         verbose("No feature weights/coefs are available for this Pipeline\n")
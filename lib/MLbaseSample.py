@@ -12,6 +12,7 @@ import re
 from copy import copy
 import inspect
 import MLtextUtils
+import MLsciLitText
 
 #-----------------------------------
 #
@@ -114,6 +115,8 @@ class BaseSample (object):
     def __init__(self,):
         self.isRejected = False
         self.rejectReason = None
+        self.paraScanCache = {}     # {(fieldName, paraBnd, findFigures) :
+                                    #   paragraph scan}
     #----------------------
 
     def parseSampleRecordText(self, text):
@@ -143,16 +146,83 @@ class BaseSample (object):
         If the dict does not have a value for a field, it defaults to ''
         """
         self.values = { fn: str(values.get(fn,'')) for fn in self.fieldNames }
+        self.paraScanCache = {}
         return self
     #----------------------
 
     def setField(self, fieldName, value):
-        self.values[fieldName] = str(value)
+        value = str(value)
+        # (no cache if a subclass set self.values w/o setFields())
+        cache = getattr(self, 'paraScanCache', None)
+        if cache and self.values.get(fieldName) != value:   # forget cached
+            for key in [k for k in cache if k[0] == fieldName]: #  paragraphs
+                del cache[key]
+        self.values[fieldName] = value
 
     def getField(self, fieldName):
         return self.values[fieldName]
     #----------------------
 
+    def getParagraphScan(self, fieldName='text',
+                            paraBnd=MLsciLitText.DEFAULT_PARA_BND,
+                            findFigures=True):
+        """
+        Return list of (start, end, kind) for the paragraphs of the field
+            (see MLsciLitText.scanParagraphs()).
+        The list is cached until the field is changed via setField(), so
+            preprocessors & extraInfo fields can share it w/o rescanning.
+            (so don't change self.values[fieldName] directly)
+        """
+        cache = getattr(self, 'paraScanCache', None)
+        if cache is None:           # subclass set self.values w/o setFields()
+            cache = self.paraScanCache = {}
+
+        key = (fieldName, paraBnd, findFigures)
+        scan = cache.get(key)
+        if scan is None:
+            scan = list(MLsciLitText.scanParagraphs(self.getField(fieldName),
+                                                    paraBnd, findFigures))
+            cache[key] = scan
+        return scan
+
+    def _getLegendScan(self, fieldName, paraBnd):
+        """ Return a paragraph scan w/ at least the legends marked:
+            the cached full scan if there is one, else one w/o looking for
+            figure/table references
+        """
+        cache = getattr(self, 'paraScanCache', None) or {}
+        scan = cache.get((fieldName, paraBnd, True))
+        if scan is None:
+            scan = self.getParagraphScan(fieldName, paraBnd, findFigures=False)
+        return scan
+
+    def getParagraphs(self, fieldName='text',
+                            paraBnd=MLsciLitText.DEFAULT_PARA_BND):
+        """ Return list of the (stripped) paragraphs of the field """
+        text = self.getField(fieldName)
+        return [ text[start:end] for start, end, kind in \
+                                self._getLegendScan(fieldName, paraBnd) ]
+
+    def getLegends(self, fieldName='text',
+                            paraBnd=MLsciLitText.DEFAULT_PARA_BND):
+        """ Return list of the figure/table legends of the field """
+        text = self.getField(fieldName)
+        return [ text[start:end] for start, end, kind in \
+                                self._getLegendScan(fieldName, paraBnd) \
+                                if kind == MLsciLitText.PARA_LEGEND ]
+
+    def getParagraphKindCounts(self, fieldName='text',
+                            paraBnd=MLsciLitText.DEFAULT_PARA_BND):
+        """ Return dict {paragraph kind : count} for the paragraphs of the
+            field (see MLsciLitText.countParagraphKinds())
+        """
+        counts = { MLsciLitText.PARA_LEGEND: 0, MLsciLitText.PARA_FIGURE: 0,
+                                                MLsciLitText.PARA_OTHER: 0 }
+        for start, end, kind in self.getParagraphScan(fieldName, paraBnd):
+            counts[kind] += 1
+        return counts
+    #----------------------
+
     def constructDoc(self):
         """ 
         Return the text of the "document" of this sample, i.e., the
@@ -230,6 +300,55 @@ class BaseSample (object):
         self.setField('text', self.getField('text')[:20].replace('\n',' ')+'\n')
         return self
     # ---------------------------
+
+    figTextNumWords = 50    # num words around fig/tbl refs for figureText()
+    figTextJoin = '\n\n'    # str to join the legends/fig paragraphs
+
+    def figureText(self):		# preprocessor
+        """
+        Replace the text with just the figure/table legends and the
+            figTextNumWords words around figure/table references in other
+            paragraphs (see MLsciLitText.legendsAndFigWords())
+        Sets figTextCounts: (num legends, num fig/tbl blurbs) found
+            (e.g., for setComputedExtraInfoFields())
+        """
+        figText, numLegends, numBlurbs = MLsciLitText.figureTextCounts( \
+                                        self.getField('text'),
+                                        numWords=self.figTextNumWords,
+                                        figTextJoin=self.figTextJoin,
+                                        scan=self.getParagraphScan('text'))
+        self.setField('text', figText)
+        self.figTextCounts = (numLegends, numBlurbs)
+        return self
+
+    def getFigTextCounts(self):
+        """ Return (num legends, num blurbs) from figureText() or None """
+        return getattr(self, 'figTextCounts', None)
+    # ---------------------------
+
+    def figureTextMulti(self, numWordsList):
+        """
+        Like the figureText() preprocessor for several numWords values at once
+            (finding the fig/tbl references just once).
+        Return dict {numWords : copy of this sample w/ its figureText()}
+        This sample is not changed.
+        """
+        figTexts = { n : [] for n in numWordsList }
+        for d in MLsciLitText.legendsAndFigWordsMulti(self.getField('text'),
+                                        numWordsList=numWordsList,
+                                        scan=self.getParagraphScan('text')):
+            for n, figText in d.items():
+                figTexts[n].append(figText)
+
+        samples = {}
+        for n in numWordsList:
+            sample = copy(self)
+            sample.values = copy(self.values)
+            sample.paraScanCache = copy(self.paraScanCache)
+            sample.setField('text', self.figTextJoin.join(figTexts[n]))
+            samples[n] = sample
+        return samples
+    # ---------------------------
 # end class BaseSample ------------------------
 
 class ClassifiedSample (BaseSample):
@@ -340,8 +459,74 @@ class SampleSet (object):
         return self
     #-------------------------
 
+    def readBatches(self, inFile, # file pathname or open file obj for reading
+        batchSize=1000,         # max number of samples per batch
+        chunkSize=1024*1024,    # number of chars to read at a time
+        ):
+        """
+        Generator: read the sample record file a chunk at a time and yield
+            SampleSets (of this SampleSet's type) of up to batchSize samples,
+            so the whole file never has to be in memory.
+        Like read(), sets this SampleSet's meta & sampleObjType from the file,
+            but does not add the samples to this SampleSet.
+        Assumes sample record file is not empty and has header text
+        """
+        if type(inFile) == type(''): fp = open(inFile, 'r')
+        else: fp = inFile
+
+        try:
+            # meta info (if any) is the 1st line, it may set the record end
+            text = self.consumeMetaText(fp.readline() + fp.read(chunkSize))
+            haveHeader = False
+            batch = self.newBatch()
+            while True:
+                rcds = text.split(self.recordEnd)
+                text = rcds.pop()       # partial record after last record end
+                if rcds and not haveHeader:
+                    del rcds[0]         # header text
+                    haveHeader = True
+
+                for sr in rcds:
+                    batch.addSample(self.sampleObjType().parseSampleRecordText(sr))
+                    if batch.getNumSamples() == batchSize:
+                        yield batch
+                        batch = self.newBatch()
+
+                chunk = fp.read(chunkSize)
+                if not chunk: break
+                text += chunk
+
+            if batch.getNumSamples(): yield batch
+        finally:
+            if type(inFile) == type(''): fp.close() # close if we opened it
+    #-------------------------
+
+    def newBatch(self,):
+        """ Return new empty SampleSet of this type, w/ this meta data """
+        batch = type(self)(sampleObjType=self.sampleObjType)
+        batch.meta = self.meta
+        return batch
+    #-------------------------
+
     def textToSamples(self, text,
         ):
+        text = self.consumeMetaText(text)
+
+        rcds = text.split(self.recordEnd)
+        del rcds[0]             # header text
+        del rcds[-1]            # empty string after end of split
+
+        for sr in rcds:
+            self.addSample(self.sampleObjType().parseSampleRecordText(sr))
+        return self
+    #-------------------------
+
+    def consumeMetaText(self, text,
+        ):
+        """ if 'text' begins with meta info, consume it, set self.meta and
+                the sampleObjType (if specified in the meta info).
+            Return the text with the (optional) meta info removed.
+        """
         self.meta = SampleSetMetaData()
         text = self.meta.consumeMetaText(text)
 
@@ -367,14 +552,7 @@ class SampleSet (object):
                                                             sampleObjTypeName)
                 self.recordEnd = self.sampleObjType.getRecordEnd()
             # else: assume sample obj type was set upon instantiation
-
-        rcds = text.split(self.recordEnd)
-        del rcds[0]             # header text
-        del rcds[-1]            # empty string after end of split
-
-        for sr in rcds:
-            self.addSample(self.sampleObjType().parseSampleRecordText(sr))
-        return self
+        return text
     #-------------------------
 
     def write(self, outFile,	# file pathname or open file obj for writing
@@ -458,6 +636,51 @@ class SampleSet (object):
         return rejects
     #-------------------------
 
+    def figureTextBatch(self, numJobs=1, chunkSize=50,
+        ):
+        """
+        Apply the figureText() preprocessor to all the samples that are not
+            rejects, using a process pool if numJobs != 1 (-1 = num of cpus).
+        If the sample type overrides figureText(), just run it on each
+            sample (no process pool).
+        Like figureText(), sets each sample's figTextCounts.
+        Return list of getFigTextCounts() of the samples, in sample order
+            (None for rejects)
+        """
+        samples = [ s for s in self.samples if not s.isReject() ]
+        sot = self.sampleObjType
+        if sot.figureText is not BaseSample.figureText:
+            for s in samples: s.figureText()
+        else:
+            results = MLsciLitText.legendsAndFigWordsBatch(
+                        [ s.getField('text') for s in samples ],
+                        numWords=sot.figTextNumWords,
+                        figTextJoin=sot.figTextJoin,
+                        numJobs=numJobs, chunkSize=chunkSize)
+            for s, (figText, numLegends, numBlurbs) in zip(samples, results):
+                s.setField('text', figText)
+                s.figTextCounts = (numLegends, numBlurbs)
+        return [ s.getFigTextCounts() for s in self.samples ]
+    #-------------------------
+
+    def figureTextMulti(self, numWordsList,
+        ):
+        """
+        Apply the figureText() preprocessor for several numWords values at once
+        Return dict {numWords : SampleSet of those preprocessed samples}
+        This SampleSet is not changed.
+        """
+        sampleSets = {}
+        for n in numWordsList:
+            sampleSets[n] = type(self)(sampleObjType=self.sampleObjType)
+            sampleSets[n].meta = self.meta
+
+        for s in self.sampleIterator():
+            for n, sample in s.figureTextMulti(numWordsList).items():
+                sampleSets[n].addSample(sample)
+        return sampleSets
+    #-------------------------
+
     def getSamples(self, omitRejects=False):
         if omitRejects:
             return [s for s in self.sampleIterator(omitRejects=omitRejects) ]
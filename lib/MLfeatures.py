@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+'''
+Routines for getting at the features of a fitted vectorizer and their
+coefficients from a fitted classifier - for reports & feature files.
+
+Vocabularies can have millions of features, so these work on numpy arrays:
+    top/bottom features are found w/ np.argpartition() instead of sorting
+    every (feature, coef) pair, and feature names are only looked up for the
+    indices that are actually reported.
+
+Convention: trying to use camelCase for all the names here, but
+    sklearn typically_uses_names with underscores.
+'''
+import zlib
+import array
+from collections.abc import Mapping, ItemsView, ValuesView
+import numpy as np
+import MLsklearnHelper as skHelper
+
+WRITE_CHUNK_SIZE = 10000        # num of feature lines writeFeatures() joins
+                                #  & writes at a time
+#-----------------------------------
+
+def hasFeatureNames(vectorizer, # fitted vectorizer from a pipeline
+    ):
+    '''
+    Return True if we can get the vectorizer's feature names
+        (e.g., not for a HashingVectorizer)
+    '''
+    return hasattr(vectorizer, 'vocabulary_') or \
+                    hasattr(vectorizer, 'get_feature_names_out') or \
+                    hasattr(vectorizer, 'get_feature_names')
+# ---------------------------
+
+def getNumFeatures(vectorizer,  # fitted vectorizer from a pipeline
+    ):
+    '''
+    Return the number of features in the fitted vectorizer.
+    '''
+    if hasattr(vectorizer, 'vocabulary_'): return len(vectorizer.vocabulary_)
+    return len(getAllFeatureNames(vectorizer))
+# ---------------------------
+
+def getAllFeatureNames(vectorizer, # fitted vectorizer from a pipeline
+    ):
+    '''
+    Return numpy array (dtype object) of all the feature names, indexed by
+        feature index.
+    If the vectorizer has a vocabulary_ dict {name : index}, build the array
+        directly from it (no sort), else use get_feature_names[_out]().
+    '''
+    if hasattr(vectorizer, 'vocabulary_'):
+        vocab = vectorizer.vocabulary_
+        names = np.empty(len(vocab), dtype=object)
+        names[np.fromiter(vocab.values(), dtype=np.intp, count=len(vocab))] = \
+                                                                list(vocab.keys())
+        return names
+    if hasattr(vectorizer, 'get_feature_names_out'):
+        return np.asarray(vectorizer.get_feature_names_out(), dtype=object)
+    return np.asarray(vectorizer.get_feature_names(), dtype=object)
+# ---------------------------
+
+def getFeatureNames(vectorizer, # fitted vectorizer from a pipeline
+                    indices,    # iterable of feature indices
+    ):
+    '''
+    Return list of the feature names for the given feature indices
+        (in the same order).
+    If the vectorizer has a vocabulary_, only the wanted names are picked out
+        of it: the full list of names is never built.
+    '''
+    indices = [ int(i) for i in indices ]
+    if not hasattr(vectorizer, 'vocabulary_'):
+        names = getAllFeatureNames(vectorizer)
+        return [ names[i] for i in indices ]
+
+    wanted = set(indices)
+    nameOf = {}                 # {index : name} for the wanted indices
+    for name, index in vectorizer.vocabulary_.items():
+        if index in wanted: nameOf[index] = name
+    return [ nameOf[i] for i in indices ]
+# ---------------------------
+
+def getCoefficients(classifier, # fitted classifier from a pipeline
+    ):
+    '''
+    Return 1-D numpy array of the classifier's feature coefficients
+        (feature_importances_ or coef_[0]), or None if it doesn't have any.
+    '''
+    if hasattr(classifier, 'feature_importances_'):
+        return np.asarray(classifier.feature_importances_).ravel()
+    elif hasattr(classifier, 'coef_'):
+        coef = classifier.coef_
+        if hasattr(coef, 'toarray'): coef = coef.toarray()   # sparsify()'ed
+        return np.asarray(coef)[0]
+    else:
+        return None
+# ---------------------------
+
+def getTopIndices(values,       # 1-D numpy array
+                  num,          # number of indices to return
+    ):
+    '''
+    Return array of the indices of the num highest values, highest first.
+    Same order as sorting all the values, descending (stable): equal values
+        are in increasing index order.
+    Uses np.argpartition() so only the candidates are actually sorted.
+    '''
+    n = len(values)
+    if num <= 0: return np.array([], dtype=np.intp)
+    if num >= n:
+        candidates = np.arange(n)
+    else:
+        kth = values[np.argpartition(values, n - num)[n - num]] # num'th highest
+        candidates = np.flatnonzero(values >= kth)      # (incl. ties w/ kth)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[:num]]
+# ---------------------------
+
+def getBottomIndices(values,    # 1-D numpy array
+                     num,       # number of indices to return
+    ):
+    '''
+    Return array of the indices of the num lowest values, in the order they
+        are at the end of the stable descending sort of all the values
+        (i.e., highest of them first, equal values in increasing index order).
+    '''
+    n = len(values)
+    if num <= 0: return np.array([], dtype=np.intp)
+    if num >= n:
+        candidates = np.arange(n)
+    else:
+        kth = values[np.argpartition(values, num - 1)[num - 1]] # num'th lowest
+        candidates = np.flatnonzero(values <= kth)      # (incl. ties w/ kth)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[len(order) - num:]]
+# ---------------------------
+
+def getTopFeatures( vectorizer, # fitted vectorizer from a pipeline
+                    classifier, # fitted classifier from the pipeline
+                    num=20,     # num of features w/ highest & lowest coefs
+    ):
+    '''
+    Return list of pairs, [ (feature, coef), (feature, coef), ... ]
+        ordered from highest coef to lowest: the num highest followed by the
+        num lowest (all the features if there are no more than 2*num).
+    This is the head & tail of MLsklearnHelper.getOrderedFeatures(),
+        so it can be passed to MLtuningReports.getTopFeaturesReport().
+    Return [] if the classifier has no coefficients.
+    '''
+    coefficients = getCoefficients(classifier)
+    if coefficients is None: return []
+
+    if 2*num >= len(coefficients):
+        indices = getTopIndices(coefficients, len(coefficients))
+    else:
+        indices = np.concatenate((getTopIndices(coefficients, num),
+                                  getBottomIndices(coefficients, num)))
+    names = getFeatureNames(vectorizer, indices)
+    return list(zip(names, coefficients[indices].tolist()))
+# ---------------------------
+
+def getFeatureSamples(vectorizer, # fitted vectorizer from a pipeline
+                      nFeatures=10, # number of features in each sample
+    ):
+    '''
+    Return (numFeatures, first, middle, last):
+        the number of features in the vectorizer and lists of the names of
+        the first, middle, and last nFeatures features.
+    '''
+    numFeatures = getNumFeatures(vectorizer)
+    midFeature  = int(numFeatures/2)
+
+    firstIndices  = range(0, min(nFeatures, numFeatures))
+    middleIndices = range(midFeature, min(midFeature+nFeatures, numFeatures))
+    lastIndices   = range(max(numFeatures-nFeatures, 0), numFeatures)
+
+    names = getFeatureNames(vectorizer,
+                    list(firstIndices) + list(middleIndices) + list(lastIndices))
+    nFirst  = len(firstIndices)
+    nMiddle = len(middleIndices)
+    return numFeatures, names[:nFirst], names[nFirst:nFirst+nMiddle], \
+                                                    names[nFirst+nMiddle:]
+# ---------------------------
+
+def writeFeatures(  vectorizer, # fitted vectorizer from a pipeline
+                    classifier, # fitted classifier from the pipeline
+                    outputFile, # filename (string) or file obj (e.g., stdout)
+                    values=None,# list of feature values, one for each feature
+                                #  (printed with %d)
+                    chunkSize=WRITE_CHUNK_SIZE, # num of lines per write()
+    ):
+    '''
+    Write the full list of feature names to the outputFile, one per line,
+        followed by its value (if values), coefficient (if the classifier has
+        coef_), and importance (if the classifier has feature_importances_).
+    All "|" delimited.
+    Lines are formatted a column at a time and written in chunks of
+        chunkSize lines instead of several write()s per feature.
+    '''
+    delimiter = '|'
+    featureNames = getAllFeatureNames(vectorizer)
+
+    columns = []                # numpy arrays, parallel to featureNames
+    formats = []                # format for each column
+    if values is not None:
+        columns.append(np.asarray(values))
+        formats.append('%d')
+    if hasattr(classifier, 'coef_'):
+        columns.append(getCoefficients(classifier))
+        formats.append('%+5.4f')
+    if hasattr(classifier, 'feature_importances_'):
+        columns.append(np.asarray(classifier.feature_importances_))
+        formats.append('%+5.4f')
+    lineFormat = delimiter.join(['%s'] + formats) + '\n'
+
+    if type(outputFile) == type(''): fp = open(outputFile, 'w')
+    else: fp = outputFile
+
+    for start in range(0, len(featureNames), chunkSize):
+        end = start + chunkSize
+        rows = zip(featureNames[start:end].tolist(),
+                   *[ c[start:end].tolist() for c in columns ])
+        fp.write(''.join([ lineFormat % row for row in rows ]))
+
+    if type(outputFile) == type(''): fp.close()
+    return
+# ----------------------------
+
+def compactPipeline(pipeline,   # trained Pipeline: vectorizer ... classifier
+                    threshold=0.0,  # drop features w/ |coef| <= threshold
+                    vectorizerName='vectorizer',  # name of vectorizer step
+                    classifierName='classifier',  # name of classifier step
+                    force=False,    # compact even if predictions will change
+    ):
+    '''
+    Compact a trained pipeline (in place) so it pickles smaller & loads faster:
+        drop the vectorizer's stop_words_ (only kept for information) and
+        remove the features whose coefficient magnitude is <= threshold
+        (for all classes), remapping the vectorizer vocabulary_, idf_,
+        the classifier coef_, and any FeatureDocCounter stats in between.
+    With threshold 0, only features w/ coefficient 0 are removed, so the
+        predictions of a CountVectorizer pipeline don't change.
+    A normalizing vectorizer (vectorizer.norm, e.g., the TfidfVectorizer
+        default norm='l2') normalizes over the remaining features, so the
+        compacted pipeline's decision values (and predictions) change, even
+        w/ threshold 0. Unless force, raise ValueError for that.
+    Raise ValueError if the pipeline can't be compacted.
+    Return (number of features before, number of features after)
+    '''
+    steps = pipeline.named_steps
+    for name in [vectorizerName, classifierName]:
+        if name not in steps:
+            raise ValueError("Pipeline has no '%s' step" % name)
+    vectorizer = steps[vectorizerName]
+    classifier = steps[classifierName]
+    if not hasattr(vectorizer, 'vocabulary_'):
+        raise ValueError("Vectorizer has no vocabulary_ to compact")
+    if not hasattr(classifier, 'coef_'):
+        raise ValueError("Classifier has no coef_ to compact")
+
+    stepNames = [ name for name, step in pipeline.steps ]
+    between = pipeline.steps[stepNames.index(vectorizerName)+1 : \
+                                            stepNames.index(classifierName)]
+    for name, step in between:
+        if step is None or step == 'passthrough': continue
+        if not isinstance(step, skHelper.FeatureDocCounter):
+            raise ValueError("Cannot compact Pipeline step '%s'" % name)
+
+    # which features to keep
+    coef = classifier.coef_
+    if hasattr(coef, 'toarray'): coef = coef.toarray()  # sparsify()'ed
+    coef = np.asarray(coef)
+    numFeatures = coef.shape[-1]
+    keep = np.abs(coef.reshape(-1, numFeatures)).max(axis=0) > threshold
+    keptIndices = np.flatnonzero(keep)
+    numKept = len(keptIndices)
+    if numKept == 0:
+        raise ValueError("No features have |coef| > %g" % threshold)
+    if getattr(vectorizer, 'norm', None) is not None and \
+                                        numKept < numFeatures and not force:
+        raise ValueError("Vectorizer norm='%s' normalizes over all the " \
+            % vectorizer.norm + "features, removing features changes the " +
+            "predictions (compactModel.py --force to compact anyway)")
+
+    # vectorizer: vocabulary_ w/ new indices (in the same order), idf_
+    newIndex = np.cumsum(keep) - 1
+    vocabulary = { term : int(newIndex[i])
+                        for term, i in vectorizer.vocabulary_.items() if keep[i] }
+    if isinstance(vectorizer.vocabulary_, CompactVocabulary):
+        vocabulary = CompactVocabulary(vocabulary)
+    vectorizer.vocabulary_ = vocabulary
+    if hasattr(vectorizer, '_tfidf') and getattr(vectorizer, 'use_idf', False):
+        vectorizer.idf_ = vectorizer.idf_[keptIndices]
+        vectorizer._tfidf.n_features_in_ = numKept
+    if hasattr(vectorizer, 'stop_words_'): del vectorizer.stop_words_
+
+    # FeatureDocCounters
+    for name, step in between:
+        if not isinstance(step, skHelper.FeatureDocCounter): continue
+        for attr in ['docFreqs', 'termFreqs']:
+            if getattr(step, attr, None) is not None:
+                setattr(step, attr, getattr(step, attr)[keptIndices])
+        if getattr(step, 'classDocFreqs', None) is not None:
+            step.classDocFreqs = step.classDocFreqs[:, keptIndices]
+
+    # classifier: coef_ (& other per feature arrays SGD keeps for partial_fit)
+    classifier.coef_ = classifier.coef_[:, keptIndices]
+    for attr in ['_standard_coef', '_average_coef']:
+        value = getattr(classifier, attr, None)
+        if isinstance(value, np.ndarray) and value.shape[-1] == numFeatures:
+            setattr(classifier, attr, value[..., keptIndices])
+    if hasattr(classifier, 'n_features_in_'): classifier.n_features_in_ = numKept
+
+    return numFeatures, numKept
+# ----------------------------
+
+class CompactVocabulary (Mapping):
+    """
+    IS:   a read only {term : feature index} Mapping that is a drop in
+            replacement for a fitted vectorizer's vocabulary_ dict, but takes
+            a fraction of the memory and pickles as a few flat buffers
+            (instead of millions of str & int objects)
+    HAS:  data    - the UTF-8 encoded terms, concatenated (bytes)
+          offsets - term i is data[offsets[i]:offsets[i+1]]
+          indices - indices[i] is the feature index of term i
+          table   - open addressing hash table (linear probing):
+                        slot -> term i, or -1 for an empty slot.
+                        Hashed by zlib.crc32() of the encoded term, which
+                        (unlike hash()) is the same in every process.
+          offsets, indices, table are array.arrays of the smallest int type
+    DOES: vocab[term], term in vocab, len(vocab), iterate over the terms,
+            items(), values() (fast, w/o hashing)...
+          Pickles via __reduce__ as (data, offsets, indices, table).
+
+    Looking up a term is a bit slower than in a dict (it is encoded & hashed
+        in python), so vectorizing docs is somewhat slower; loading the model
+        & memory use are much better.
+
+    Example: (see compactVocabulary())
+        vectorizer.vocabulary_ = CompactVocabulary(vectorizer.vocabulary_)
+    """
+    loadFactor = 0.7            # max fraction of hash table slots in use
+
+    def __init__(self, vocabulary,      # {term : feature index} Mapping
+        ):
+        terms = list(vocabulary.keys())
+        numTerms = len(terms)
+        encoded = [ t.encode('utf-8') for t in terms ]
+        self.data = b''.join(encoded)
+
+        offsets = np.zeros(numTerms + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+                                        count=numTerms), out=offsets[1:])
+        self.offsets = toIntArray(offsets)
+        self.indices = toIntArray(np.fromiter(vocabulary.values(),
+                                        dtype=np.int64, count=numTerms))
+
+        tableSize = 8
+        while tableSize * self.loadFactor < numTerms: tableSize *= 2
+        mask = tableSize - 1
+        table = [-1] * tableSize
+        for i, e in enumerate(encoded):
+            slot = zlib.crc32(e) & mask
+            while table[slot] != -1: slot = (slot + 1) & mask
+            table[slot] = i
+        self.table = toIntArray(np.array(table, dtype=np.int64))
+        self.mask = mask
+
+    @classmethod
+    def fromParts(cls, data, offsets, indices, table):
+        """ Return CompactVocabulary from the pickled parts (see __reduce__)
+        """
+        vocab = cls.__new__(cls)
+        vocab.data    = data
+        vocab.offsets = offsets
+        vocab.indices = indices
+        vocab.table   = table
+        vocab.mask    = len(table) - 1
+        return vocab
+
+    def __reduce__(self):
+        return (self.__class__.fromParts,
+                            (self.data, self.offsets, self.indices, self.table))
+
+    def __getitem__(self, term):
+        if not isinstance(term, str): raise KeyError(term)
+        encoded = term.encode('utf-8')
+        data, offsets, table, mask = self.data, self.offsets, self.table, \
+                                                                    self.mask
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            i = table[slot]
+            if i == -1: raise KeyError(term)
+            if data[offsets[i]:offsets[i+1]] == encoded: return self.indices[i]
+            slot = (slot + 1) & mask
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        data, offsets = self.data, self.offsets
+        for i in range(len(self.indices)):
+            yield data[offsets[i]:offsets[i+1]].decode('utf-8')
+
+    def items(self):  return CompactVocabularyItems(self)
+    def values(self): return CompactVocabularyValues(self)
+
+    def getNumBytes(self):
+        """ Return approx. number of bytes of memory used """
+        return len(self.data) + sum([ a.itemsize * len(a)
+                            for a in (self.offsets, self.indices, self.table) ])
+# end class CompactVocabulary ----------
+
+class CompactVocabularyItems (ItemsView):
+    """ items() of a CompactVocabulary, iterates w/o hashing the terms """
+    def __iter__(self):
+        return zip(iter(self._mapping), self._mapping.indices)
+
+class CompactVocabularyValues (ValuesView):
+    """ values() of a CompactVocabulary, iterates w/o hashing the terms """
+    def __iter__(self):
+        return iter(self._mapping.indices)
+# ---------------------------
+
+def toIntArray(values,          # numpy int array
+    ):
+    '''
+    Return array.array of the values: 4 byte ints if they fit, else 8 byte.
+    '''
+    if len(values) == 0 or (values.min() >= -2**31 and values.max() < 2**31):
+        return array.array('i', values.astype(np.int32).tobytes())
+    return array.array('q', values.astype(np.int64).tobytes())
+# ---------------------------
+
+def compactVocabulary(vectorizer, # fitted vectorizer from a pipeline
+    ):
+    '''
+    Replace the vectorizer's vocabulary_ dict by a CompactVocabulary.
+    Return the vectorizer.
+    '''
+    if not isinstance(vectorizer.vocabulary_, CompactVocabulary):
+        vectorizer.vocabulary_ = CompactVocabulary(vectorizer.vocabulary_)
+    return vectorizer
+# ---------------------------
+
+if __name__ == "__main__":
+    # ad hoc test code
+    if False:    # no tests yet
+        pass
@@ -23,15 +23,53 @@ Example Usage:
     for figText in legendsAndFigWords(text, numWords=75):
         ...
 
+    for figTexts in legendsAndFigWordsMulti(text, numWordsList=[25, 50]):
+        figText25 = figTexts[25]
+        ...
+
+    for start, end, kind in scanParagraphs(text):   # no paragraph copies
+        ...
+
 To run automated tests:   python test_MLsciLitText.py [-v]
 #######################################################################
 """
 
+import os
 import re
-from MLtextUtils import spacedOutRegex
+import functools
+import multiprocessing
+from MLtextUtils import spacedOutRegex, isWordChar
 
 DEFAULT_PARA_BND = '\n\n'	# default string that means paragraph boundary
 
+nonSpaceRe = re.compile(r'\S')  # same chars as not str.isspace()
+
+def paragraphSpans(text,                 # string to search for paragraphs
+               paraBnd=DEFAULT_PARA_BND, # the string that means paragr boundary
+    ):
+    """ Generator to iterate through the paragraphs in text w/o copying them.
+        Yields (start, end) such that text[start:end] is the paragraph
+        (stripped), i.e., the same paragraphs as paragraphs(text, paraBnd).
+    """
+    if not paraBnd: raise ValueError('empty paraBnd')
+    bndLen = len(paraBnd)
+    find = text.find
+    search = nonSpaceRe.search
+    pos = 0                             # start of the current paragraph
+    textLen = len(text)
+    while pos <= textLen:
+        bnd = find(paraBnd, pos)
+        if bnd == -1: bnd = textLen
+
+        m = search(text, pos, bnd)      # 1st non-space char
+        if m:
+            start = m.start()
+            end = bnd
+            while text[end-1].isspace(): end -= 1
+            yield (start, end)
+        pos = bnd + bndLen
+#---------------------------------
+
 def paragraphs(text,                     # string to search for paragraphs
                paraBnd=DEFAULT_PARA_BND, # the string that means paragr boundary
     ):
@@ -77,6 +115,92 @@ legendRe = re.compile(\
         re.IGNORECASE)
 #---------------------------------
 
+# Quick check that rules out most text before trying figureRe (which has to
+#  be tried at every position in the text).
+# (legendRe needs no prefilter: it is anchored at the start of the text and
+#  fails at the 1st or 2nd char for almost all non-legends.)
+
+def _mayHaveFigureRef(text, start, end):
+    """ Return True if figureRe could match in text[start:end].
+        Besides plain case differences, the only chars figureRe matches
+        case insensitively in "fig" and "table" are capital dotted i (which
+        lowers to i + combining dot above) and dotless i.
+    """
+    low = text[start:end].lower()
+    return 'fig' in low or 'tab' in low or 'f\u0131g' in low \
+                                                    or 'fi\u0307g' in low
+
+def isLegend(text, start=0, end=None):
+    """ Return True if text[start:end] begins w/ a figure/table legend word,
+        i.e., legendRe.match(text[start:end]), w/o copying it.
+    """
+    if end is None: end = len(text)
+
+    # The regexes see text[start-1] when checking for a word boundary
+    #  at start. So if that char is a word char, match against a copy.
+    if start and isWordChar(text[start-1]):
+        return bool(legendRe.match(text[start:end]))
+    return bool(legendRe.match(text, start, end))
+
+def hasFigureRef(text, start=0, end=None):
+    """ Return True if text[start:end] mentions figures/tables,
+        i.e., figureRe.search(text[start:end]), but faster.
+    """
+    if end is None: end = len(text)
+    if not _mayHaveFigureRef(text, start, end): return False
+
+    if start and isWordChar(text[start-1]):     # see isLegend()
+        return bool(figureRe.search(text[start:end]))
+    return bool(figureRe.search(text, start, end))
+#---------------------------------
+
+# paragraph kinds from scanParagraphs()
+PARA_LEGEND = 'legend'          # figure/table legend
+PARA_FIGURE = 'figure'          # not a legend, but refers to figures/tables
+PARA_OTHER  = 'other'
+
+def scanParagraphs(text,
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+            findFigures=True,         # look for figure/table references
+    ):
+    """ Generator to iterate through the paragraphs in text w/o copying them.
+        Yields (start, end, kind) where text[start:end] is the paragraph
+        (as in paragraphSpans()), and kind is PARA_LEGEND if it is a legend
+        (as in legends()), PARA_FIGURE if it is not a legend but mentions
+        figures/tables (as in legendsAndFigParagraphs()), else PARA_OTHER.
+        If not findFigures, skip looking for figure/table references and
+        all non-legends are PARA_OTHER.
+    """
+    for start, end in paragraphSpans(text, paraBnd):
+        if isLegend(text, start, end):                  kind = PARA_LEGEND
+        elif findFigures and hasFigureRef(text, start, end):
+                                                        kind = PARA_FIGURE
+        else:                                           kind = PARA_OTHER
+        yield (start, end, kind)
+#---------------------------------
+
+def countParagraphKinds(text,
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+    ):
+    """ Return dict {kind: num paragraphs of that kind} for all the kinds
+        from scanParagraphs()
+    """
+    counts = {PARA_LEGEND: 0, PARA_FIGURE: 0, PARA_OTHER: 0}
+    for start, end, kind in scanParagraphs(text, paraBnd):
+        counts[kind] += 1
+    return counts
+#---------------------------------
+
+def legendSpans(text,
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+    ):
+    """ Generator to iterate through the (start, end) of the legends in text.
+        text[start:end] is the legend as returned by legends().
+    """
+    for start, end, kind in scanParagraphs(text, paraBnd, findFigures=False):
+        if kind == PARA_LEGEND: yield (start, end)
+#---------------------------------
+
 def legends(text,
             paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
     ):
@@ -85,6 +209,8 @@ def legends(text,
         with a paraBnd string.
         The paraBnd is removed, and the returned legends are stripped().
     """
+    # (copying via paragraphs() is faster than legendSpans() if we need the
+    #   legend strings anyway)
     return (p for p in paragraphs(text, paraBnd=paraBnd) if legendRe.match(p))
 #---------------------------------
 
@@ -95,14 +221,15 @@ def legendsAndFigParagraphs(text,
         all paragraphs in text that talk about figures or tables.
         The paraBnd is removed, and returned legends/paragraphs are stripped().
     """
-    return (p for p in paragraphs(text, paraBnd=paraBnd) \
-                        if legendRe.match(p) or figureRe.search(p))
+    return (text[start:end] for start, end, kind in scanParagraphs(text,paraBnd)
+                                                    if kind != PARA_OTHER)
 #---------------------------------
 
 def legendsAndFigWords(text,
             paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
             numWords=50,              # num words around fig/tbl refs to keep
             blurbJoin=' .. ',         # text to join paragraph parts
+            scan=None,                # list from scanParagraphs() to reuse
     ):
     """ Generator to iterate through the figure/table legends and
         parts of paragraphs that talk about figures/tables.
@@ -110,41 +237,158 @@ def legendsAndFigWords(text,
           references. All the "parts" of each paragraph are joined by blurbJoin
           and returned as one abridged paragraph.
         The paraBnd is removed, and returned legends/paragraphs are stripped().
+        scan: list of (start, end, kind) from scanParagraphs(text, paraBnd)
+          if you already have it (e.g., cached), so text isn't rescanned.
     """
-    for p in paragraphs(text, paraBnd=paraBnd):
-        if legendRe.match(p):		# have figure/table legend
-            yield p
+    # (getFigureBlurbs() finds any fig/tbl references, no need to classify)
+    if scan is None: scan = scanParagraphs(text, paraBnd, findFigures=False)
+    for start, end, kind in scan:
+        if kind == PARA_LEGEND:		# have figure/table legend
+            yield text[start:end]
         else:				# not legend, get parts
-            blurbs = getFigureBlurbs(p, numWords)
+            blurbs = getFigureBlurbs(text, numWords, start=start, end=end)
             if blurbs:
                 yield blurbJoin.join(blurbs)
 #---------------------------------
 
-def getFigureBlurbs(text, numWords=50,):
+def figureTextCounts(text,
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+            numWords=50,              # num words around fig/tbl refs to keep
+            blurbJoin=' .. ',         # text to join paragraph parts
+            figTextJoin='\n\n',       # text to join legends/paragraph parts
+            scan=None,                # list from scanParagraphs() to reuse
+    ):
+    """ Return (figText, numLegends, numBlurbs) for text where
+        figText is the legendsAndFigWords() of text joined by figTextJoin,
+        numLegends is the number of legends, numBlurbs the number of blurbs.
+        scan: as in legendsAndFigWords()
+    """
+    figTexts = []
+    numLegends = 0
+    numBlurbs  = 0
+    if scan is None: scan = scanParagraphs(text, paraBnd, findFigures=False)
+    for start, end, kind in scan:
+        if kind == PARA_LEGEND:
+            figTexts.append(text[start:end])
+            numLegends += 1
+        else:
+            blurbs = getFigureBlurbs(text, numWords, start=start, end=end)
+            if blurbs:
+                figTexts.append(blurbJoin.join(blurbs))
+                numBlurbs += len(blurbs)
+    return figTextJoin.join(figTexts), numLegends, numBlurbs
+#---------------------------------
+
+def legendsAndFigWordsBatch(texts,    # list of texts
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+            numWords=50,              # num words around fig/tbl refs to keep
+            blurbJoin=' .. ',         # text to join paragraph parts
+            figTextJoin='\n\n',       # text to join legends/paragraph parts
+            numJobs=1,                # num processes, -1 = num of cpus
+            chunkSize=50,             # num texts to send to a process at once
+    ):
+    """ Return list of figureTextCounts(text) for the texts, in order.
+        If numJobs != 1, the texts are processed in chunks by a process pool.
+    """
+    func = functools.partial(figureTextCounts, paraBnd=paraBnd,
+                    numWords=numWords, blurbJoin=blurbJoin,
+                    figTextJoin=figTextJoin)
+    if numJobs == 1 or len(texts) <= chunkSize:
+        return [ func(t) for t in texts ]
+
+    if numJobs is None or numJobs < 1: numJobs = os.cpu_count()
+    with multiprocessing.Pool(numJobs) as pool:
+        return pool.map(func, texts, chunksize=chunkSize)
+#---------------------------------
+
+def legendsAndFigWordsMulti(text,
+            paraBnd=DEFAULT_PARA_BND, # string that means paragraph boundary
+            numWordsList=[50],        # list of num words around fig/tbl refs
+            blurbJoin=' .. ',         # text to join paragraph parts
+            scan=None,                # list from scanParagraphs() to reuse
+    ):
+    """ Generator to iterate through the figure/table legends and
+        parts of paragraphs that talk about figures/tables for several
+        numWords values in one pass.
+        Yields dict {numWords : figText} for each legend/paragraph w/ figure
+          references, where figText is what legendsAndFigWords(text, numWords)
+          would return for that paragraph.
+        scan: as in legendsAndFigWords()
+    """
+    if scan is None: scan = scanParagraphs(text, paraBnd, findFigures=False)
+    for start, end, kind in scan:
+        if kind == PARA_LEGEND:		# have figure/table legend
+            legend = text[start:end]
+            yield { n : legend for n in numWordsList }
+        else:				# not legend, get parts
+            chunks = _figureChunkWords(text, start, end)
+            if chunks:
+                yield { n : blurbJoin.join(_blurbsFromChunks(chunks, n))
+                                                        for n in numWordsList }
+#---------------------------------
+
+def getFigureBlurbs(text, numWords=50, start=0, end=None):
     """
     Search through text for references to figures/tables.
     Return a list of text blurbs consisting of numWords around those references
+    start, end: only search text[start:end] (w/o copying it)
     """
-    matches = list(figureRe.finditer(text))	# all matches of fig/tbl words
+    return _blurbsFromChunks(_figureChunkWords(text, start, end), numWords)
+#---------------------------------
 
-    if not matches: return []
+def getFigureBlurbsMulti(text, numWordsList=[50], start=0, end=None):
+    """
+    Like getFigureBlurbs() for several numWords values at once, but only
+        finds the fig/tbl references & splits the text into words once.
+    Return dict {numWords : list of text blurbs} for each numWords in the list
+    """
+    chunks = _figureChunkWords(text, start, end)
+    return { n : _blurbsFromChunks(chunks, n) for n in numWordsList }
+#---------------------------------
 
-    blurbs = []				# text blurbs to return
+def _figureChunkWords(text, start=0, end=None):
+    """
+    Find references to figures/tables in text[start:end] and split the text
+        into chunks at the start of each reference.
+    Return list of word lists, one for each chunk:
+        the words before the 1st fig/tbl word,
+        then for each fig/tbl word, the words from it up to the next one
+            (or the end).
+    Return [] if there are no references.
+    """
+    if end is None: end = len(text)
+    if not _mayHaveFigureRef(text, start, end): return []
+
+    if start and isWordChar(text[start-1]):    # see isLegend()
+        text = text[start:end]
+        start, end = 0, len(text)
+    starts = [m.start() for m in figureRe.finditer(text, start, end)]
+
+    if not starts: return []
+
+    chunks = [ text[start : starts[0]].split() ]   # text before 1st fig word
+    for i in range(len(starts)-1):
+        chunks.append(text[ starts[i] : starts[i+1] ].split())
+    chunks.append(text[ starts[-1] : end ].split())
+    return chunks
+#---------------------------------
 
-    # 1st match, leading chunk before first fig/tbl word
-    m = matches[0]
-    textChunk = text[ : m.start() ]	# text before the fig/tbl word
-    words = textChunk.split()		# the words
+def _blurbsFromChunks(chunks, numWords):
+    """
+    Return list of text blurbs consisting of numWords around the fig/tbl
+        references, given the chunks of words from _figureChunkWords()
+    """
+    if not chunks: return []
+
+    blurbs = []				# text blurbs to return
 
         # curBlurb is text so far of the numWords around the current
         #   match we are looking at
-    curBlurb = ' '.join(words[-numWords:])	# Start w/ words before 1st m
+    curBlurb = ' '.join(chunks[0][-numWords:])	# Start w/ words before 1st m
 
     # for each match before last one,
     #   look at textChunks between fig word matches
-    for i in range(len(matches)-1):
-        textChunk = text[ matches[i].start() : matches[i+1].start() ]
-        words = textChunk.split() 	# words incl 1st fig word but not 2nd
+    for words in chunks[1:-1]:		# words incl 1st fig word but not 2nd
 
         # Have '...fig ... intervening text fig...',
         #   words[] are the words in   fig ...intervening text
@@ -163,9 +407,7 @@ def getFigureBlurbs(text, numWords=50,):
             curBlurb = ' '.join(words[-numWords:]) 	# start new blurb
 
     # last match, trailing chunk after last fig/tbl word
-    m = matches[len(matches) -1]
-    textChunk = text[ m.start() : ]
-    words = textChunk.split()
+    words = chunks[-1]
     curBlurb += ' ' + ' '.join(words[:numWords+1])	# +1: incl 'fig' word
     blurbs.append(curBlurb)
 
@@ -12,11 +12,21 @@ import sys
 import os.path
 import re
 import string
+import pickle
+import hashlib
+import numbers
+import operator
+import tempfile
+from collections import OrderedDict
 from collections.abc import Mapping, Iterable
 
+from joblib import Parallel, delayed, hash as hashObject
 from sklearn.base import TransformerMixin, BaseEstimator
+from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 import nltk.stem.snowball as nltk
+import numpy as np
+import scipy.sparse
 
 #-----------------------------------
 
@@ -63,18 +73,11 @@ def getFalsePosNeg( y_true,		# [true vals], typically 0/1 or yes/no
         comparing true values to predicted ones
     Assumes y_true, y_predicted, sampleNames are parallel lists
     '''
-    falsePositives = []
-    falseNegatives = []
-
-    for trueY, predY, name in zip(y_true, y_predicted, sampleNames):
-
-        predType = predictionType(trueY, predY, positiveClass=positiveClass)
-        if   predType == 'FP':
-            falsePositives.append(name)
-        elif predType == 'FN':
-            falseNegatives.append(name)
-
-    return falsePositives, falseNegatives
+    codes = getPredictionTypeCodes(y_true, y_predicted,
+                                                    positiveClass=positiveClass)
+    names = np.empty(len(sampleNames), dtype=object)
+    names[:] = sampleNames
+    return names[codes == PRED_FP].tolist(), names[codes == PRED_FN].tolist()
 # ---------------------------
 
 def predictionType( y_true,		# true value, typically 0/1 or yes/no 
@@ -93,6 +96,38 @@ def predictionType( y_true,		# true value, typically 0/1 or yes/no
     return retVal
 # ---------------------------
 
+# prediction type codes from getPredictionTypeCodes(),
+#   PREDICTION_TYPES[code] is its predictionType() string
+PRED_FN, PRED_TN, PRED_FP, PRED_TP = 0, 1, 2, 3
+PREDICTION_TYPES = np.array(['FN', 'TN', 'FP', 'TP'])
+
+def getPredictionTypeCodes( y_true,	# [true vals], typically 0/1 or yes/no
+                    y_predicted,	# [pred vals], typically 0/1 or yes/no
+                    positiveClass=1,	# value in y_ considered "pos"
+    ):
+    '''
+    Return np.array of PRED_* codes, one for each y_true, y_predicted pair:
+        2 * (predicted positive) + (prediction correct)
+    '''
+    y_true      = np.asarray(y_true)
+    y_predicted = np.asarray(y_predicted)
+    predPositive = y_predicted == positiveClass
+    correct      = y_true == y_predicted
+    return 2 * predPositive.astype(np.int8) + correct
+# ---------------------------
+
+def getPredictionTypes( y_true,		# [true vals], typically 0/1 or yes/no
+                    y_predicted,	# [pred vals], typically 0/1 or yes/no
+                    positiveClass=1,	# value in y_ considered "pos"
+    ):
+    '''
+    Return np.array of predictionType() strings, 'FP', 'FN', 'TP', or 'TN',
+        one for each y_true, y_predicted pair
+    '''
+    return PREDICTION_TYPES[getPredictionTypeCodes(y_true, y_predicted,
+                                                positiveClass=positiveClass)]
+# ---------------------------
+
 def getOrderedFeatures( vectorizer,     # fitted vectorizer from a pipeline
                         classifier      # trained classifier from a pipeline
     ):
@@ -125,16 +160,60 @@ def getConfidenceValues(classifier,
     If classifier does not have any mechanism to return confidences, return None
     Assumes predictions are binary (for two classes, positive and negative)
     """
+    confidences = getConfidenceArray(classifier, samples,
+                                                positiveClass=positiveClass)
+    if confidences is None: return None
+    return confidences.tolist()
+# ---------------------------
+
+def getConfidenceArray(classifier,
+                        samples,		# list of samples to predict
+                        positiveClass=1,	# value in y_ considered "pos"
+                        ):
+    """
+    Return np.array of "confidence" values as getConfidenceValues() does,
+        or None if classifier has no mechanism to return confidences
+    """
     if classifier and hasattr(classifier, "decision_function"):
-        confidences = classifier.decision_function(samples).tolist()
+        confidences = np.asarray(classifier.decision_function(samples))
     elif classifier and hasattr(classifier, "predict_proba"):
-        confidences = getProbaConfidences(classifier, samples,
+        confidences = getProbaConfidenceArray(classifier, samples,
                                                 positiveClass=positiveClass)
     else:
         confidences = None
     return confidences
 # ---------------------------
 
+def predictWithConfidences(model,	# trained Pipeline (or classifier)
+                        samples,		# list of samples to predict
+                        positiveClass=1,	# value in y_ considered "pos"
+                        doConfidences=True,	# False to skip confidences
+                        ):
+    """
+    Return (predictions, confidences) np.arrays for the samples.
+    Runs the samples through the Pipeline's steps before the classifier once,
+        and gets both the predictions and the confidences from the classifier
+        (instead of model.predict() and getConfidenceValues(model) each
+        vectorizing the samples).
+    confidences is None if not doConfidences or the classifier has no
+        mechanism to return confidences (see getConfidenceValues()).
+    """
+    if isinstance(model, Pipeline) and len(model.steps) > 1:
+        X = model[:-1].transform(samples)
+        classifier = model.steps[-1][1]
+    else:
+        X = samples
+        classifier = model
+
+    predictions = classifier.predict(X)
+    if doConfidences:
+        confidences = getConfidenceArray(classifier, X,
+                                                positiveClass=positiveClass)
+    else:
+        confidences = None
+    return predictions, confidences
+# ---------------------------
+
 def getProbaConfidences(classifier,
                         samples,		# list of samples to predict
                         positiveClass=1		# value in y_ considered "pos"
@@ -157,28 +236,43 @@ def getProbaConfidences(classifier,
     JIM: This works for RandomForestClassifier. 
     Need to check this is consistent for other classifiers w/ predict_proba.
     """
-    confidences = []
-    negativeClass = 1 - positiveClass
+    return getProbaConfidenceArray(classifier, samples,
+                                        positiveClass=positiveClass).tolist()
+# ---------------------------
 
-    values = classifier.predict_proba(samples)
+def getProbaConfidenceArray(classifier,
+                        samples,		# list of samples to predict
+                        positiveClass=1		# value in y_ considered "pos"
+                        ):
+    """
+    Return np.array of getProbaConfidences() values
+    """
+    negativeClass = 1 - positiveClass
 
-    for i in range(len(values)):            # for each doc
-        posProb = values[i][positiveClass]
-        negProb = values[i][negativeClass]
-        if posProb > negProb:
-            confidences.append(posProb)
-        else:
-            confidences.append(-negProb)
-    return confidences
+    values  = classifier.predict_proba(samples)
+    posProb = values[:, positiveClass]
+    negProb = values[:, negativeClass]
+    return np.where(posProb > negProb, posProb, -negProb)
 # ---------------------------
 
 class FeatureDocCounter(BaseEstimator, TransformerMixin):
     """
     An sklearn Estimator that gives you access to the number of documents each
-        feature occurs in.
+        feature occurs in (and other feature statistics of the training set).
     Put this "Estimator" into your pipeline after the vectorizer,
     then Access this list of counts via getValues()
 
+    The statistics are computed (as numpy arrays) when the pipeline is fit.
+    transform() does nothing, so it doesn't slow down predictions.
+        docFreqs      - number of training docs each feature occurs in
+                            (nonzero entries, so correct for non-binary
+                            vectorizers too)
+        termFreqs     - total of each feature's values over the training docs
+                            (total term count for a CountVectorizer)
+        classes       - the distinct y values, sorted (if fit w/ y)
+        classDocFreqs - 2D array, classDocFreqs[i] is the docFreqs of the
+                            training docs whose y == classes[i] (if fit w/ y)
+
     Example Usage:
     # (1) define the featureEvaluator step in your pipeline
 
@@ -207,25 +301,565 @@ class FeatureDocCounter(BaseEstimator, TransformerMixin):
             ...
     """
     def transform(self, X):
-        '''don't actually transform X, just gather the counts.'''
-
-        # I wish I understood scipy.sparse matrices and/or numpy.matrix,
-        #   but these magic words seem to work (after trial and error)
-        self.docCounts = X.sum(axis=0,dtype=int).tolist()[0]
+        '''nothing to transform, the stats are gathered by fit()'''
         return X
 
     def fit(self, X, y=None, **fit_params):
-        '''nothing to actually fit'''
+        '''gather the feature statistics of X (and y)'''
+        if scipy.sparse.issparse(X): X = X.tocsr()    # for row selection
+        self.docFreqs  = self.getDocFreqsOf(X)
+        self.termFreqs = np.asarray(X.sum(axis=0)).ravel()
+
+        if y is None:
+            self.classes = None
+            self.classDocFreqs = None
+        else:
+            y = np.asarray(y)
+            self.classes = np.unique(y)
+            self.classDocFreqs = np.array([ self.getDocFreqsOf(X[y == c])
+                                                    for c in self.classes ])
         return self
 
+    @staticmethod
+    def getDocFreqsOf(X):
+        """ Return array of the number of rows of X where each column != 0
+        """
+        if scipy.sparse.issparse(X):
+            X = X.tocsr()
+            if (X.data == 0).any():         # explicitly stored 0's
+                X = X.copy()
+                X.eliminate_zeros()
+            return np.asarray(X.getnnz(axis=0))
+        return np.count_nonzero(X, axis=0)
+
     def getValues(self):
         """ Return list of counts, one integer for each feature,
             in feature order.
             Each count is the number of docs the feature occurs in.
         """
-        return self.docCounts
+        return self.docFreqs.tolist()
+
+    def getDocFreqs(self):      return self.docFreqs
+    def getTermFreqs(self):     return self.termFreqs
+    def getClasses(self):       return self.classes
+    def getClassDocFreqs(self): return self.classDocFreqs
 # end class FeatureDocCounter ----------
 
+def countCachedFits(cacheDir,   # Pipeline(memory=cacheDir) cache directory
+    ):
+    '''
+    Return the number of transformer fits stored in a Pipeline memory cache.
+    (joblib.Memory stores each distinct call as a directory w/ output.pkl)
+    '''
+    numFits = 0
+    for dirPath, dirNames, fileNames in os.walk(cacheDir):
+        if 'output.pkl' in fileNames: numFits += 1
+    return numFits
+# ---------------------------
+
+def getTransformerCacheStats(gridSearch,  # fitted GridSearchCV of a Pipeline
+                            cacheDir,     # the Pipeline's memory cache dir
+    ):
+    '''
+    Return (numFits, numHits):
+        numFits - number of times the GridSearch fit a Pipeline transformer
+                    step (all candidates * folds, + the refit)
+        numHits - ESTIMATE of how many of these were loaded from cacheDir
+                    instead of fit: numFits - the fits stored in cacheDir
+    A transformer step is fit once for each distinct (params, fold) and
+        reused by all the later steps' param combinations.
+    The hits are not counted (the fits run in the GridSearch workers), so
+        numHits is only right if cacheDir started out empty and joblib
+        stored every fit it ran. Fits already in cacheDir lower it.
+    '''
+    pipeline = gridSearch.estimator
+    numSteps = len([ s for n, s in pipeline.steps[:-1]
+                                        if s is not None and s != 'passthrough'])
+    numCandidates = len(gridSearch.cv_results_['params'])
+    numPipelineFits = numCandidates * gridSearch.n_splits_
+    if gridSearch.refit: numPipelineFits += 1
+
+    numFits = numPipelineFits * numSteps
+    numHits = max(0, numFits - countCachedFits(cacheDir))
+    return numFits, numHits
+# ---------------------------
+
+class CountOnceVectorizer(CountVectorizer):
+    """
+    IS:   a CountVectorizer that remembers the unpruned document-term matrices
+            of the docs it was recently fit on / used to transform
+            (for each set of tokenizing params)
+    HAS:  the CountVectorizer params, cacheCounts (default False),
+          (class level) an LRU cache bounded by maxCacheBytes:
+            {(docs, non-pruning params) : (unpruned vocabulary, matrix,...)}
+    DOES: if cacheCounts:
+          fit/fit_transform: tokenize & count the docs only if they are not
+            in the cache, then prune by min_df, max_df, max_features by
+            masking the columns of the cached matrix.
+          transform: similarly, select the vocabulary columns from the
+            cached matrix of the docs counted w/ the unpruned vocabulary.
+          Results are identical to CountVectorizer w/ the same params.
+          If not cacheCounts, it is just a CountVectorizer.
+
+    For GridSearches that vary min_df/max_df (or classifier params) but not
+    the tokenizing params: GridSearchCV clones the vectorizer for each
+    param combination & fold, but each fold's training docs & test docs
+    only get tokenized once.
+    (with n_jobs > 1, each GridSearch process has its own cache)
+    MLtuning sets cacheCounts=True only during its GridSearch and clears the
+    cache afterward, so a plain fit (e.g., trainModel.py) and the trained
+    model don't hold on to unpruned matrices.
+
+    Once pickled (e.g., a trained model), it is just a CountVectorizer.
+
+    Example: in a tuning script Pipeline
+        ('vectorizer', skHelper.CountOnceVectorizer(ngram_range=(1,2), ...)),
+    """
+    maxCacheBytes = 2**30       # approx max size of the cached entries.
+                                # Ideally >= 2 * (number of cv folds + 1)
+                                #   entries fit.
+    countsCache = OrderedDict() # {key : (vocabulary, X, terms, docFreqs)}
+                                #   least recently used 1st
+    cacheBytes = 0              # approx size of the cached entries
+    entryBytes = {}             # {key : approx size of its entry}
+
+    pruningParams = ['min_df', 'max_df', 'max_features']
+
+    def __init__(self, *, input='content', encoding='utf-8',
+                decode_error='strict', strip_accents=None, lowercase=True,
+                preprocessor=None, tokenizer=None, stop_words=None,
+                token_pattern=r'(?u)\b\w\w+\b', ngram_range=(1, 1),
+                analyzer='word', max_df=1.0, min_df=1, max_features=None,
+                vocabulary=None, binary=False, dtype=np.int64,
+                cacheCounts=False,  # use the countsCache
+                ):
+        super().__init__(input=input, encoding=encoding,
+                decode_error=decode_error, strip_accents=strip_accents,
+                lowercase=lowercase, preprocessor=preprocessor,
+                tokenizer=tokenizer, stop_words=stop_words,
+                token_pattern=token_pattern, ngram_range=ngram_range,
+                analyzer=analyzer, max_df=max_df, min_df=min_df,
+                max_features=max_features, vocabulary=vocabulary,
+                binary=binary, dtype=dtype)
+        self.cacheCounts = cacheCounts
+
+    def fit(self, raw_documents, y=None):
+        self.fit_transform(raw_documents)
+        return self
+
+    def fit_transform(self, raw_documents, y=None):
+        self.countsKey = None
+        if not self.cacheCounts or self.vocabulary is not None \
+                                    or isinstance(raw_documents, str):
+            return super().fit_transform(raw_documents, y)
+
+        docs = list(raw_documents)
+        params = self.getTokenizingParams()
+        key = hashObject( (docs, sorted(params.items())) )
+        vocabulary, X, terms, docFreqs = self.getCachedCounts(key, docs, params)
+
+        # same pruning as CountVectorizer.fit_transform() & _limit_features()
+        #  but w/ numpy instead of python loops over the whole vocabulary
+        self._validate_params()
+        n_doc = X.shape[0]
+        max_doc_count = self.max_df if isinstance(self.max_df,numbers.Integral)\
+                                    else self.max_df * n_doc
+        min_doc_count = self.min_df if isinstance(self.min_df,numbers.Integral)\
+                                    else self.min_df * n_doc
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        mask = (docFreqs <= max_doc_count) & (docFreqs >= min_doc_count)
+        limit = self.max_features
+        if limit is not None and mask.sum() > limit:
+            termFreqs = np.asarray(X.sum(axis=0)).ravel()
+            maskIndices = (-termFreqs[mask]).argsort()[:limit]
+            newMask = np.zeros(len(docFreqs), dtype=bool)
+            newMask[np.where(mask)[0][maskIndices]] = True
+            mask = newMask
+
+        keptIndices = np.where(mask)[0]
+        if len(keptIndices) == 0:
+            raise ValueError("After pruning, no terms remain. " +
+                                "Try a lower min_df or a higher max_df.")
+        self.vocabulary_ = dict(zip(terms[keptIndices].tolist(),
+                                                    range(len(keptIndices))))
+        self.stop_words_ = set(terms[~mask].tolist())
+        self.fixed_vocabulary_ = False
+        self.countsKey = key
+        self.keptIndices = keptIndices
+        return X[:, keptIndices]
+
+    def transform(self, raw_documents):
+        if getattr(self, 'countsKey', None) is None \
+                    or self.countsKey not in CountOnceVectorizer.countsCache \
+                    or isinstance(raw_documents, str):
+            return super().transform(raw_documents)
+
+        docs = list(raw_documents)
+        params = self.getTokenizingParams()
+        params['vocabulary'] = CountOnceVectorizer.countsCache[self.countsKey][0]
+        key = hashObject( (docs, self.countsKey) )
+        vocabulary, X, terms, docFreqs = self.getCachedCounts(key, docs, params)
+        return X[:, self.keptIndices]
+
+    def getTokenizingParams(self):
+        """ Return dict of the CountVectorizer params except the pruning
+            params
+        """
+        params = self.get_params()
+        for p in self.pruningParams + ['cacheCounts']: del params[p]
+        return params
+
+    def getCachedCounts(self, key, docs, params):
+        """ Return (vocabulary, X, terms, docFreqs) for the docs counted by a
+              CountVectorizer w/ these params: from the cache or by counting.
+            If params has no vocabulary (i.e., fitting):
+              vocabulary & X are sorted by feature as CountVectorizer does,
+              terms is np.array of the features in that order,
+              docFreqs is np.array of the number of docs each feature is in.
+            Else terms & docFreqs are None.
+        """
+        cls = CountOnceVectorizer
+        cache = cls.countsCache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        vectorizer = CountVectorizer(**params)
+        X = vectorizer.fit_transform(docs)
+        if params['vocabulary'] is None:
+            terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+            for term, i in vectorizer.vocabulary_.items(): terms[i] = term
+            docFreqs = np.bincount(X.indices, minlength=X.shape[1])
+        else:
+            terms = docFreqs = None
+        entry = (vectorizer.vocabulary_, X, terms, docFreqs)
+
+        # keep the newest entry even if it alone is bigger than maxCacheBytes
+        size = getCountsSize(entry)
+        while cache and cls.cacheBytes + size > cls.maxCacheBytes:
+            oldKey, old = cache.popitem(last=False)
+            cls.cacheBytes -= cls.entryBytes.pop(oldKey)
+        cache[key] = entry
+        cls.entryBytes[key] = size
+        cls.cacheBytes += size
+        return entry
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('countsKey', None)
+        state.pop('keptIndices', None)
+        return state
+
+    @classmethod
+    def clearCache(cls):
+        CountOnceVectorizer.countsCache.clear()
+        CountOnceVectorizer.entryBytes.clear()
+        CountOnceVectorizer.cacheBytes = 0
+
+    @classmethod
+    def getCacheBytes(cls): return CountOnceVectorizer.cacheBytes
+# end class CountOnceVectorizer ----------
+
+def getCountsSize(entry,        # (vocabulary, X, terms, docFreqs)
+    ):
+    '''
+    Return approx number of bytes of a CountOnceVectorizer cache entry:
+        the sparse matrix arrays + ~100 bytes per vocabulary term
+        (dict entry, str object, terms array slot)
+    '''
+    vocabulary, X, terms, docFreqs = entry
+    size = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    size += 100 * len(vocabulary)
+    if docFreqs is not None: size += docFreqs.nbytes
+    return size
+# ---------------------------
+
+def setCountOnceCaching(estimator,      # e.g., a Pipeline
+                        cacheCounts,    # True or False
+    ):
+    '''
+    Set cacheCounts of all the CountOnceVectorizers in the estimator
+        (including nested ones). Return the number of them.
+    '''
+    if isinstance(estimator, CountOnceVectorizer):
+        estimator.set_params(cacheCounts=cacheCounts)
+        return 1
+    names = [ name for name, value in estimator.get_params().items()
+                                if isinstance(value, CountOnceVectorizer) ]
+    estimator.set_params(**{ name + '__cacheCounts' : cacheCounts
+                                                        for name in names })
+    return len(names)
+# ---------------------------
+
+class MappedCorpus (object):
+    """
+    IS:   a read only list of document strings stored in memory mapped files
+    HAS:  a data file of the UTF-8 encoded docs, one after the other,
+          an offsets file (.npy) of where each doc starts in the data file,
+          np.memmaps of these
+    DOES: len(), [i], [i:j], iteration - like a list of strings.
+          Pickles as just the file names, so it is cheap to send to parallel
+          GridSearch worker processes, and the workers share the OS's cached
+          pages of the files instead of each having a copy of the docs.
+          (sklearn indexes it in the workers to get each cv split's docs)
+          remove() the files when done.
+
+    Example:
+        corpus = skHelper.MappedCorpus(docs)
+        gs = GridSearchCV(pipeline, params, n_jobs=4, ...).fit(corpus, y)
+        corpus.remove()
+    """
+    def __init__(self,
+                docs,           # list (iterable) of doc strings
+                dir=None,       # directory for the files. Default: temp dir
+                ):
+        fd, self.fileName = tempfile.mkstemp(prefix='MappedCorpus', dir=dir)
+        self.offsetsFileName = self.fileName + '.offsets.npy'
+
+        offsets = [0]
+        with os.fdopen(fd, 'wb') as fp:
+            for doc in docs:
+                data = doc.encode('utf-8')
+                fp.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.save(self.offsetsFileName, np.array(offsets, dtype=np.int64))
+        self.openFiles()
+
+    def openFiles(self):
+        self.offsets = np.load(self.offsetsFileName, mmap_mode='r')
+        if self.offsets[-1] == 0:       # can't mmap an empty file
+            self.data = b''
+        else:
+            self.data = np.memmap(self.fileName, dtype=np.uint8, mode='r')
+
+    def __len__(self): return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ self[j] for j in range(*i.indices(len(self))) ]
+        i = operator.index(i)
+        if i < 0: i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError('MappedCorpus index out of range')
+        return bytes(self.data[self.offsets[i]:self.offsets[i+1]]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+
+    def __getstate__(self):
+        return {'fileName'        : self.fileName,
+                'offsetsFileName' : self.offsetsFileName}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.openFiles()
+
+    def remove(self):
+        """ Remove the files. (this object is unusable afterward)
+        """
+        self.data = self.offsets = None
+        for fileName in [self.fileName, self.offsetsFileName]:
+            if os.path.exists(fileName): os.remove(fileName)
+# end class MappedCorpus ----------
+
+def splitPipeline(pipeline,             # Pipeline
+                stepName='vectorizer',  # name of the last step of the front
+    ):
+    '''
+    Return (front, rest) Pipelines: the steps up to & including stepName,
+        and the steps after it. They share the step objects w/ pipeline.
+    Pipeline(front.steps + rest.steps) is equivalent to pipeline.
+    '''
+    stepNames = [ name for name, step in pipeline.steps ]
+    if stepName not in stepNames or stepName == stepNames[-1]:
+        raise ValueError("Pipeline has no '%s' step before its last step" \
+                                                                    % stepName)
+    i = stepNames.index(stepName) + 1
+    return Pipeline(pipeline.steps[:i]), Pipeline(pipeline.steps[i:])
+# ---------------------------
+
+def partialFitPipeline(pipeline,        # Pipeline, last step has partial_fit()
+                        batches,        # iterable of (docs, y) minibatches
+                        classes,        # all the y values, e.g., [0,1]
+    ):
+    '''
+    Train pipeline incrementally, one minibatch at a time - for training sets
+        too big for memory: batches can be a generator reading sample files.
+    The classifier (last step) must have partial_fit().
+    Each earlier step must either have partial_fit() (e.g.,
+        HashingVectorizer), or be stateless (StemmingPreprocessor) & is fit on
+        the 1st batch only.
+    Empty minibatches are skipped.
+    Raise ValueError if the pipeline can't be trained this way
+        (see checkPartialFitPipeline()).
+    Return the (trained) pipeline.
+    '''
+    transformers, classifier = checkPartialFitPipeline(pipeline)
+
+    isFirstBatch = True
+    for docs, y in batches:
+        if len(y) == 0: continue
+        X = docs
+        for name, step in transformers:
+            if hasattr(step, 'partial_fit'): step.partial_fit(X, y)
+            elif isFirstBatch:               step.fit(X, y)
+            X = step.transform(X)
+        classifier.partial_fit(X, y, classes=classes)
+        isFirstBatch = False
+    return pipeline
+# ---------------------------
+
+def checkPartialFitPipeline(pipeline,   # Pipeline
+    ):
+    '''
+    Raise ValueError if pipeline can't be trained by partialFitPipeline().
+    Else return ([(name, transformer step), ...], classifier step)
+    '''
+    steps = [ (name, step) for name, step in pipeline.steps
+                                if step is not None and step != 'passthrough' ]
+    transformers = steps[:-1]
+    classifierName, classifier = steps[-1]
+
+    if not hasattr(classifier, 'partial_fit'):
+        raise ValueError("Pipeline step '%s' has no partial_fit()" \
+                                                            % classifierName)
+    for name, step in transformers:
+        if not hasattr(step, 'partial_fit') and \
+                                not isinstance(step, StemmingPreprocessor):
+            raise ValueError("Pipeline step '%s' can't be trained " % name +
+                "incrementally: it needs partial_fit() or to be stateless")
+    return transformers, classifier
+# ---------------------------
+
+class VectorizedDocCache (object):
+    """
+    IS:   a directory of vectorized document matrices, so running the same
+            vectorizer (or the front of a Pipeline, see splitPipeline())
+            over the same docs again can be skipped
+    HAS:  cacheDir, hit/miss counts.
+          For each cached result, files named by a hash of the docs and the
+            vectorizer:
+            <key>.npz - the (sparse) vectorized matrix
+            <key>.pkl - the fitted vectorizer (for fitTransform() results)
+          The .pkl is written before the .npz, so an .npz marks a complete
+            entry. A missing/unreadable .pkl is treated as a miss.
+    DOES: fitTransform(vectorizer, docs, y) - keyed by the docs, y, &
+            vectorizer.get_params()
+          transform(fittedVectorizer, docs) - keyed by the docs & a hash of
+            the pickled fitted vectorizer (e.g., its vocabulary)
+          Results that are not sparse matrices are not cached.
+    """
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        os.makedirs(cacheDir, exist_ok=True)
+        self.numHits = 0
+        self.numMisses = 0
+        self.fittedKeys = {}    # {id(fitted vectorizer) : (it, its pkl hash)}
+
+    def fitTransform(self, vectorizer, docs, y=None):
+        """ Return (fitted vectorizer, X) for vectorizer.fit_transform(docs,y)
+            The returned vectorizer is vectorizer itself if it was fit.
+            y is part of the key since a supervised step (e.g., feature
+            selection) fits differently for different y.
+        """
+        docs = list(docs)
+        if y is not None: y = np.asarray(y)
+        key = hashObject( ('fitTransform', type(vectorizer).__name__,
+                                            vectorizer.get_params(), docs, y) )
+        fitted = self.loadFitted(key)
+        X = self.loadMatrix(key) if fitted is not None else None
+        if X is not None:
+            self.numHits += 1
+            return fitted, X
+        self.numMisses += 1
+
+        X = vectorizer.fit_transform(docs, y)
+        if scipy.sparse.issparse(X):        # .pkl 1st, the .npz commits it
+            self.saveFile(key, '.pkl', lambda fp: pickle.dump(vectorizer, fp,
+                                            protocol=pickle.HIGHEST_PROTOCOL))
+            self.saveMatrix(key, X)
+        return vectorizer, X
+
+    def transform(self, fittedVectorizer, docs):
+        """ Return X for fittedVectorizer.transform(docs)
+        """
+        docs = list(docs)
+        key = hashObject( ('transform', self.getFittedKey(fittedVectorizer),
+                                                                        docs) )
+        X = self.loadMatrix(key)
+        if X is not None:
+            self.numHits += 1
+            return X
+        self.numMisses += 1
+
+        X = fittedVectorizer.transform(docs)
+        self.saveMatrix(key, X)
+        return X
+
+    def getFittedKey(self, fittedVectorizer):
+        """ Return a hash of the pickled fittedVectorizer.
+            Pickling is much faster than joblib.hash() walking a big
+            vocabulary, and the hash is remembered for this object.
+            Each load of the same model pkl file gets the same hash (the
+            original object may not: e.g., stop_words_ set order).
+        """
+        known = self.fittedKeys.get(id(fittedVectorizer))
+        if known is not None and known[0] is fittedVectorizer:
+            return known[1]
+        key = hashlib.sha1(pickle.dumps(fittedVectorizer,
+                                protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        self.fittedKeys[id(fittedVectorizer)] = (fittedVectorizer, key)
+        return key
+
+    def getFileName(self, key, ext):
+        return os.path.join(self.cacheDir, key + ext)
+
+    def loadMatrix(self, key):
+        """ Return cached matrix for key or None (if missing/unreadable)
+        """
+        fileName = self.getFileName(key, '.npz')
+        if not os.path.exists(fileName): return None
+        try:
+            return scipy.sparse.load_npz(fileName)
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def loadFitted(self, key):
+        """ Return cached fitted vectorizer for key or None
+            (if missing/unreadable)
+        """
+        fileName = self.getFileName(key, '.pkl')
+        if not os.path.exists(fileName): return None
+        try:
+            with open(fileName, 'rb') as fp:
+                return pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def saveMatrix(self, key, X):
+        """ Save X to the cache if it is sparse. Return True if saved.
+        """
+        if not scipy.sparse.issparse(X): return False
+        self.saveFile(key, '.npz', lambda fp: scipy.sparse.save_npz(fp, X))
+        return True
+
+    def saveFile(self, key, ext, write):
+        """ Write a cache file via write(fp), renaming it into place when
+            done so a concurrent/interrupted run never sees a partial file.
+            (for an entry w/ several files, write the .npz last)
+        """
+        fileName = self.getFileName(key, ext)
+        fd, tmpFileName = tempfile.mkstemp(dir=self.cacheDir, suffix=ext)
+        with os.fdopen(fd, 'wb') as fp:
+            write(fp)
+        os.replace(tmpFileName, fileName)
+
+    def getNumHits(self):   return self.numHits
+    def getNumMisses(self): return self.numMisses
+# end class VectorizedDocCache ----------
+
 # ---------------------------
 # Stemming....
 # Probably best to preprocess the whole data set once
@@ -245,6 +879,113 @@ class FeatureDocCounter(BaseEstimator, TransformerMixin):
 stemmer = nltk.EnglishStemmer()
 token_re = re.compile("\\b([a-z_]\w+)\\b",re.IGNORECASE) # match words
 
+class StemCache (object):
+    """
+    IS:   a memo table of stemmer.stem() results: {word : stem}.
+          Since most word occurrences in a corpus are repeats of a fairly
+          small vocabulary (Zipf), this saves most of the stemming time.
+    HAS:  the stemmer, a bounded LRU dict of words & their stems,
+          hit/miss counts
+    DOES: stem a word, stem all the words in a text,
+          save/load the memo table to/from a file
+
+    The memo table lives in one process. Worker processes (e.g., joblib
+        workers in StemmingPreprocessor or GridSearchCV) each have their own
+        copy, and only the counts & stems a caller adds back via
+        addCounts() and update() show up in this process's StemCache.
+    """
+    def __init__(self, stemmer, maxSize=200000):
+        self.stemmer = stemmer
+        self.maxSize = maxSize
+        self.stems = OrderedDict()      # {word : stem}, least recent 1st
+        self.numHits = 0
+        self.numMisses = 0
+        self.usedStems = None   # if a dict, {word : stem} of each word
+                                #  stemmed (hit or miss) since it was set
+
+    def stem(self, word):
+        stem = self.stems.get(word)
+        if stem is None:
+            self.numMisses += 1
+            stem = self.stemmer.stem(word)
+            self.stems[word] = stem
+            if len(self.stems) > self.maxSize:
+                self.stems.popitem(last=False)  # forget least recently used
+        else:
+            self.numHits += 1
+            self.stems.move_to_end(word)
+        if self.usedStems is not None: self.usedStems[word] = stem
+        return stem
+
+    def stemText(self, text):
+        """ Return string: " stem1 stem2 ..." for the words in text
+            (or '' if no words)
+        """
+        stem = self.stem
+        stems = [ stem(w) for w in token_re.findall(text) ]
+        if not stems: return ''
+        return ' ' + ' '.join(stems)
+
+    def getNumHits(self):   return self.numHits
+    def getNumMisses(self): return self.numMisses
+    def getHitRate(self):
+        total = self.numHits + self.numMisses
+        if total == 0: return 0.0
+        return self.numHits / total
+    def getSize(self):      return len(self.stems)
+
+    def addCounts(self, numHits, numMisses):
+        """ Add hit/miss counts of stemming done by another StemCache
+            (e.g., in a worker process)
+        """
+        self.numHits += numHits
+        self.numMisses += numMisses
+        return self
+
+    def update(self, wordStems):
+        """ Add [(word, stem), ...] to the memo table (as most recently used)
+        """
+        for word, stem in wordStems:
+            self.stems[word] = stem
+            self.stems.move_to_end(word)
+        while len(self.stems) > self.maxSize:
+            self.stems.popitem(last=False)
+        return self
+
+    def clear(self):
+        self.stems = OrderedDict()
+        self.numHits = 0
+        self.numMisses = 0
+
+    def save(self, outFile,     # file pathname or open file obj (binary)
+        ):
+        """ Write the memo table to outFile (hit/miss counts are not saved)
+        """
+        if type(outFile) == type(''): fp = open(outFile, 'wb')
+        else: fp = outFile
+
+        pickle.dump(list(self.stems.items()), fp)
+
+        if type(outFile) == type(''): fp.close()
+        return self
+
+    def load(self, inFile,      # file pathname or open file obj (binary)
+        ):
+        """ Add the words & stems from a file written by save() to the memo
+            table (as most recently used)
+        """
+        if type(inFile) == type(''): fp = open(inFile, 'rb')
+        else: fp = inFile
+
+        self.update(pickle.load(fp))
+
+        if type(inFile) == type(''): fp.close()
+        return self
+# ---------------------------
+
+stemCache = StemCache(stemmer)  # used by all the stemming code below
+                                #  (one per process)
+
 class StemmedCountVectorizer(CountVectorizer):
     def build_preprocessor(self):# override super's build_preprocessor method
         '''
@@ -259,10 +1000,7 @@ class StemmedCountVectorizer(CountVectorizer):
         #  functionality implemented in the preprocessor.
         # (at the cost of an extra tokenizing step)
         def my_preprocessor( doc):
-            output = ''
-            for m in token_re.finditer( preprocessor(doc) ):
-                output += " " + stemmer.stem(m.group())
-            return output
+            return stemCache.stemText( preprocessor(doc) )
 
         return my_preprocessor
 # ---------------------------
@@ -281,12 +1019,101 @@ class StemmedTfidfVectorizer(TfidfVectorizer):
         #  functionality implemented in the preprocessor.
         # (at the cost of an extra tokenizing step)
         def my_preprocessor( doc):
-            output = ''
-            for m in token_re.finditer( preprocessor(doc) ):
-                output += " " + stemmer.stem(m.group())
-            return output
+            return stemCache.stemText( preprocessor(doc) )
 
         return my_preprocessor
+# ---------------------------
+
+def stemDocuments(docs,                 # list of doc strings
+                lowercase=True,         # lower case docs before stemming
+                removeURLs=False,       # remove URLs before stemming
+    ):
+    '''
+    Return list of the stemmed docs, " stem1 stem2 ...", using stemCache.
+    With the defaults, each stemmed doc is the same as what the
+        StemmedCountVectorizer preprocessor returns.
+    '''
+    stemmedDocs = []
+    for doc in docs:
+        if lowercase:  doc = doc.lower()
+        if removeURLs: doc = urls_re.sub(' ', doc)
+        stemmedDocs.append(stemCache.stemText(doc))
+    return stemmedDocs
+# ---------------------------
+
+def _stemChunk(docs, lowercase, removeURLs):
+    '''
+    Run stemDocuments() in a worker process.
+    Return (stemmed docs, num stemCache hits, num stemCache misses,
+            [(word, stem), ...] of the distinct words in the docs)
+        so the caller can add the worker's counts & stems to its stemCache.
+    '''
+    hits, misses = stemCache.getNumHits(), stemCache.getNumMisses()
+    stemCache.usedStems = {}
+    try:
+        stemmedDocs = stemDocuments(docs, lowercase, removeURLs)
+    finally:
+        usedStems, stemCache.usedStems = stemCache.usedStems, None
+    return (stemmedDocs, stemCache.getNumHits() - hits,
+                            stemCache.getNumMisses() - misses,
+                            list(usedStems.items()))
+# ---------------------------
+
+class StemmingPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    IS:   an sklearn Transformer that stems documents, to put in a Pipeline
+            in front of a (non-stemming) vectorizer.
+    HAS:  n_jobs - number of processes to stem in (joblib convention:
+            1 = no parallelism, -1 = all cpus)
+          chunkSize - number of docs to send to a process at a time
+          lowercase, removeURLs - see stemDocuments()
+    DOES: transform(docs) returns the list of stemmed docs.
+
+    Unlike the Stemmed*Vectorizers, stemming here is outside of the
+        vectorizer, so big doc lists can be split into chunks and stemmed in
+        parallel. Each worker process has its own stemCache (the memo tables
+        are not shared), but the workers' hit/miss counts and stems are
+        added to stemCache in this process, so stemCache.getHitRate() covers
+        all the stemming done by transform() and stemCache.save() includes
+        the workers' stems.
+    It has no state beyond its params, so it pickles w/ the trained model
+        and predicting w/ the model stems the same way (w/ the same n_jobs).
+
+    Example:
+        pipeline = Pipeline( [
+        ('stemmer',    skHelper.StemmingPreprocessor(n_jobs=4)),
+        ('vectorizer', CountVectorizer(stop_words='english'),),
+        ('classifier', SGDClassifier() ),
+        ] )
+    """
+    def __init__(self, n_jobs=1, chunkSize=200, lowercase=True,
+                                                        removeURLs=False):
+        self.n_jobs = n_jobs
+        self.chunkSize = chunkSize
+        self.lowercase = lowercase
+        self.removeURLs = removeURLs
+
+    def fit(self, X, y=None, **fit_params):
+        '''nothing to actually fit'''
+        return self
+
+    def transform(self, X):
+        docs = list(X)
+        if self.n_jobs in (None, 1) or len(docs) <= self.chunkSize:
+            return stemDocuments(docs, self.lowercase, self.removeURLs)
+
+        chunks = [ docs[i:i+self.chunkSize]
+                                for i in range(0, len(docs), self.chunkSize) ]
+        results = Parallel(n_jobs=self.n_jobs)( \
+                        delayed(_stemChunk)(c, self.lowercase, self.removeURLs)
+                                                            for c in chunks)
+        stemmedDocs = []
+        for chunk, numHits, numMisses, wordStems in results:
+            stemmedDocs.extend(chunk)
+            stemCache.addCounts(numHits, numMisses)
+            stemCache.update(wordStems)
+        return stemmedDocs
+# end class StemmingPreprocessor ----------
 
 # ---------------------------
 
@@ -306,13 +1133,10 @@ def vectorizer_preprocessor_stem(input):
     To use:
     vectorizer = CountVectorizer(preprocessor=vectorizer_preprocessor_stem)
     '''
-    output = ''
-    
-    for s in urls_re.split(input):	# split (and remove) URLs
-        s.lower()
-        for m in token_re.finditer(s):
-            output += " " + stemmer.stem(m.group())
-    return output
+    # URLs always end at a space or the end of the text, so replacing them
+    #  w/ a space doesn't change the words found around them.
+    # (stemmer.stem() lower cases)
+    return stemCache.stemText( urls_re.sub(' ', input) )
 # ---------------------------
 
 def vectorizer_preprocessor(input):
@@ -322,11 +1146,7 @@ def vectorizer_preprocessor(input):
     Currently: lower case everything, remove URLs 
     To use: vectorizer = CountVectorizer(preprocessor=vectorizer_preprocessor)
     '''
-    output = ''
-
-    for s in urls_re.split(input):
-        output += ' ' + s.lower() 
-    return output
+    return ''.join([ ' ' + s.lower() for s in urls_re.split(input) ])
 # ---------------------------
 
 stemmingNotes= \
@@ -375,6 +1195,11 @@ stemmingNotes= \
         * OR override build_tokenizer() (and ultimately tokenizer())
             * you'd have to figure out where to stick stemming into the process
             * seems painful as the tokenizer does a lot (I haven't tried this) 
+    * Put a StemmingPreprocessor step in front of the vectorizer in the
+        Pipeline.
+            * stems in parallel (n_jobs) & you can tune w/ or w/o the step
+            * stems before the vectorizer's preprocessor() - so do
+                any other preprocessing here too (lowercase, removeURLs)
     * Pass your own preprocessor() function at Vectorizer instantiation.
             * equivalent to the last option above
             * BUT you can include/exclude this preprocessor() option to test
@@ -6,7 +6,11 @@
 import sys
 import os.path
 import re
+import codecs
 import configparser
+from copy import copy
+from array import array
+from bisect import bisect_right
 
 #-----------------------------------
 
@@ -37,25 +41,84 @@ def getConfig(fileName,         # config filename to look for
 
 nonAsciiRE = re.compile(r'[^\x00-\x7f]')        # match non-ascii chars
 
+def _nonAsciiToSpaces(err):
+    """ codecs error handler: replace each unencodable char w/ a space """
+    return ' ' * (err.end - err.start), err.end
+
+codecs.register_error('MLtextUtils.nonAsciiToSpaces', _nonAsciiToSpaces)
+
 def removeNonAscii(text):
-    return nonAsciiRE.sub(' ',text)
+    """ Return text with each non-ascii char replaced by a space.
+        (same as nonAsciiRE.sub(' ', text), but faster)
+    """
+    if text.isascii(): return text
+    return text.encode('ascii', 'MLtextUtils.nonAsciiToSpaces').decode('ascii')
+
+def removeNonAsciiBatch(texts):
+    """ Return list of removeNonAscii(t) for the texts """
+    return [ t if t.isascii() else
+            t.encode('ascii', 'MLtextUtils.nonAsciiToSpaces').decode('ascii')
+                                                                for t in texts ]
 #-----------------------------------
 
 urls_re = re.compile(r'\b(?:https?://|www[.]|doi)\S*',re.IGNORECASE)
 
+def _mayHaveURLs(lowerText):
+    """ Return True if urls_re could match the text that lowers to lowerText.
+        (if False, there are no URLs to remove)
+        The only non-ascii char urls_re matches case insensitively that
+        doesn't lower to an ascii letter is dotless i (for the 'i' in 'doi')
+    """
+    return 'http' in lowerText or 'www.' in lowerText \
+                or 'doi' in lowerText or 'do\u0131' in lowerText
+
+# urls_re for already lower cased text (no IGNORECASE needed).
+#  long s and dotless i are the only chars (that lower to 1 char) that urls_re
+#  matches case insensitively that don't lower to the ascii letter.
+# Same as r'\b(?:http[s\u017f]?://|www[.]|do[i\u0131])\S*', but starting w/
+#  a char set lets the re engine skip ahead quickly to possible matches
+lowerURLs_re = re.compile(r'[hwd](?<!\w[hwd])' +
+            r'(?:(?<=h)ttp[s\u017f]?://|(?<=w)ww[.]|(?<=d)o[i\u0131])\S*')
+
 def removeURLsLower(text):
     """ Return text with URLs/DOIs removed and everything in lower case
     """
-    return ' '.join(urls_re.split(text)).lower()
+    lowerText = text.lower()
+    if not _mayHaveURLs(lowerText): return lowerText
+
+    # If each char lowers to one char & w/o capital sigma (whose lower case
+    #  depends on the next char), lowerText chars correspond to text chars
+    #  and we can remove URLs from lowerText directly
+    if len(lowerText) == len(text) and '\u03a3' not in text:
+        return lowerURLs_re.sub(' ', lowerText)
+    return urls_re.sub(' ', text).lower()
+
+def removeURLsLowerBatch(texts):
+    """ Return list of removeURLsLower(t) for the texts """
+    return [ removeURLsLower(t) for t in texts ]
 #-----------------------------------
 
 token_re = re.compile(r'\b(\w+)\b',re.IGNORECASE)
 
+# for ascii text: map all non-word chars to space, so tokens = str.split()
+_asciiNonWordChars = ''.join([ chr(i) for i in range(128)
+                            if not (chr(i).isalnum() or chr(i) == '_') ])
+_asciiNonWordToSpace = str.maketrans(_asciiNonWordChars,
+                                                ' ' * len(_asciiNonWordChars))
+
 def tokenPerLine(text):
     """ Return the text with all punctuation removed and each alphanumeric
         token on a line by itself (in token order)
     """
-    return '\n'.join([m.group() for m in token_re.finditer(text)]) + '\n'
+    if text.isascii():
+        tokens = text.translate(_asciiNonWordToSpace).split()
+    else:
+        tokens = token_re.findall(text)
+    return '\n'.join(tokens) + '\n'
+
+def tokenPerLineBatch(texts):
+    """ Return list of tokenPerLine(t) for the texts """
+    return [ tokenPerLine(t) for t in texts ]
 
 #-----------------------------------
 # Text Transformation utilities
@@ -77,6 +140,55 @@ class MatchRcd (object):
         self.postText  = postText       # context chars after the match
         self.replText  = replText       # the string that replaced the match
 
+    def getReportKey(self):
+        """ Return the key matches are aggregated by in match reports.
+            (order of these fields is intentional so matches sort nicely)
+        """
+        return (self.matchType, self.matchText, self.postText, self.preText,
+                                                                self.replText)
+
+class MatchCounts (object):
+    """
+    IS: counts of matches aggregated by MatchRcd report key:
+            (matchType, matchText, postText, preText, replText)
+        Like keeping all the MatchRcds and counting them later, but memory
+        only grows w/ the number of distinct keys.
+    HAS: {key : count}
+         maxKeys - optional limit on the number of distinct keys. Once there
+            are maxKeys keys, matches w/ new keys are only counted by matchType
+            as "overflow" matches.
+    DOES: add a match, merge other MatchCounts into this one
+    """
+    def __init__(self, maxKeys=None):
+        self.maxKeys  = maxKeys
+        self.counts   = {}              # {report key : count}
+        self.overflow = {}              # {matchType : num overflow matches}
+
+    def add(self, key, n=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+        elif self.maxKeys is None or len(counts) < self.maxKeys:
+            counts[key] = n
+        else:
+            self.overflow[key[0]] = self.overflow.get(key[0], 0) + n
+
+    def merge(self, other):
+        """ Add the counts from the other MatchCounts to this one. Return self
+        """
+        for key, n in other.counts.items():
+            self.add(key, n)
+        for matchType, n in other.overflow.items():
+            self.overflow[matchType] = self.overflow.get(matchType, 0) + n
+        return self
+
+    def getCounts(self):   return self.counts       # {report key : count}
+    def getOverflow(self): return self.overflow     # {matchType : count}
+    def getNumMatches(self):
+        return sum(self.counts.values()) + sum(self.overflow.values())
+
+# end class MatchCounts -----------------------------------
+
 class TextMapping (object):
     """
     IS: A named mapping between a regex and some text that should replace
@@ -87,6 +199,7 @@ class TextMapping (object):
     DOES: Computes replacement strings for a given matching text.
           Keeps track of the strings that were matched & replaced (MatchRcds)
             so you can get a report of what matched.
+          OR in "countsOnly" mode, just keeps MatchCounts, not MatchRcds.
     """
     def __init__(self, name, regex, replacement, context=0):
         self.name = name
@@ -94,54 +207,141 @@ class TextMapping (object):
         self.replacement = replacement
         self.numChars = context  # num of chars around the matching text to
                                  #   keep when recording matches to this mapping
+        self.countsOnly = False
+        self.maxKeys = None
+        self.resetMatches()
+
+    def setCountsOnly(self, countsOnly=True, maxKeys=None):
+        """ If countsOnly, aggregate matches into MatchCounts (w/ optional
+                maxKeys) instead of keeping MatchRcds.
+            Forgets any matches we already have.
+        """
+        self.countsOnly = countsOnly
+        self.maxKeys = maxKeys
         self.resetMatches()
 
     def resetMatches(self):
         """ Initialize the matchRcds, forgetting any rcds we already have.
         """
         self.matchRcds = []
+        if self.countsOnly: self.matchCounts = MatchCounts(self.maxKeys)
+        else:               self.matchCounts = None
 
     def getMatchRcds(self):
         """ Return list of MatchRcds since the last self.resetMatches()
+            (always empty in countsOnly mode)
         """
         return self.matchRcds
 
-    def foundMatch(self, text, start, end):
-        """ Process the fact that text[start:end] matched this TextMapping.
-            Register the match and
-            Return the string that should replace text[start:end].
+    def getMatchCounts(self):
+        """ Return MatchCounts of the matches since the last resetMatches()
         """
-        matchText = text[start:end]
+        if self.countsOnly: return self.matchCounts
 
+        counts = MatchCounts()
+        for m in self.matchRcds:
+            counts.add(m.getReportKey())
+        return counts
+
+    def getReplacement(self, matchText):
+        """ Return the string that should replace matchText.
+            Does not register the match.
+        """
         if type(self.replacement) == type(''): # constant replacement string
-            replacement = self.replacement
+            return self.replacement
         else:                                  # function to call
-            replacement = self.replacement(matchText)
-            
+            return self.replacement(matchText)
+
+    def getMatchKey(self, text, start, end):
+        """ Return (report key, replacement) for text[start:end] matching
+                this TextMapping. Does not register the match.
+            The report key is MatchRcd.getReportKey() for the match.
+        """
+        matchText = text[start:end]
+        replacement = self.getReplacement(matchText)
+
         # Get n chars around the matching text
         preText  = text[max(0, start-self.numChars) : start]
         postText = text[end : end+self.numChars]
 
+        return (self.name, matchText, postText, preText, replacement), \
+                                                                    replacement
+
+    def foundMatch(self, text, start, end, offset=0):
+        """ Process the fact that text[start:end] matched this TextMapping.
+            Register the match and
+            Return the string that should replace text[start:end].
+            offset: position of text[0] in the whole text (if text is a piece
+                of a larger text), so MatchRcd positions are in the whole text
+        """
+        key, replacement = self.getMatchKey(text, start, end)
+
         # Record the match
-        matchRcd = MatchRcd(self.name, start, end, matchText, preText,
-                                                    postText, replacement)
-        self.matchRcds.append(matchRcd)
+        if self.countsOnly:
+            self.matchCounts.add(key)
+        else:
+            name, matchText, postText, preText, replacement = key
+            matchRcd = MatchRcd(name, start+offset, end+offset, matchText,
+                                            preText, postText, replacement)
+            self.matchRcds.append(matchRcd)
 
         return replacement
 
+    def __getstate__(self):
+        """ Pickle w/o the matches found so far (unpickled mappings start w/
+            no matches).
+            Note replacement functions must be picklable (no lambdas).
+        """
+        state = self.__dict__.copy()
+        state['matchRcds'] = []
+        state['matchCounts'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.resetMatches()
+
+    def getStringMatchMode(self):
+        """ Return None if this mapping can only be matched via self.regex.
+            Mappings built from a list of literal strings return
+            'exact' or 'squeeze' so TextTransformer can match them with an
+            AhoCorasick automaton instead (see TextMappingFromStrings).
+        """
+        return None
+
 # end class TextMapping -----------------------------------
 
 class TextMappingFromStrings (TextMapping):
     """
     IS: A TextMapping that is built from a set of strings. 
+        If trieRegex, the regex factors out common prefixes of the strings
+            (see buildTrieRegex()). Same matches, but much faster for large
+            string lists if the mapping is matched via its regex.
     """
-    def __init__(self, name, strings, replacement, context=0):
+    def __init__(self, name, strings, replacement, context=0, trieRegex=False):
+        self.strings = strings
+        self.trieRegex = trieRegex
         regex = self._buildRegex(strings)
         super().__init__(name, regex, replacement, context=context)
 
+    def getStrings(self): return self.strings
+
+    def getStringMatchMode(self):
+        """ 'exact': the strings match literally, surrounded by word boundaries
+            Return None if _str2regex() has been overridden since then we
+            cannot know what the regex matches.
+        """
+        if type(self)._str2regex is TextMappingFromStrings._str2regex:
+            return 'exact'
+        return None
+
     def _buildRegex(self, strings):
         """ Return a regex string that matches the list of strings
         """
+        mode = self.getStringMatchMode()
+        if self.trieRegex and mode:
+            return buildTrieRegex(strings, squeezeSpaces=(mode == 'squeeze'))
+
         regexes = [ self._str2regex(s) for s in strings ]
         return '|'.join(regexes)
 
@@ -161,7 +361,7 @@ class TextMappingFromFile (TextMappingFromStrings):
         'inFile' is either an open filepointer to read from
         or a filename (string)
     """
-    def __init__(self, name, inFile, replacement, context=0):
+    def __init__(self, name, inFile, replacement, context=0, trieRegex=False):
 
         if type(inFile) == type(''): fp = open(inFile, 'r')
         else: fp = inFile
@@ -173,7 +373,8 @@ class TextMappingFromFile (TextMappingFromStrings):
 
         if type(inFile) == type(''): fp.close()         # close if we opened it
 
-        super().__init__(name, strings, replacement, context=context)
+        super().__init__(name, strings, replacement, context=context,
+                                                        trieRegex=trieRegex)
 
     def _str2regex(self, s):
         """ Return a regex string that matches s:
@@ -183,6 +384,15 @@ class TextMappingFromFile (TextMappingFromStrings):
         """
         return r'\b' + squeezeAndEscape(s) + r'\b'
 
+    def getStringMatchMode(self):
+        """ 'squeeze': the strings match w/ arbitrary whitespace wherever they
+                have whitespace, surrounded by word boundaries.
+            Return None if _str2regex() has been overridden.
+        """
+        if type(self)._str2regex is TextMappingFromFile._str2regex:
+            return 'squeeze'
+        return None
+
 # end class TextMappingFromFile  -----------------------------------
 
 #---------------------------------
@@ -205,6 +415,108 @@ def squeezeAndEscape(s):
     """
     return r'\s+'.join( [re.escape(w) for w in s.split()] )
 
+def buildTrieRegex(strings, squeezeSpaces=False):
+    """ Return a regex string that matches the same text as
+            '|'.join([escAndWordBoundaries(s) for s in strings])
+        or if squeezeSpaces,
+            '|'.join([r'\b' + squeezeAndEscape(s) + r'\b' for s in strings])
+        but with common prefixes factored out, e.g.,
+            ['gene', 'genes', 'genome'] -> r'\b(?:gen(?:e(?:s)??|ome))\b'
+        so the regex engine doesn't try thousands of alternatives at each
+        position.
+        The alternation order of the strings is preserved wherever it matters
+        (i.e., when a string that is a prefix of another can match), so the
+        first string in the list that matches still wins.
+        Also works w/ or w/o re.IGNORECASE.
+    """
+    # each string is a sequence of "atoms", tuples: (matching key, regex)
+    seqs = []
+    seen = set()
+    for s in strings:
+        if squeezeSpaces:
+            atoms = [ _SPACE_ATOM ]
+            for w in s.split():
+                atoms.extend([ (_atomKey(c), re.escape(c)) for c in w ])
+                atoms.append(_SPACE_ATOM)
+            atoms = tuple(atoms[1:-1])
+        else:
+            atoms = tuple([ (_atomKey(c), re.escape(c)) for c in s ])
+        if atoms not in seen:           # duplicates can never match
+            seen.add(atoms)
+            seqs.append(atoms)
+
+    return r'\b(?:' + _trieRegex(seqs, 0) + r')\b'
+
+_SPACE_ATOM = (' ', r'\s+')
+
+# chars that match each other when ignoring case, beyond what lower() says
+#  (from the regex module's case insensitive equivalences)
+_caseEquivalents = {'\u0131': 'i', '\u017f': 's', '\u03bc': '\u00b5',
+    '\u03b9': '\u0345', '\u1fbe': '\u0345', '\u1fd3': '\u0390',
+    '\u1fe3': '\u03b0', '\u03d0': '\u03b2', '\u03f5': '\u03b5',
+    '\u03d1': '\u03b8', '\u03f0': '\u03ba', '\u03d6': '\u03c0',
+    '\u03f1': '\u03c1', '\u03c3': '\u03c2', '\u03d5': '\u03c6',
+    '\u1e9b': '\u1e61', '\ufb06': '\ufb05', }
+
+def _atomKey(c):
+    """ Return a key for char c so chars that might match the same text
+        char (when ignoring case) have the same key
+    """
+    low = c.lower()[:1]
+    return _caseEquivalents.get(low, low)
+
+def _trieRegex(seqs, d):
+    """ Return regex for the alternation of the atom sequences seqs[i][d:],
+            trying them in list order.
+        Assumes: all seqs have the same atoms before d and are distinct.
+    """
+    prefix = ''
+    while True:         # factor out atoms that all seqs share
+        ends = [ i for i, seq in enumerate(seqs) if len(seq) == d ]
+        if ends or len(set([ seq[d] for seq in seqs ])) > 1:
+            break
+        prefix += seqs[0][d][1]
+        d += 1
+
+    if not ends:
+        regex, numAlts = _trieAlternation(seqs, d)
+        if numAlts > 1: regex = '(?:' + regex + ')'
+        return prefix + regex
+
+    # one seq ends here (the empty alternative): keep it in its order
+    e = ends[0]
+    before = _trieAlternation(seqs[:e], d)[0]
+    after  = _trieAlternation(seqs[e+1:], d)[0]
+    if before and after: regex = '(?:' + before + '||' + after + ')'
+    elif before:         regex = '(?:' + before + ')?'      # greedy
+    elif after:          regex = '(?:' + after + ')??'      # lazy
+    else:                regex = ''
+    return prefix + regex
+
+def _trieAlternation(seqs, d):
+    """ Return (regex, number of alternatives in regex) for the alternation of
+            the nonempty sequences seqs[i][d:], trying them in list order.
+        Seqs whose atoms at d have different keys can never both match at the
+            same place, so they can be reordered to group common prefixes.
+    """
+    groups = {}                 # {atom key: [seqs w/ that key at d]}
+    for seq in seqs:
+        groups.setdefault(seq[d][0], []).append(seq)
+
+    alts = []
+    for group in groups.values():
+        # within a group, only merge consecutive seqs w/ the same atom
+        run = [ group[0] ]
+        for seq in group[1:]:
+            if seq[d] == run[0][d]:
+                run.append(seq)
+            else:
+                alts.append(run[0][d][1] + _trieRegex(run, d+1))
+                run = [ seq ]
+        alts.append(run[0][d][1] + _trieRegex(run, d+1))
+
+    return '|'.join(alts), len(alts)
+
 def spacedOutRegex(s):
     # for given str, return regex pattern str that matches the chars
     #  in the str with optional spaces between the chars.
@@ -217,6 +529,197 @@ def spacedOutRegex(s):
 
 #---------------------------------
 
+nonSpaceRE = re.compile(r'\S+')
+
+def isWordChar(c):
+    """ Return True if the char c is a regex word char (alphanumeric or '_')"""
+    return c.isalnum() or c == '_'
+
+def isWordBoundary(text, i):
+    """ Return True if a regex word boundary matches at position i in text,
+        i.e., exactly one of text[i-1] and text[i] is a word char.
+    """
+    before = i > 0 and isWordChar(text[i-1])
+    after  = i < len(text) and isWordChar(text[i])
+    return before != after
+
+def lowerSameLength(s):
+    """ Return s lower cased, but with each char lowered only if its lower
+        case is a single char (so positions in s and the result correspond)
+    """
+    low = s.lower()
+    if len(low) == len(s): return low
+    return ''.join([c if len(c.lower()) != 1 else c.lower() for c in s])
+
+class AhoCorasick (object):
+    """
+    IS: an Aho-Corasick automaton that finds all occurrences of a set of
+        literal strings in a text in one pass through the text, no matter how
+        many strings there are.
+        Each string has an associated value (e.g., its priority).
+    HAS: the automaton as parallel arrays indexed by state (node) number:
+            goto[node]    - dict {char: next node}
+            fail[node]    - the node to go to if there is no goto for a char
+            outLen[node]  - length of the string ending at node (0 = none)
+            outVal[node]  - the value of that string
+            outLink[node] - the next node along the fail chain that has an
+                            outLen (0 = none)
+    DOES: findAll(text) - return the occurrences of the strings in text
+          Optionally (to mimic escAndWordBoundaries() and squeezeAndEscape()
+                      regexes):
+            ignoreCase     - match case insensitively
+            squeezeSpaces  - whitespace in a string matches any run of
+                             whitespace in the text
+            wordBoundaries - only report occurrences surrounded by word
+                             boundaries (as in escAndWordBoundaries())
+    EXAMPLE:
+    # ac = AhoCorasick()
+    # for i, s in enumerate(['gene', 'genes', 'genome']): ac.addString(s, i)
+    # ac.build()
+    # ac.findAll('Genes and genomes and genes')   # [(0, 5, 1), (22, 27, 1)]
+    """
+    def __init__(self, ignoreCase=True, squeezeSpaces=False,
+                                                        wordBoundaries=True):
+        self.ignoreCase     = ignoreCase
+        self.squeezeSpaces  = squeezeSpaces
+        self.wordBoundaries = wordBoundaries
+
+        self.goto    = [{}]             # node 0 is the root
+        self.outLen  = [0]
+        self.outVal  = [None]
+        self.fail    = None             # set by build()
+        self.outLink = None
+        self.numStrings = 0
+
+    def _normalize(self, s):
+        """ Return s as the automaton sees it (squeezed, lower cased)
+        """
+        if self.squeezeSpaces: s = ' '.join(s.split())
+        if self.ignoreCase: s = lowerSameLength(s)
+        return s
+
+    def addString(self, s, value):
+        """ Add string s with its value.
+            If (normalized) s has already been added, the 1st value is kept.
+            Empty strings are ignored.
+        """
+        s = self._normalize(s)
+        if not s: return
+        node = 0
+        for c in s:
+            nxt = self.goto[node].get(c)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][c] = nxt
+                self.goto.append({})
+                self.outLen.append(0)
+                self.outVal.append(None)
+            node = nxt
+        if not self.outLen[node]:
+            self.outLen[node] = len(s)
+            self.outVal[node] = value
+            self.numStrings += 1
+
+    def build(self):
+        """ Compute the fail and output links. Call after the last addString()
+        """
+        goto = self.goto
+        fail    = array('l', [0]) * len(goto)
+        outLink = array('l', [0]) * len(goto)
+
+        queue = list(goto[0].values())          # breadth first from root
+        for node in queue:
+            for c, child in goto[node].items():
+                f = fail[node]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(c, 0)
+                fail[child] = f
+                outLink[child] = f if self.outLen[f] else outLink[f]
+                queue.append(child)
+
+        self.fail    = fail
+        self.outLink = outLink
+        return self
+
+    def getNumStrings(self): return self.numStrings
+
+    def findAll(self, text, pos=0):
+        """ Return list of (start, end, value) for every occurrence in text
+            of every string, sorted by start and then value.
+            text[start:end] is the occurrence in the original text.
+            (so end-start can differ from the string length if squeezeSpaces)
+            Only text[pos:] is scanned, so only occurrences starting at or
+            after pos are returned.
+        """
+        if self.fail is None: self.build()
+
+        if pos > 0:     # scan from the char before pos for word boundaries
+            before = pos - 1
+            return [ (start + before, end + before, value)
+                        for start, end, value in self.findAll(text[before:])
+                        if start > 0 ]
+
+        if self.squeezeSpaces:
+            # map each whitespace delimited token to its start in text and its
+            #   start in the squeezed text
+            origStarts = []
+            sqStarts   = []
+            tokens     = []
+            sqPos = 0
+            for m in nonSpaceRE.finditer(text):
+                origStarts.append(m.start())
+                sqStarts.append(sqPos)
+                tokens.append(m.group())
+                sqPos += len(tokens[-1]) + 1
+            bndText = ' '.join(tokens)          # for word boundary checks
+        else:
+            bndText = text
+
+        if self.ignoreCase: normText = lowerSameLength(bndText)
+        else:               normText = bndText
+
+        goto    = self.goto
+        fail    = self.fail
+        outLen  = self.outLen
+        outVal  = self.outVal
+        outLink = self.outLink
+        wordBnd = self.wordBoundaries
+
+        found = []
+        node = 0
+        for i, c in enumerate(normText):
+            nxt = goto[node].get(c)
+            while nxt is None and node:
+                node = fail[node]
+                nxt = goto[node].get(c)
+            node = nxt if nxt is not None else 0
+
+            o = node if outLen[node] else outLink[node]
+            while o:
+                end   = i + 1
+                start = end - outLen[o]
+                if not wordBnd or (isWordBoundary(bndText, start) and
+                                   isWordBoundary(bndText, end)):
+                    found.append( (start, end, outVal[o]) )
+                o = outLink[o]
+
+        if self.squeezeSpaces:          # map squeezed coords back to text
+            mapped = []
+            for start, end, value in found:
+                k = bisect_right(sqStarts, start) - 1
+                start = origStarts[k] + start - sqStarts[k]
+                k = bisect_right(sqStarts, end - 1) - 1
+                end = origStarts[k] + end - sqStarts[k]
+                mapped.append( (start, end, value) )
+            found = mapped
+
+        found.sort(key=lambda x: (x[0], x[2]))
+        return found
+# end class AhoCorasick -----------------------------------
+
+#---------------------------------
+
 class TextTransformer (object):
     """
     IS: an object that efficiently does a bunch of text transformations based
@@ -224,6 +727,16 @@ class TextTransformer (object):
         The idea is to make one honking regex from all the TextMappings so all
         the TextMappings can be applied in one pass through any text for
         efficiency.
+        If useAhoCorasick, TextMappingsFromStrings/File (w/ their standard
+        regexes) are not matched via the honking regex. Instead their strings
+        are matched via AhoCorasick automata, which is much faster for large
+        string lists. This is not exactly the same as re.IGNORECASE regex
+        matching, so it is off by default:
+            - the automata case fold via str.lower(), so case pairs that only
+              the re module folds do not match, e.g., 'ſ' (long s) vs. 's',
+              and 'İ' (lower cases to 2 chars) only matches itself
+            - empty strings are ignored (their regex matches the empty string
+              at every word boundary)
     HAS: list of TextMappings
          Order is important. If two TextMappings match the same text, the
              1st one wins and the second is not matched/applied
@@ -250,20 +763,55 @@ class TextTransformer (object):
     #     print("Matches For String %d\n" % i)
     #     print(tt.getReport())       # report of matches for this string
     #     tt.resetMatches()
+    #
+    ##  transformText() records matches in the mappings, so a TextTransformer
+    ##  can't be shared by threads that way. transformTextWithCounts() changes
+    ##  no state: each thread/process gets its own MatchCounts to merge:
+    # counts = MatchCounts()
+    # for c in pool.map(lambda s: tt.transformTextWithCounts(s)[1], strings):
+    #     counts.merge(c)
+    # print(tt.getReport(counts=counts))
+    ##  TextTransformers pickle w/o their matches (so can be sent to a process
+    ##  pool once) if their replacement functions pickle (no lambdas).
     """
     def __init__(self, mappings,        # list of TextMappings w/ distinct names
                 reFlags=re.IGNORECASE,  # default is to ignore case in matches
+                useAhoCorasick=False,   # match string mappings w/ AhoCorasick
+                countsOnly=False,       # only keep MatchCounts, not MatchRcds
+                maxReportKeys=None,     # if countsOnly, max num of distinct
+                                        #   report lines to keep per mapping
                 ):
         """ Assumes all the TextMappings have unique names that don't contain
             "<" or ">"
+            Mappings in a different countsOnly/maxReportKeys mode are copied,
+            so the mode of mappings shared w/ other TextTransformers is not
+            changed.
         """
         self.reFlags = reFlags
-        self.mappings = mappings                    # the list of mappings
+        self.countsOnly = countsOnly
+        self.mappings = [ self._inMode(m, countsOnly, maxReportKeys)
+                                                        for m in mappings ]
         self.mappingDict = self._buildMappingDict() # {name : mapping obj}
+        self.mappingIndex = { m.name : i for i, m in enumerate(self.mappings) }
+        self.useAhoCorasick = useAhoCorasick
         self.resetMatches()
         self.bigRegex = None
         self.bigRe = None
+        self.regexRe = None     # compiled regex of the non AhoCorasick maps
         self._buildBigRe()
+        self.automata = {}                          # {match mode: AhoCorasick}
+        self._buildAutomata()
+
+    @staticmethod
+    def _inMode(mapping, countsOnly, maxKeys):
+        """ Return the mapping if it is in the countsOnly/maxKeys mode, else
+            a copy of it in that mode
+        """
+        if mapping.countsOnly == countsOnly and mapping.maxKeys == maxKeys:
+            return mapping
+        mapping = copy(mapping)     # setCountsOnly() gives it its own matches
+        mapping.setCountsOnly(countsOnly, maxKeys=maxKeys)
+        return mapping
 
     def _buildMappingDict(self):
         """ Build a dict of names to TextMappings
@@ -277,44 +825,242 @@ class TextTransformer (object):
             d[m.name] = m
         return d
 
+    def _stringMatchMode(self, mapping):
+        """ Return the AhoCorasick match mode for the mapping or None if it
+            needs to be in the big regex
+        """
+        if not self.useAhoCorasick: return None
+        return mapping.getStringMatchMode()
+
     def _buildBigRe(self):
-        """ combine all the mappings into one big re
+        """ combine all the mappings into one big regex, and compile the
+            (non AhoCorasick) mappings into one big re to match with
         """
         # build a named group for each regex: e.g., '(?P<name>regex)'
         namedRegexes = ['(?P<' + m.name + '>' + m.regex + ')'
-                                                        for m in self.mappings] 
+                                                    for m in self.mappings]
         self.bigRegex = '|'.join(namedRegexes)
 
-        self.bigRe = re.compile(self.bigRegex, self.reFlags)
+        regexes = [ r for r, m in zip(namedRegexes, self.mappings)
+                                                if not self._stringMatchMode(m)]
+        if len(regexes) == len(namedRegexes):   # no AhoCorasick mappings
+            self.bigRe = re.compile(self.bigRegex, self.reFlags)
+            self.regexRe = self.bigRe
+        elif regexes:
+            self.regexRe = re.compile('|'.join(regexes), self.reFlags)
+        else:
+            self.regexRe = None                 # all AhoCorasick mappings
+
+    def _buildAutomata(self):
+        """ Put the strings of the string mappings into an AhoCorasick
+            automaton for each match mode.
+            Each string's value is its priority: (mapping index, string index)
+        """
+        ignoreCase = bool(self.reFlags & re.IGNORECASE)
+        for i, m in enumerate(self.mappings):
+            mode = self._stringMatchMode(m)
+            if not mode: continue
+
+            if mode not in self.automata:
+                self.automata[mode] = AhoCorasick(ignoreCase=ignoreCase,
+                                            squeezeSpaces=(mode == 'squeeze'))
+            ac = self.automata[mode]
+            for j, string in enumerate(m.getStrings()):
+                ac.addString(string, (i, j))
+
+        for ac in self.automata.values():
+            ac.build()
 
     def getBigRegex(self): return self.bigRegex
-    def getBigRe(self):    return self.bigRe
+    def getBigRe(self):
+        """ Return the compiled bigRegex (only compiled when asked for if
+            the string mappings are matched via AhoCorasick)
+        """
+        if self.bigRe is None:
+            self.bigRe = re.compile(self.bigRegex, self.reFlags)
+        return self.bigRe
+
+    def _iterMatches(self, text, pos=0, endpos=None):
+        """ Generator: (mapping name, start, end) for each successive
+            (non-overlapping) match in text that starts at or after pos
+            (and before endpos, if given - matches can end after endpos).
+            Same semantics as self.getBigRe().finditer() (except for the
+            AhoCorasick differences noted above):
+                the leftmost match wins, and for matches at the same start,
+                the 1st mapping (and 1st string in a string mapping) wins.
+        """
+        if not self.automata:                   # only have the big regex
+            # the mapping's named group is the whole match & closes last,
+            #  so m.lastgroup is its name (no need for findMatchingGroup())
+            for m in self.regexRe.finditer(text, pos):
+                if endpos is not None and m.start() >= endpos: return
+                yield m.lastgroup, m.start(), m.end()
+            return
+
+        # all AhoCorasick matches from pos on, sorted by start & priority
+        cands = []
+        for ac in self.automata.values():
+            cands.extend(ac.findAll(text, pos))
+        if len(self.automata) > 1: cands.sort(key=lambda x: (x[0], x[2]))
+
+        bigRe = self.regexRe
+        regexMatch = bigRe.search(text, pos) if bigRe else None
+                                # pos is where the next match can start
+        k = 0                   # next cand to consider
+        while True:
+            while k < len(cands) and cands[k][0] < pos:
+                k += 1
+            if regexMatch and regexMatch.start() < pos:
+                regexMatch = bigRe.search(text, pos)
+
+            if regexMatch:
+                name  = regexMatch.lastgroup
+                start = regexMatch.start()
+                end   = regexMatch.end()
+                if k < len(cands) and (cands[k][0] < start or
+                        (cands[k][0] == start and
+                            cands[k][2][0] < self.mappingIndex[name])):
+                    start, end, priority = cands[k]     # string match wins
+                    name = self.mappings[priority[0]].name
+            elif k < len(cands):
+                start, end, priority = cands[k]
+                name = self.mappings[priority[0]].name
+            else:
+                return
+
+            if endpos is not None and start >= endpos: return
+            yield name, start, end
+            pos = end if end > start else end + 1   # don't loop on empty match
 
     def transformText(self, text):
         """ Apply the mappings to the text. Return the transformed text
         """
-        transformed = ''
+        pieces = []             # unchanged slices & replacements, in order
         endOfLastMatch = 0      # end position in text of the last match
                                 #  processed so far
-        for m in self.bigRe.finditer(text):
-            name, start, end = findMatchingGroup(m)
-            replacement = self.mappingDict[name].foundMatch(text, start, end)
-            transformed += text[endOfLastMatch:start] + replacement
+        mappingDict = self.mappingDict
+        for name, start, end in self._iterMatches(text):
+            pieces.append(text[endOfLastMatch:start])
+            pieces.append(mappingDict[name].foundMatch(text, start, end))
             endOfLastMatch = end
 
-        transformed += text[endOfLastMatch:]
-        return transformed
+        if not pieces: return text              # no matches
+        pieces.append(text[endOfLastMatch:])
+        return ''.join(pieces)
+
+    def transformTextWithCounts(self, text, counts=None):
+        """ Apply the mappings to the text w/o changing any state of this
+                TextTransformer or its mappings (so it can be shared by
+                threads).
+            Return (the transformed text, MatchCounts of the matches).
+            If counts (a MatchCounts) is given, the matches are added to it.
+            Use getReport(counts=...) to report on (merged) MatchCounts.
+        """
+        if counts is None: counts = MatchCounts()
+
+        pieces = []
+        endOfLastMatch = 0
+        mappingDict = self.mappingDict
+        for name, start, end in self._iterMatches(text):
+            key, replacement = mappingDict[name].getMatchKey(text, start, end)
+            counts.add(key)
+            pieces.append(text[endOfLastMatch:start])
+            pieces.append(replacement)
+            endOfLastMatch = end
+
+        if not pieces: return text, counts
+        pieces.append(text[endOfLastMatch:])
+        return ''.join(pieces), counts
+
+    def transformStream(self, inFile, outFile, chunkSize=1048576, overlap=1024):
+        """ Apply the mappings to the text read from inFile, writing the
+                transformed text to outFile as we go, without holding the
+                whole text in memory.
+            inFile, outFile: file pathnames or file-like objects (text mode)
+            Reads chunkSize chars at a time. A match is only applied once
+                there are at least overlap chars (+ the max mapping context)
+                after its start in the buffer, so matches spanning chunk
+                boundaries and their MatchRcd context are the same as
+                transformText() on the whole text would find, as long as no
+                match is longer than overlap chars.
+            MatchRcd start/end are positions in the whole text.
+        """
+        if type(inFile) == type(''): inFp = open(inFile, 'r')
+        else: inFp = inFile
+        if type(outFile) == type(''): outFp = open(outFile, 'w')
+        else: outFp = outFile
+
+        maxContext = max([m.numChars for m in self.mappings] + [0])
+        keep = maxContext + 1   # chars to keep before the next match start
+                                #  for preText context and word boundaries
+        lookAhead = overlap + maxContext
+        mappingDict = self.mappingDict
+
+        buf = ''                # the text we are working on
+        bufStart = 0            # position of buf[0] in the whole text
+        pos = 0                 # position in buf where next match can start
+        outPos = 0              # position in buf up to which we've written
+        atEOF = False
+        while not atEOF:
+            chunk = inFp.read(chunkSize)
+            atEOF = not chunk
+            buf += chunk
+
+            if atEOF: safeEnd = len(buf)
+            else:     safeEnd = len(buf) - lookAhead    # matches starting
+            if safeEnd <= pos and not atEOF: continue   #  before here are final
+
+            pieces = []         # only scan from pos, the unprocessed text
+            for name, start, end in self._iterMatches(buf, pos, safeEnd):
+                pieces.append(buf[outPos:start])
+                pieces.append(mappingDict[name].foundMatch(buf, start, end,
+                                                            offset=bufStart))
+                outPos = end
+                pos = end if end > start else end + 1
+
+            # no match can start before safeEnd, so write through there
+            flushTo = max(outPos, safeEnd)
+            pieces.append(buf[outPos:flushTo])
+            outFp.write(''.join(pieces))
+            outPos = flushTo
+            pos = max(pos, outPos)
+
+            # drop what we don't need anymore
+            cut = max(0, outPos - keep)
+            buf = buf[cut:]
+            bufStart += cut
+            pos -= cut
+            outPos -= cut
+
+        if type(inFile) == type(''): inFp.close()
+        if type(outFile) == type(''): outFp.close()
+
+    def getMatchSpans(self, text):
+        """ Return list of (mapping name, start, end) for the matches that
+                transformText(text) would replace, in text order.
+            Does not build the transformed text or record the matches.
+        """
+        return list(self._iterMatches(text))
 
     def getMatches(self):
         """ Return list of MatchRcds for matches found so far by this 
             TextTransformer.
+            (always empty if countsOnly, use getMatchCounts())
         """
         matches = []
         for m in self.mappings:
             matches.extend(m.getMatchRcds())
         return matches
 
-    def getReport(self, title="Text Transformation Report"):
+    def getMatchCounts(self):
+        """ Return MatchCounts for matches found so far by this TextTransformer
+        """
+        counts = MatchCounts()
+        for m in self.mappings:
+            counts.merge(m.getMatchCounts())
+        return counts
+
+    def getReport(self, title="Text Transformation Report", counts=None):
         """ Return a string: nicely formatted matches report
             1st line: title
             2nd line: column headers (tab delimited)
@@ -322,6 +1068,8 @@ class TextTransformer (object):
             matchType, replText, count, preText, matchText, postText
             (count = number of occurrances of
                 preText matchText postText -> preText replText postText)
+            counts: MatchCounts to report on instead of the matches found so
+                far by transformText()
         """
         output = title + "\n"
         output += '\t'.join(['matchType',        # header line
@@ -333,12 +1081,9 @@ class TextTransformer (object):
                                 ]) + '\n'
 
         # aggregate matches to counts
-        aggMatches = {}
-        for m in self.getMatches():
-                # order of these fields is intentional so matches sort nicely
-            myKey = (m.matchType, m.matchText, m.postText, m.preText,
-                                                                    m.replText)
-            aggMatches[myKey] = aggMatches.get(myKey, 0) + 1
+        if counts is None: matchCounts = self.getMatchCounts()
+        else:              matchCounts = counts
+        aggMatches = matchCounts.getCounts()
 
         # generate output lines w/ counts.
         for myKey in sorted(aggMatches.keys()):
@@ -356,6 +1101,12 @@ class TextTransformer (object):
                                 "'%s'" % postText,
                                 ])
             output += line + '\n'
+
+        # matches not itemized because of maxReportKeys
+        overflow = matchCounts.getOverflow()
+        for matchType in sorted(overflow.keys()):
+            output += "# %s: %d more matches not itemized (maxReportKeys)\n" \
+                                                % (matchType, overflow[matchType])
         return output
 
     def resetMatches(self):
@@ -94,7 +94,8 @@ Other functionality:
 * Supports use of a custom pipeline step, FeatureDocCounter (defined in
     sklearnHelperLib), which you can put into a pipeline just after the
     vectorizer step, and it will give you access to
-    the number of documents each feature appears in.
+    the number of training documents each feature appears in
+    (and per class document counts & total term counts).
 
 Outputs:
 * log of the tuning run to stdout. This has lots of subsections like
@@ -171,12 +172,15 @@ import os
 import os.path
 import pickle
 import argparse
+import tempfile
+import shutil
 
 from miscPyUtils import importPyFile
 
 import MLtextUtils
 import MLsklearnHelper as skHelper
 import MLtuningReports as trl
+import MLfeatures as mlFeatures
 
 from sklearn.base import clone
 import numpy as np
@@ -302,6 +306,10 @@ def parseCmdLine():
                                                                 fallback=5)
     args.numJobs         = config.getint(  "MODEL_TUNING", "NUM_JOBS",
                                                                 fallback=1)
+    args.cacheTransformers = config.getboolean("MODEL_TUNING",
+                                        "CACHE_TRANSFORMERS", fallback=False)
+    args.sharedCorpus    = config.getboolean("MODEL_TUNING", "SHARED_CORPUS",
+                                                                fallback=True)
     return args
 # ---------------------------
 
@@ -344,6 +352,8 @@ class TextPipelineTuningHelper (object):
         self.validationSplit    = args.validationSplit
         self.gridSearchBeta     = args.gridSearchBeta
         self.numJobs		= args.numJobs
+        self.cacheTransformers	= args.cacheTransformers
+        self.sharedCorpus	= args.sharedCorpus
         self.numCV              = args.numCV
 
         self.tuningIndexFile    = args.tuningIndexFile
@@ -498,6 +508,7 @@ class TextPipelineTuningHelper (object):
         self.verboseWrite("Loading sample sets\n")
         self.loadTrainValTestSets()
         self.testSetEstimator = None	# assume we don't need this.
+        self.cacheStats = None		# no transformer caching (yet)
 
         if skHelper.isOneCombination(self.pipelineParameters):
             self.verboseWrite("Training valSetEstimator on single param set\n")
@@ -529,6 +540,18 @@ class TextPipelineTuningHelper (object):
             self.verboseWrite("Starting GridSearch\n")
             docs_gs, y_gs, cv = self.getGridSearchParams()
 
+            # Cache the Pipeline's transformer (vectorizer) fits so each
+            #   distinct vectorizer param combination is fit once per fold
+            #   instead of once per (classifier param combination, fold).
+            # joblib.Memory keys the cache by the transformer params and
+            #   the fold's docs, and it works across GridSearch processes.
+            if self.cacheTransformers:
+                cacheDir = tempfile.mkdtemp(prefix='MLtuningCache')
+                self.pipeline.set_params(memory=cacheDir)
+
+            # CountOnceVectorizers only cache their counts during GridSearch
+            skHelper.setCountOnceCaching(self.pipeline, True)
+
             gs = GridSearchCV( self.pipeline,
                                 self.pipelineParameters,
                                 scoring= self.scorer,
@@ -537,9 +560,33 @@ class TextPipelineTuningHelper (object):
                                 verbose= self.gsVerbose,
                                 n_jobs=  self.numJobs,
                                 )
-            gs.fit( docs_gs, y_gs )
+            # W/ parallel jobs, GridSearchCV pickles the docs to the worker
+            #   processes for every task. Instead, put them in a memory
+            #   mapped file once, and the workers just get the file name
+            #   (and index into it for each cv split).
+            if self.sharedCorpus and self.numJobs != 1:
+                docs_gs = skHelper.MappedCorpus(docs_gs)
+
+            try:
+                gs.fit( docs_gs, y_gs )
+                if self.cacheTransformers:
+                    self.cacheStats = skHelper.getTransformerCacheStats(gs,
+                                                                    cacheDir)
+            finally:
+                if isinstance(docs_gs, skHelper.MappedCorpus): docs_gs.remove()
+                if self.cacheTransformers:
+                    shutil.rmtree(cacheDir, ignore_errors=True)
+                    # so the estimators below don't use the removed cache
+                    #   (and are pickled w/o it)
+                    self.pipeline.set_params(memory=None)
+                skHelper.setCountOnceCaching(self.pipeline, False)
+                skHelper.CountOnceVectorizer.clearCache()
             self.verboseWrite("Done Gridsearch\n")
 
+            if self.cacheTransformers:
+                gs.best_estimator_.set_params(memory=None)
+            skHelper.setCountOnceCaching(gs.best_estimator_, False)
+
             self.gridSearch = gs
             self.bestParams = gs.best_params_
 
@@ -578,23 +625,34 @@ class TextPipelineTuningHelper (object):
 
         # run estimator on the training, val sets so we can compare
         self.verboseWrite("Predicting training set using valSetEstimator\n")
-        self.trainSet.setPredictions( \
-                    self.valSetEstimator.predict(self.trainSet.getDocs()) )
+        self.predictDocSet(self.trainSet, self.valSetEstimator)
 
         self.verboseWrite("Predicting validation set using valSetEstimator\n")
-        self.valSet.setPredictions( \
-                    self.valSetEstimator.predict(self.valSet.getDocs()) )
+        self.predictDocSet(self.valSet, self.valSetEstimator)
 
         if self.testSet:		# run on test set too
             self.verboseWrite("Predicting test set using testSetEstimator\n")
-            self.testSet.setPredictions( \
-                    self.testSetEstimator.predict(self.testSet.getDocs()) )
+            self.predictDocSet(self.testSet, self.testSetEstimator)
 
         self.verboseWrite("Done with predictions\n")
 
         return self		# customary for fit() methods
     # ---------------------------
 
+    def predictDocSet(self, docSet, estimator):
+        """
+        Set docSet's predictions, and its confidences if we will write them
+            in the predictions files (vectorizing the docs only once)
+        """
+        doConfidences = self.wPredictions and self.doConfidences
+        predictions, confidences = skHelper.predictWithConfidences(estimator,
+                                docSet.getDocs(),
+                                positiveClass=self.yClassToScore,
+                                doConfidences=doConfidences)
+        docSet.setPredictions(predictions)
+        docSet.setConfidences(confidences)
+    # ---------------------------
+
     def verboseWrite(self, msg):
         if self.gsVerbose:
             sys.stderr.write(trl.getFormattedTime() + " " + msg)
@@ -651,11 +709,12 @@ class TextPipelineTuningHelper (object):
 
         output += trl.getBestParamsReport(self.bestParams, self.valSetEstimator)
         output += trl.getGridSearchReport(self.gridSearch,
-                                                        self.pipelineParameters)
+                            self.pipelineParameters, cacheStats=self.cacheStats)
+        output += trl.getStemCacheReport(skHelper.stemCache)
 
         if self.verbose: 
-            features = skHelper.getOrderedFeatures( self.bestVectorizer,
-                                                    self.bestClassifier)
+            features = mlFeatures.getTopFeatures(self.bestVectorizer,
+                                        self.bestClassifier, nTopFeatures)
             output += trl.getTopFeaturesReport( features, nTopFeatures) 
 
             output += trl.getVectorizerReport(self.bestVectorizer,
@@ -832,6 +891,7 @@ class DocumentSet (object):
         self.extraInfoFieldNames = extraInfoFieldNames
         self.extraInfo   = extraInfo
         self.predictions = None
+        self.confidences = None		# prediction confidences, if known
         self.pathName    = None		# where loaded from
         self.splitSize   = None		# if we do split, fraction to new set
         self.randomSeed  = None		# if we do split, use for random subset
@@ -849,6 +909,9 @@ class DocumentSet (object):
     def getPredictions(self):	return self.predictions
     def setPredictions(self, preds):  # list of ints 0,1. Parallel to self.docs
         self.predictions = preds
+    def getConfidences(self):	return self.confidences
+    def setConfidences(self, conf):   # floats (or None). Parallel to self.docs
+        self.confidences = conf
 
     def getPathName(self):	return self.pathName
     def getSplitSize(self):	return self.splitSize
@@ -1016,13 +1079,13 @@ class PredictionFormatter (object):
         self.setConfidenceValues(docSet, pipeline)
 
         # map predictions 0/1 to text names
-        self.trueNames = [ classNames[y] for y in y_true ]
-        self.predNames = [ classNames[y] for y in y_predicted ]
+        names = np.array(classNames, dtype=object)
+        self.trueNames = names[np.asarray(y_true, dtype=int)].tolist()
+        self.predNames = names[np.asarray(y_predicted, dtype=int)].tolist()
 
         # set predicton type "FP", "FN", "TP", "TN
-        self.predTypes = [skHelper.predictionType(t, p,
-                                    positiveClass=positiveClass) \
-                                        for t,p in zip(y_true,y_predicted)]
+        self.predTypes = skHelper.getPredictionTypes(y_true, y_predicted,
+                                    positiveClass=positiveClass).tolist()
 
         # get fieldnames and formats to output
         self.fieldNames = [ f['fn']     for f in self.outputFields ]
@@ -1040,13 +1103,15 @@ class PredictionFormatter (object):
         """
         if not self.doConfidences:
             self.confidences = [ 0.0 for x in range(docSet.getNumDocs()) ]
+        elif docSet.getConfidences() is not None:  # computed w/ predictions
+            self.confidences = np.asarray(docSet.getConfidences()).tolist()
         else:
             self.confidences = skHelper.getConfidenceValues(pipeline,
                             docSet.getDocs(), positiveClass=self.positiveClass)
             if not self.confidences:
                 self.confidences = [ 0.0 for x in range(docSet.getNumDocs()) ]
 
-        self.absConf     = list(map(abs, self.confidences))
+        self.absConf     = np.abs(self.confidences).tolist()
     # ---------------------------
 
     def getHeaderText(self):  return self.fieldSep.join(self.fieldNames) + '\n'
@@ -9,6 +9,7 @@ import os.path
 import time
 import re
 import string
+import MLfeatures as features
 from sklearn.metrics import fbeta_score, precision_score,\
                         recall_score, classification_report, confusion_matrix
 
@@ -136,6 +137,7 @@ def getGridSearchReport( \
     gridSearch,		# fitted GridSearchCV object to report on
     parameters,		# dict of parameters used in the GridSearchCV
     sstart=SSTART,	# output section start delimiter
+    cacheStats=None,	# (numFits, numHits) of Pipeline transformer caching
     ):
     """
     Return report (string) about the completed (fitted) GridSearchCV
@@ -157,6 +159,34 @@ def getGridSearchReport( \
 
     output += sstart + 'Grid Search Best Score: %f\n' % gridSearch.best_score_
     output += "\n"
+
+    if cacheStats:
+        numFits, numHits = cacheStats
+        output += sstart + 'Grid Search Transformer Cache: ' + \
+                    '%d transformer fits, ~%d cache hits, ~%d fit ' % \
+                                        (numFits, numHits, numFits - numHits)
+        output += '(estimated from the fits stored in the cache)\n'
+        output += "\n"
+    return output
+# ---------------------------
+
+def getStemCacheReport( \
+    stemCache,		# MLsklearnHelper.StemCache used in the stemming
+    sstart=SSTART,	# output section start delimiter
+    ):
+    """
+    Return report (string) about the stemCache hit rate ('' if no stemming
+        was counted). Stemming in GridSearch worker processes is not counted.
+    """
+    numHits   = stemCache.getNumHits()
+    numMisses = stemCache.getNumMisses()
+    if numHits + numMisses == 0: return ''
+
+    output = sstart + 'Stem Cache: %d words stemmed, %d cache hits ' % \
+                                            (numHits + numMisses, numHits) + \
+                '(%.1f%%), %d words cached\n' % \
+                        (100.0 * stemCache.getHitRate(), stemCache.getSize())
+    output += "\n"
     return output
 # ---------------------------
 
@@ -198,17 +228,13 @@ def getVectorizerReport(vectorizer,
     '''
     Return report (string) on the fitted vectorizer
     '''
-    featureNames = vectorizer.get_feature_names()
-    midFeature   = int(len(featureNames)/2)
+    numFeatures, first, middle, last = features.getFeatureSamples(vectorizer,
+                                                            nFeatures=nFeatures)
 
-    output =  sstart + "Vectorizer:   Number of Features: %d\n" \
-                                                % len(featureNames)
-    output += "First %d features: %s\n\n" % (nFeatures,
-                format(featureNames[:nFeatures]) )
-    output += "Middle %d features: %s\n\n" % (nFeatures,
-                format(featureNames[ midFeature : midFeature+nFeatures]) )
-    output += "Last %d features: %s\n\n" % (nFeatures,
-                format(featureNames[-nFeatures:]) )
+    output =  sstart + "Vectorizer:   Number of Features: %d\n" % numFeatures
+    output += "First %d features: %s\n\n" % (nFeatures, format(first) )
+    output += "Middle %d features: %s\n\n" % (nFeatures, format(middle) )
+    output += "Last %d features: %s\n\n" % (nFeatures, format(last) )
     return output
 # ---------------------------
 
@@ -229,28 +255,9 @@ def writeFeatures(  vectorizer, # fitted vectorizer from a pipeline
         we will print these after the feature name.
     if classifier can provide feature coefficients, we will print these too
     All "|" delimited.
-    Assumes:  vectorizer has get_feature_names() method
+    See MLfeatures.writeFeatures()
     '''
-    delimiter = '|'
-    featureNames = vectorizer.get_feature_names()
-
-    hasValues = values != None
-
-    hasCoef = hasattr(classifier, 'coef_')
-    if hasCoef: coefficients = classifier.coef_[0].tolist()
-
-    hasImportance = hasattr(classifier, 'feature_importances_')
-    if hasImportance: importances = classifier.feature_importances_.tolist()
-
-    if type(outputFile) == type(''): fp = open(outputFile, 'w')
-    else: fp = outputFile
-
-    for i,f in enumerate(featureNames):
-        fp.write(f)
-        if hasValues:     fp.write(delimiter + '%d' % values[i])
-        if hasCoef:       fp.write(delimiter + '%+5.4f' % coefficients[i])
-        if hasImportance: fp.write(delimiter + '%+5.4f' % importances[i])
-        fp.write('\n')
+    features.writeFeatures(vectorizer, classifier, outputFile, values=values)
     return
 # ----------------------------
 
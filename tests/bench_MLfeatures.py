@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for MLfeatures.py
+
+These are not automated tests (Runtests only runs test_*.py), just timings
+to compare alternative implementations on synthetic data.
+
+Usage:   python bench_MLfeatures.py [-h] [benchmark ...]
+"""
+import sys
+import io
+import time
+import random
+import argparse
+import numpy as np
+from MLfeatures import *
+import MLsklearnHelper as skHelper
+import MLtuningReports as trl
+
+#-----------------------------------
+
+def parseCmdLine():
+    parser = argparse.ArgumentParser( \
+                    description='run MLfeatures benchmarks, default is all')
+
+    parser.add_argument('benchmarks', nargs='*', default=None,
+        help='benchmarks to run: %s' % ' '.join(BENCHMARKS.keys()))
+
+    parser.add_argument('--numfeatures', dest='numFeatures', type=int,
+        default=1000000,
+        help='number of features in the vocabulary. Default: 1000000')
+
+    parser.add_argument('--seed', dest='seed', type=int, default=1,
+        help='random seed. Default: 1')
+
+    return parser.parse_args()
+#-----------------------------------
+
+class FakeVectorizer(object):
+    """ fitted vectorizer w/ a vocabulary_ of numFeatures random ngrams """
+    def __init__(self, numFeatures):
+        names = sorted(set([ 'f%x %x' % (random.getrandbits(40), i)
+                                            for i in range(numFeatures) ]))
+        self.vocabulary_ = dict(zip(names, range(len(names))))
+    def get_feature_names(self):
+        return [ n for n, i in sorted(self.vocabulary_.items(),
+                                                    key=lambda x: x[1]) ]
+
+class FakeClassifier(object):
+    """ fitted classifier w/ random coef_, a quarter of them 0 """
+    def __init__(self, numFeatures):
+        coef = np.random.randn(numFeatures)
+        coef[np.random.rand(numFeatures) < 0.25] = 0.0
+        self.coef_ = np.array([coef])
+#-----------------------------------
+
+def timeIt(func, *args, **kwargs):
+    """ Return (seconds, result) of func(*args, **kwargs) """
+    startTime = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - startTime, result
+#-----------------------------------
+
+def oldWriteFeatures(vectorizer, classifier, fp):
+    """ The old MLtuningReports.writeFeatures(): several write()s per feature
+    """
+    coefficients = classifier.coef_[0].tolist()
+    for i,f in enumerate(vectorizer.get_feature_names()):
+        fp.write(f)
+        fp.write('|' + '%+5.4f' % coefficients[i])
+        fp.write('\n')
+
+def benchFeatures(args):
+    """ top features report & feature file: sort/write everything vs. numpy
+    """
+    np.random.seed(args.seed)
+    vectorizer = FakeVectorizer(args.numFeatures)
+    classifier = FakeClassifier(len(vectorizer.vocabulary_))
+    print("### Feature reports: %d features" % len(vectorizer.vocabulary_))
+    print("%-16s %10s %10s" % ('function', 'old(s)', 'new(s)'))
+
+    def oldTop():
+        ordered = skHelper.getOrderedFeatures(vectorizer, classifier)
+        return trl.getTopFeaturesReport(ordered, 20)
+    def newTop():
+        return trl.getTopFeaturesReport(
+                            getTopFeatures(vectorizer, classifier, 20), 20)
+    def oldWrite():
+        fp = io.StringIO()
+        oldWriteFeatures(vectorizer, classifier, fp)
+        return fp.getvalue()
+    def newWrite():
+        fp = io.StringIO()
+        writeFeatures(vectorizer, classifier, fp)
+        return fp.getvalue()
+
+    for name, old, new in [('topFeatures', oldTop, newTop),
+                           ('writeFeatures', oldWrite, newWrite),]:
+        oldTime, oldResult = timeIt(old)
+        newTime, newResult = timeIt(new)
+        print("%-16s %10.3f %10.3f" % (name, oldTime, newTime))
+        if oldResult != newResult:
+            print("ERROR: %s results differ" % name)
+    print()
+#-----------------------------------
+
+def benchVocab(args):
+    """ vocabulary_ dict vs. CompactVocabulary: memory, pickle load, lookup
+    """
+    import pickle
+    import tracemalloc
+    vocab = FakeVectorizer(args.numFeatures).vocabulary_
+    terms = random.sample(list(vocab.keys()), min(100000, len(vocab))) + \
+                                        [ 'not%d' % i for i in range(10000) ]
+    print("### Vocabulary: %d terms, %d lookups" % (len(vocab), len(terms)))
+    print("%-18s %10s %10s %10s" % ('vocabulary', 'MB', 'load(s)', 'lookup(s)'))
+    results = []
+    for name, v in [('dict', vocab), ('CompactVocabulary',
+                                                CompactVocabulary(vocab))]:
+        pickled = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+        tracemalloc.start()
+        loadTime, loaded = timeIt(pickle.loads, pickled)
+        numBytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        lookupTime, result = timeIt(lambda: [ loaded.get(t) for t in terms ])
+        results.append(result)
+        print("%-18s %10.1f %10.3f %10.3f" % \
+                            (name, numBytes/1e6, loadTime, lookupTime))
+        del loaded
+    if results[0] != results[1]:
+        print("ERROR: lookups differ")
+    print()
+#-----------------------------------
+
+BENCHMARKS = {
+    'features' : benchFeatures,
+    'vocab'    : benchVocab,
+    }
+
+if __name__ == "__main__":
+    args = parseCmdLine()
+    random.seed(args.seed)
+    for name in args.benchmarks or BENCHMARKS.keys():
+        BENCHMARKS[name](args)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for MLsciLitText.py
+
+These are not automated tests (Runtests only runs test_*.py), just timings
+to compare alternative implementations on synthetic data.
+
+Usage:   python bench_MLsciLitText.py [-h] [benchmark ...]
+"""
+import sys
+import time
+import random
+import argparse
+from MLsciLitText import *
+
+#-----------------------------------
+
+def parseCmdLine():
+    parser = argparse.ArgumentParser( \
+                    description='run MLsciLitText benchmarks, default is all')
+
+    parser.add_argument('benchmarks', nargs='*', default=None,
+        help='benchmarks to run: %s' % ' '.join(BENCHMARKS.keys()))
+
+    parser.add_argument('--numdocs', dest='numDocs', type=int, default=500,
+        help='number of articles in the corpus. Default: 500')
+
+    parser.add_argument('--seed', dest='seed', type=int, default=1,
+        help='random seed. Default: 1')
+
+    return parser.parse_args()
+#-----------------------------------
+
+def randomWord(minLen=1, maxLen=10):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return ''.join([ random.choice(letters)
+                            for i in range(random.randint(minLen, maxLen)) ])
+
+def randomSentence(minWords=5, maxWords=30):
+    words = [ randomWord() for i in range(random.randint(minWords, maxWords)) ]
+    words[0] = words[0].capitalize()
+    return ' '.join(words) + '.'
+
+# things pdftotext leaves in extracted text
+FIG_REFS = ['(Fig. 1A)', '(Figure 2)', 'in Table 1', '(Figs. 3 and 4)',
+            '(Supplementary Fig. S2)', '(Extended Data Fig. 5)', 'tables']
+LEGEND_STARTS = ['Figure 1.', 'Fig. 2', 'F I G U R E 3', 'Table 1',
+            'TA B L E 2', 'Supplementary Figure S1.', 'Online Table 3',
+            'Extended Data Fig. 4']
+OTHER_STARTS = ['The', 'These', 'To', 'Table-top', 'Finally,', 'Supporting',
+            'Of', 'E14.5', 'Sox2', 'Figures']
+
+def randomArticle():
+    """ Return text that looks like an extracted article: paragraphs
+        (some mentioning figures/tables), legends, short header/footer lines
+    """
+    paras = []
+    for i in range(random.randint(40, 120)):
+        r = random.random()
+        if r < 0.3:                     # page header/footer/junk line
+            paras.append(random.choice(['%d' % i, 'Cell Reports',
+                            'J o u r n a l', randomWord(), 'Author Manuscript']))
+        elif r < 0.4:                   # legend
+            paras.append(random.choice(LEGEND_STARTS) + ' ' +
+                                ' '.join([ randomSentence() for j in range(4) ]))
+        else:                           # body paragraph
+            sentences = [ randomSentence() for j in range(random.randint(2,8)) ]
+            if random.random() < 0.3:
+                k = random.randint(0, len(sentences)-1)
+                sentences[k] += ' ' + random.choice(FIG_REFS)
+            paras.append(random.choice(OTHER_STARTS) + ' ' +
+                                                        ' '.join(sentences))
+    return '\n\n'.join(paras)
+#-----------------------------------
+
+def timeIt(func, *args, **kwargs):
+    """ Return (seconds, result) of func(*args, **kwargs) """
+    startTime = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - startTime, result
+#-----------------------------------
+
+# the regex only versions (w/o the hasFigureRef() prefilter)
+def regexLegends(text):
+    return [ p for p in paragraphs(text) if legendRe.match(p) ]
+
+def regexLegendsAndFigParagraphs(text):
+    return [ p for p in paragraphs(text)
+                                if legendRe.match(p) or figureRe.search(p) ]
+
+def regexParagraphKinds(text):
+    kinds = []
+    for start, end in paragraphSpans(text):
+        if legendRe.match(text, start, end):    kinds.append(PARA_LEGEND)
+        elif figureRe.search(text, start, end): kinds.append(PARA_FIGURE)
+        else:                                   kinds.append(PARA_OTHER)
+    return kinds
+
+def benchPrefilters(args):
+    """ legendRe / figureRe on every paragraph vs. w/ prefilters
+    """
+    docs = [ randomArticle() for i in range(args.numDocs) ]
+    print("### Legend/figure prefilters: %d docs, %d chars" % \
+                                    (len(docs), sum(map(len, docs))))
+    print("%-24s %10s %10s" % ('function', 'regex(s)', 'new(s)'))
+
+    for name, old, new in [
+            ('legends', regexLegends, lambda t: list(legends(t))),
+            ('legendsAndFigParagraphs', regexLegendsAndFigParagraphs,
+                                lambda t: list(legendsAndFigParagraphs(t))),
+            ('scanParagraphs', regexParagraphKinds,
+                                lambda t: [ k for s,e,k in scanParagraphs(t) ]),
+            ]:
+        oldTime, oldResult = timeIt(lambda: [ old(d) for d in docs ])
+        newTime, newResult = timeIt(lambda: [ new(d) for d in docs ])
+        print("%-24s %10.3f %10.3f" % (name, oldTime, newTime))
+        if oldResult != newResult:
+            print("ERROR: %s results differ" % name)
+    print()
+#-----------------------------------
+
+def benchBatch(args):
+    """ legendsAndFigWordsBatch() w/ different numbers of processes
+    """
+    docs = [ randomArticle() for i in range(args.numDocs) ]
+    print("### legendsAndFigWordsBatch: %d docs, %d chars" % \
+                                    (len(docs), sum(map(len, docs))))
+    print("%-10s %10s" % ('numJobs', 'time(s)'))
+    serial = None
+    for numJobs in [1, 2, 4, -1]:
+        t, result = timeIt(legendsAndFigWordsBatch, docs, numJobs=numJobs)
+        print("%-10d %10.3f" % (numJobs, t))
+        if serial is None: serial = result
+        elif result != serial:
+            print("ERROR: results differ")
+    print()
+#-----------------------------------
+
+BENCHMARKS = {
+    'prefilters' : benchPrefilters,
+    'batch'      : benchBatch,
+    }
+
+if __name__ == "__main__":
+    args = parseCmdLine()
+    random.seed(args.seed)
+    for name in args.benchmarks or BENCHMARKS.keys():
+        BENCHMARKS[name](args)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for MLsklearnHelper.py
+
+These are not automated tests (Runtests only runs test_*.py), just timings
+to compare alternative implementations on synthetic data.
+
+Usage:   python bench_MLsklearnHelper.py [-h] [benchmark ...]
+"""
+import sys
+import time
+import random
+import argparse
+from MLsklearnHelper import *
+
+#-----------------------------------
+
+def parseCmdLine():
+    parser = argparse.ArgumentParser( \
+                    description='run MLsklearnHelper benchmarks, default is all')
+
+    parser.add_argument('benchmarks', nargs='*', default=None,
+        help='benchmarks to run: %s' % ' '.join(BENCHMARKS.keys()))
+
+    parser.add_argument('--numdocs', dest='numDocs', type=int, default=500,
+        help='number of documents in the corpus. Default: 500')
+
+    parser.add_argument('--seed', dest='seed', type=int, default=1,
+        help='random seed. Default: 1')
+
+    return parser.parse_args()
+#-----------------------------------
+
+def randomWord(minLen=2, maxLen=10):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return ''.join([ random.choice(letters)
+                            for i in range(random.randint(minLen, maxLen)) ])
+
+def randomCorpus(numDocs, vocabSize=20000, docWords=1000):
+    """ Return list of docs whose words follow a Zipf-like distribution
+        over a random vocabulary (w/ some suffixes for the stemmer to strip)
+    """
+    suffixes = ['', '', '', 's', 'ing', 'ed', 'ation', 'ly']
+    vocab = [ randomWord() + random.choice(suffixes) for i in range(vocabSize) ]
+    weights = [ 1.0/(rank+1) for rank in range(vocabSize) ]
+    return [ ' '.join(random.choices(vocab, weights, k=docWords)) + \
+                                            ' http://www.informatics.jax.org'
+                                                    for i in range(numDocs) ]
+#-----------------------------------
+
+def timeIt(func, *args, **kwargs):
+    """ Return (seconds, result) of func(*args, **kwargs) """
+    startTime = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - startTime, result
+#-----------------------------------
+
+def oldPreprocessorStem(input):
+    """ The old vectorizer_preprocessor_stem(): stem every token & +=
+    """
+    output = ''
+    for s in urls_re.split(input):
+        for m in token_re.finditer(s):
+            output += " " + stemmer.stem(m.group())
+    return output
+
+def benchStem(args):
+    """ vectorizer_preprocessor_stem() w/o vs. w/ the StemCache
+    """
+    docs = randomCorpus(args.numDocs)
+    print("### Stemming preprocessor: %d docs, %d chars" % \
+                                    (len(docs), sum(map(len, docs))))
+    stemCache.clear()
+    oldTime, oldResult = timeIt(lambda: [ oldPreprocessorStem(d) for d in docs ])
+    newTime, newResult = timeIt(lambda: [ vectorizer_preprocessor_stem(d)
+                                                            for d in docs ])
+    print("%-16s %10.3f" % ('old', oldTime))
+    print("%-16s %10.3f  (hit rate %.3f, %d stems cached)" % \
+        ('stemCache', newTime, stemCache.getHitRate(), stemCache.getSize()))
+    if oldResult != newResult:
+        print("ERROR: results differ")
+    print()
+#-----------------------------------
+
+def benchCountOnce(args):
+    """ GridSearch over min_df/max_df: CountVectorizer vs. CountOnceVectorizer
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.model_selection import GridSearchCV
+    docs = randomCorpus(args.numDocs)
+    y = [ random.randint(0,1) for d in docs ]
+    params = {'vectorizer__ngram_range' : [(1,2)],
+              'vectorizer__min_df' : [2, 5, 10],
+              'vectorizer__max_df' : [0.5, 0.75, 1.0],}
+    print("### min_df/max_df GridSearch: %d docs, %d chars" % \
+                                    (len(docs), sum(map(len, docs))))
+    results = []
+    for vectorizer in [CountVectorizer(), CountOnceVectorizer(cacheCounts=True)]:
+        pipeline = Pipeline( [ ('vectorizer', vectorizer),
+                        ('classifier', SGDClassifier(random_state=0)),] )
+        gs = GridSearchCV(pipeline, params, cv=3)
+        t, gs = timeIt(gs.fit, docs, y)
+        vecType = type(vectorizer)
+        results.append(list(gs.cv_results_['mean_test_score']))
+        print("%-20s %10.3f" % (vecType.__name__, t))
+    if results[0] != results[1]:
+        print("ERROR: results differ")
+    print()
+#-----------------------------------
+
+def oldGetFalsePosNeg(y_true, y_predicted, sampleNames, positiveClass=1):
+    """ The old getFalsePosNeg(): predictionType() on each sample """
+    falsePositives = []
+    falseNegatives = []
+    for trueY, predY, name in zip(y_true, y_predicted, sampleNames):
+        predType = predictionType(trueY, predY, positiveClass=positiveClass)
+        if   predType == 'FP': falsePositives.append(name)
+        elif predType == 'FN': falseNegatives.append(name)
+    return falsePositives, falseNegatives
+
+def benchPredTypes(args):
+    """ getFalsePosNeg() & prediction types: per sample loop vs. numpy
+    """
+    numSamples = args.numDocs * 1000
+    y_true = np.array([ random.randint(0,1) for i in range(numSamples) ])
+    y_pred = np.array([ random.randint(0,1) for i in range(numSamples) ])
+    names  = [ 'sample%d' % i for i in range(numSamples) ]
+    print("### Prediction types: %d samples" % numSamples)
+    print("%-16s %10s %10s" % ('function', 'old(s)', 'new(s)'))
+    for name, old, new in [
+            ('getFalsePosNeg', lambda: oldGetFalsePosNeg(y_true, y_pred, names),
+                               lambda: getFalsePosNeg(y_true, y_pred, names)),
+            ('predictionTypes',
+                lambda: [ predictionType(t, p) for t, p in zip(y_true, y_pred) ],
+                lambda: getPredictionTypes(y_true, y_pred).tolist()),]:
+        oldTime, oldResult = timeIt(old)
+        newTime, newResult = timeIt(new)
+        print("%-16s %10.3f %10.3f" % (name, oldTime, newTime))
+        if oldResult != newResult:
+            print("ERROR: %s results differ" % name)
+    print()
+#-----------------------------------
+
+BENCHMARKS = {
+    'stem'      : benchStem,
+    'countOnce' : benchCountOnce,
+    'predTypes' : benchPredTypes,
+    }
+
+if __name__ == "__main__":
+    args = parseCmdLine()
+    random.seed(args.seed)
+    for name in args.benchmarks or BENCHMARKS.keys():
+        BENCHMARKS[name](args)
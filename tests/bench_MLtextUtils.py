@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for MLtextUtils.py
+
+These are not automated tests (Runtests only runs test_*.py), just timings
+to compare alternative implementations on synthetic data.
+
+Usage:   python bench_MLtextUtils.py [-h] [benchmark ...]
+"""
+import sys
+import time
+import random
+import argparse
+import re
+from MLtextUtils import *
+
+#-----------------------------------
+
+def parseCmdLine():
+    parser = argparse.ArgumentParser( \
+                    description='run MLtextUtils benchmarks, default is all')
+
+    parser.add_argument('benchmarks', nargs='*', default=None,
+        help='benchmarks to run: %s' % ' '.join(BENCHMARKS.keys()))
+
+    parser.add_argument('--sizes', dest='vocabSizes', default='1000,10000,100000',
+        help='comma separated vocabulary sizes. Default: 1000,10000,100000')
+
+    parser.add_argument('--numwords', dest='numWords', type=int, default=50000,
+        help='number of words in the text to transform. Default: 50000')
+
+    parser.add_argument('--seed', dest='seed', type=int, default=1,
+        help='random seed. Default: 1')
+
+    return parser.parse_args()
+#-----------------------------------
+
+def randomWord(minLen=3, maxLen=10):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return ''.join([ random.choice(letters)
+                            for i in range(random.randint(minLen, maxLen)) ])
+
+def randomVocabulary(size):
+    """ Return list of distinct gene/anatomy-like terms that share prefixes:
+        some random stems, each w/ several suffixes, some multiword terms
+    """
+    suffixes = ['', 's', 'a', 'in', 'ase', 'ome', '1', '2', '-1', 'b']
+    stems = [ randomWord(3, 7) for i in range(size // 5 + 1) ]
+    vocab = set()
+    while len(vocab) < size:
+        term = random.choice(stems) + random.choice(suffixes)
+        if random.random() < 0.1:
+            term += ' ' + random.choice(stems)
+        vocab.add(term)
+    vocab = list(vocab)
+    random.shuffle(vocab)
+    return vocab
+
+def randomText(vocab, numWords, fracTerms=0.05):
+    words = []
+    for i in range(numWords):
+        if random.random() < fracTerms: words.append(random.choice(vocab))
+        else:                           words.append(randomWord(1, 9))
+    return ' '.join(words)
+#-----------------------------------
+
+def timeIt(func, *args, **kwargs):
+    """ Return (seconds, result) of func(*args, **kwargs) """
+    startTime = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - startTime, result
+#-----------------------------------
+
+def benchStringMappings(args):
+    """ Build & apply a TextMappingFromStrings w/ a large vocabulary:
+        flat regex vs. trie regex vs. AhoCorasick
+    """
+    print("### String mapping engines: %d word text" % args.numWords)
+    print("%10s %-12s %10s %10s" % ('vocab', 'engine', 'build(s)', 'match(s)'))
+
+    for size in [ int(x) for x in args.vocabSizes.split(',') ]:
+        vocab = randomVocabulary(size)
+        text  = randomText(vocab, args.numWords)
+        results = []
+        for engine, trie, useAC in [('flatRegex', False, False),
+                                    ('trieRegex', True,  False),
+                                    ('ahoCorasick', False, True),]:
+            def build():
+                m = TextMappingFromStrings('vocab', vocab, 'TERM',
+                                                            trieRegex=trie)
+                return TextTransformer([m], useAhoCorasick=useAC)
+
+            buildTime, tt = timeIt(build)
+            matchTime, result = timeIt(tt.transformText, text)
+            results.append(result)
+            print("%10d %-12s %10.3f %10.3f" % \
+                                    (size, engine, buildTime, matchTime))
+
+        if len(set(results)) != 1:
+            print("ERROR: engines transformed the text differently")
+    print()
+#-----------------------------------
+
+def concatTransformText(tt, text):
+    """ The old TextTransformer.transformText(): findMatchingGroup() on
+        each match & += to build the transformed text
+    """
+    transformed = ''
+    endOfLastMatch = 0
+    for m in tt.getBigRe().finditer(text):
+        name, start, end = findMatchingGroup(m)
+        replacement = tt.mappingDict[name].foundMatch(text, start, end)
+        transformed += text[endOfLastMatch:start] + replacement
+        endOfLastMatch = end
+    transformed += text[endOfLastMatch:]
+    return transformed
+
+def benchTransformText(args):
+    """ Many regex mappings, many matches:
+        old concatenation vs. transformText() vs. getMatchSpans()
+    """
+    print("### transformText: %d word text" % args.numWords)
+    vocab = randomVocabulary(20)
+    mappings = [ TextMapping('m%d' % i, r'\b%s\b' % re.escape(term), 'T%d' % i)
+                                        for i, term in enumerate(vocab) ]
+    tt = TextTransformer(mappings, useAhoCorasick=False)
+    text = randomText(vocab, args.numWords, fracTerms=0.3)
+
+    oldTime, old = timeIt(concatTransformText, tt, text)
+    newTime, new = timeIt(tt.transformText, text)
+    spanTime, spans = timeIt(tt.getMatchSpans, text)
+    print("%-16s %10.3f" % ('concatenation', oldTime))
+    print("%-16s %10.3f" % ('transformText', newTime))
+    print("%-16s %10.3f  (%d matches)" % ('getMatchSpans', spanTime, len(spans)))
+    if old != new:
+        print("ERROR: transformed text differs")
+    print()
+#-----------------------------------
+
+def articleText(numWords):
+    """ Return text that looks like an extracted article: mostly ascii words
+        & punctuation, some URLs/DOIs, a few non-ascii chars
+    """
+    extras = ['(Fig. 1A)', 'p < 0.05,', 'http://www.informatics.jax.org/x',
+              'doi:10.1016/j.cell.2020.01.001', '\u03b1-actin', '5 \u00b5m',
+              'Smith et al.;', 'E14.5\n', '\u2013']
+    words = []
+    for i in range(numWords):
+        if random.random() < 0.05: words.append(random.choice(extras))
+        else:                      words.append(randomWord(1, 9))
+    return ' '.join(words)
+
+def oldRemoveNonAscii(text):  return nonAsciiRE.sub(' ', text)
+def oldRemoveURLsLower(text): return ' '.join(urls_re.split(text)).lower()
+def oldTokenPerLine(text):
+    return '\n'.join([m.group() for m in token_re.finditer(text)]) + '\n'
+
+def benchPreprocessors(args):
+    """ removeNonAscii, removeURLsLower, tokenPerLine: old regex versions vs.
+        fast path versions on a batch of article-like docs
+    """
+    numDocs = 200
+    docs = [ articleText(args.numWords // numDocs) for i in range(numDocs) ]
+    asciiDocs = [ oldRemoveNonAscii(d) for d in docs ]
+    print("### Preprocessors: %d docs, %d words" % (numDocs, args.numWords))
+    print("%-16s %-12s %10s %10s" % ('function', 'docs', 'old(s)', 'new(s)'))
+    for name, old, batch in [
+                ('removeNonAscii',  oldRemoveNonAscii,  removeNonAsciiBatch),
+                ('removeURLsLower', oldRemoveURLsLower, removeURLsLowerBatch),
+                ('tokenPerLine',    oldTokenPerLine,    tokenPerLineBatch),]:
+        for docsName, theDocs in [('article', docs), ('ascii', asciiDocs)]:
+            oldTime, oldResult = timeIt(lambda: [ old(d) for d in theDocs ])
+            newTime, newResult = timeIt(batch, theDocs)
+            print("%-16s %-12s %10.3f %10.3f" % \
+                                (name, docsName, oldTime, newTime))
+            if oldResult != newResult:
+                print("ERROR: %s results differ" % name)
+    print()
+#-----------------------------------
+
+BENCHMARKS = {
+    'preprocessors'  : benchPreprocessors,
+    'stringMappings' : benchStringMappings,
+    'transformText'  : benchTransformText,
+    }
+
+if __name__ == "__main__":
+    args = parseCmdLine()
+    random.seed(args.seed)
+    for name in args.benchmarks or BENCHMARKS.keys():
+        BENCHMARKS[name](args)
@@ -0,0 +1,16 @@
+# a simple test Pipeline definition w/ a vocabulary & coefficients
+#   (e.g., for compactModel.py)
+import sys
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import SGDClassifier
+#-----------------------
+pipeline = Pipeline( [
+('vectorizer', CountVectorizer(
+		lowercase=True,
+		stop_words='english',
+		ngram_range=(1,2),
+		binary=True,
+		),),
+('classifier', SGDClassifier(verbose=0, random_state=0, penalty='l1') ),
+] )
@@ -0,0 +1,15 @@
+# a simple test Pipeline definition that can be trained w/ trainModel.py --stream
+import sys
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+#-----------------------
+pipeline = Pipeline( [
+('vectorizer', HashingVectorizer(
+		lowercase=True,
+		stop_words='english',
+		n_features=2**18,
+		alternate_sign=False,
+		),),
+('classifier', SGDClassifier(verbose=0, random_state=0) ),
+] )
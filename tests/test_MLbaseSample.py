@@ -91,6 +91,73 @@ class BaseSample_tests(unittest.TestCase):
         expectedText = "12345678901234567890\n"
         sample3.truncateText()
         self.assertEqual(expectedText, sample3.getDocument())
+
+    def test_paragraphScanCache(self):
+        text = 'Figure 1. legend\n\nsome text\n\na b see Fig 2 c d'
+        sample3 = BaseSample().parseSampleRecordText('pmID3|' + text)
+        scan = sample3.getParagraphScan()
+        self.assertIs(scan, sample3.getParagraphScan())     # cached
+        self.assertEqual(['Figure 1. legend', 'some text', 'a b see Fig 2 c d'],
+                                                    sample3.getParagraphs())
+        self.assertEqual(['Figure 1. legend'], sample3.getLegends())
+        self.assertEqual({'legend': 1, 'figure': 1, 'other': 1},
+                                            sample3.getParagraphKindCounts())
+
+        sample3.setField('text', text)                      # same text
+        self.assertIs(scan, sample3.getParagraphScan())
+        sample3.setField('ID', 'pmID4')                     # other field
+        self.assertIs(scan, sample3.getParagraphScan())
+
+        sample3.setField('text', 'Table 1')                 # changed text
+        self.assertEqual(['Table 1'], sample3.getLegends())
+        sample3.removeURLsLower()                           # preprocessor
+        self.assertEqual(['table 1'], sample3.getParagraphs())
+
+    def test_paragraphScanNoCache(self):
+        # subclass that sets self.values w/o BaseSample.__init__/setFields
+        class MySample (BaseSample):
+            def __init__(self, text):
+                self.values = {'ID': 'pmID5', 'text': text}
+        sample5 = MySample('Figure 1. legend\n\nsome text')
+        sample5.setField('ID', 'pmID6')
+        self.assertEqual(['Figure 1. legend'], sample5.getLegends())
+        self.assertEqual({'legend': 1, 'figure': 0, 'other': 1},
+                                            sample5.getParagraphKindCounts())
+        sample5 = MySample('Figure 1. legend\n\nsome text')
+        self.assertEqual(2, len(sample5.getParagraphs()))
+        sample5.setField('text', 'some text')
+        self.assertEqual([], sample5.getLegends())
+
+    def test_paragraphScanNoFigures(self):
+        # legends/paragraphs only: no looking for figure/table references
+        text = 'Figure 1. legend\n\nsome text\n\na b see Fig 2 c d'
+        sample3 = BaseSample().parseSampleRecordText('pmID3|' + text)
+        self.assertEqual(['Figure 1. legend'], sample3.getLegends())
+        self.assertEqual(3, len(sample3.getParagraphs()))
+        self.assertEqual([('text', '\n\n', False)],
+                                        list(sample3.paraScanCache.keys()))
+        scan = sample3.getParagraphScan(findFigures=False)
+        self.assertEqual(['legend', 'other', 'other'], [k for s,e,k in scan])
+
+        # once there is a full scan, legends/paragraphs use it
+        sample3.paraScanCache = {}
+        self.assertEqual({'legend': 1, 'figure': 1, 'other': 1},
+                                            sample3.getParagraphKindCounts())
+        self.assertEqual(['Figure 1. legend'], sample3.getLegends())
+        self.assertEqual([('text', '\n\n', True)],
+                                        list(sample3.paraScanCache.keys()))
+
+    def test_figureText(self):
+        text = 'Figure 1. legend\n\nsome text\n\na b see Fig 2 c d'
+        sample3 = BaseSample().parseSampleRecordText('pmID3|' + text)
+        samples = sample3.figureTextMulti([1, 2, 50])
+        self.assertEqual(text, sample3.getDocument())       # unchanged
+        self.assertEqual('Figure 1. legend\n\nsee Fig 2',
+                                                samples[1].getDocument())
+        self.assertEqual('Figure 1. legend\n\nb see Fig 2 c',
+                                                samples[2].getDocument())
+        sample3.figureText()
+        self.assertEqual(samples[50].getDocument(), sample3.getDocument())
 # end class BaseSample_tests
 ######################################
 
@@ -309,6 +376,59 @@ class SampleSet_tests(unittest.TestCase):
         self.ss.preprocess(['removeURLsLower', 'tokenPerLine'])
         self.assertEqual(expectedText, self.ss.getDocuments()[2])
 
+    def test_figureTextMulti(self):
+        sample3 = BaseSample().parseSampleRecordText('pmID3|a b see Fig 2 c d')
+        self.ss.addSample(sample3)
+        sets = self.ss.figureTextMulti([1, 2])
+        self.assertEqual(['', '', 'b see Fig 2 c'], sets[2].getDocuments())
+        self.assertEqual(['pmID1', 'pmID2', 'pmID3'], sets[1].getSampleIDs())
+        self.assertEqual('a b see Fig 2 c d', self.ss.getDocuments()[2])
+
+    def test_figureTextBatch(self):
+        sample3 = BaseSample().parseSampleRecordText( \
+                                        'pmID3|Table 1\n\na b see Fig 2 c d')
+        self.ss.addSample(sample3)
+        expected = sample3.figureTextMulti([50])[50].getDocument()
+        counts = self.ss.figureTextBatch()
+        self.assertEqual([(0, 0), (0, 0), (1, 1)], counts)
+        self.assertEqual(['', '', expected], self.ss.getDocuments())
+        self.assertEqual((1, 1), sample3.getFigTextCounts())
+
+    def test_figureTextBatchSameAsPreprocess(self):
+        text = 'Some text\n\nTable 1\n\n' + 'w ' * 60 + 'see Fig 2 c d'
+        ss1 = SampleSet(sampleObjType=BaseSample)
+        ss2 = SampleSet(sampleObjType=BaseSample)
+        for ss in [ss1, ss2]:
+            ss.addSample(BaseSample().parseSampleRecordText('pmID3|' + text))
+            ss.addSample(BaseSample().parseSampleRecordText('pmID4|text4'))
+        ss1.figureTextBatch()
+        ss2.preprocess(['figureText'])
+        self.assertNotEqual(text, ss1.getDocuments()[0])
+        self.assertEqual(ss2.getDocuments(), ss1.getDocuments())
+        self.assertEqual([ s.getFigTextCounts() for s in ss2.samples ],
+                         [ s.getFigTextCounts() for s in ss1.samples ])
+        self.assertEqual([(1, 1), (0, 0)],
+                         [ s.getFigTextCounts() for s in ss1.samples ])
+
+    def test_figureTextBatchRejectsOverride(self):
+        class MySample (BaseSample):
+            def figureText(self):
+                self.setField('text', 'mine')
+                return self
+        ss = SampleSet(sampleObjType=MySample)
+        for i in range(3):
+            ss.addSample(MySample().parseSampleRecordText('pmID%d|Table 1' % i))
+        ss.samples[1].setReject(True)
+        counts = ss.figureTextBatch()
+        self.assertEqual(['mine', 'Table 1', 'mine'], ss.getDocuments())
+        self.assertEqual([None, None, None], counts)
+
+        self.ss.samples[0].setField('text', 'Table 1')
+        self.ss.samples[0].setReject(True)
+        counts = self.ss.figureTextBatch()
+        self.assertEqual(['Table 1', ''], self.ss.getDocuments())
+        self.assertEqual([None, (0, 0)], counts)
+
 # end class SampleSet_tests
 ######################################
 
@@ -387,6 +507,27 @@ class ClassifiedSampleSet_tests(unittest.TestCase):
 
         os.remove(fileName)
 
+    def test_readBatches(self):
+        fileName = 'temporarySampleOutputFile.txt'
+        for writeMeta in [True, False]:
+            self.ss.write(fileName, writeMeta=writeMeta)
+            # small chunks so record ends are split across reads
+            for chunkSize in [1, 5, 1024*1024]:
+                ss2 = ClassifiedSampleSet(sampleObjType=ClassifiedSample)
+                batches = list(ss2.readBatches(fileName, batchSize=2,
+                                                        chunkSize=chunkSize))
+                self.assertEqual([2, 1], [b.getNumSamples() for b in batches])
+                self.assertEqual(0, ss2.getNumSamples())
+                for b in batches:
+                    self.assertEqual(ClassifiedSampleSet, type(b))
+                    self.assertEqual(ClassifiedSample, b.getSampleObjType())
+                self.assertEqual(['pmID1', 'pmID2', 'pmID3'],
+                        batches[0].getSampleIDs() + batches[1].getSampleIDs())
+                self.assertEqual(self.ss.getKnownYvalues(),
+                    batches[0].getKnownYvalues()+batches[1].getKnownYvalues())
+                self.assertEqual(writeMeta, ss2.meta.hasMetaData())
+        os.remove(fileName)
+
     def test_rejection(self):
 
         # test SampleSet before rejecting any samples
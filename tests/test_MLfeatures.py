@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+import unittest
+import io
+import pickle
+import random
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.ensemble import RandomForestClassifier
+from MLfeatures import *
+import MLtuningReports as trl
+
+"""
+These are tests for MLfeatures.py
+
+Usage:   python test_MLfeatures.py [-v]
+"""
+######################################
+# the old (sort everything/write per feature) versions, to compare against
+
+def oldOrderedFeatures(vectorizer, classifier):
+    if hasattr(classifier, 'feature_importances_'):
+        coefficients = classifier.feature_importances_
+    elif hasattr(classifier, 'coef_'):
+        coefficients = classifier.coef_[0].tolist()
+    else:
+        return []
+    pairList = zip(vectorizer.get_feature_names_out(), coefficients)
+    return sorted(pairList, key=lambda x: x[1], reverse=True)
+
+def oldWriteFeatures(vectorizer, classifier, fp, values=None):
+    delimiter = '|'
+    featureNames = vectorizer.get_feature_names_out()
+    hasCoef = hasattr(classifier, 'coef_')
+    if hasCoef: coefficients = classifier.coef_[0].tolist()
+    hasImportance = hasattr(classifier, 'feature_importances_')
+    if hasImportance: importances = classifier.feature_importances_.tolist()
+    for i,f in enumerate(featureNames):
+        fp.write(f)
+        if values is not None: fp.write(delimiter + '%d' % values[i])
+        if hasCoef:       fp.write(delimiter + '%+5.4f' % coefficients[i])
+        if hasImportance: fp.write(delimiter + '%+5.4f' % importances[i])
+        fp.write('\n')
+
+def oldVectorizerReport(vectorizer, nFeatures=10, sstart=trl.SSTART):
+    featureNames = list(vectorizer.get_feature_names_out())
+    midFeature   = int(len(featureNames)/2)
+    output =  sstart + "Vectorizer:   Number of Features: %d\n" \
+                                                % len(featureNames)
+    output += "First %d features: %s\n\n" % (nFeatures,
+                format(featureNames[:nFeatures]) )
+    output += "Middle %d features: %s\n\n" % (nFeatures,
+                format(featureNames[ midFeature : midFeature+nFeatures]) )
+    output += "Last %d features: %s\n\n" % (nFeatures,
+                format(featureNames[-nFeatures:]) )
+    return output
+
+def randomDocs(numDocs=60):
+    random.seed(1)
+    words = [ 'w%d' % i for i in range(300) ]
+    docs = [ ' '.join(random.choices(words, k=30)) for i in range(numDocs) ]
+    y = [ i % 2 for i in range(numDocs) ]
+    return docs, y
+
+class FixedCoef(object):
+    """ classifier w/ the given coef_ """
+    def __init__(self, coef): self.coef_ = np.array([coef])
+
+######################################
+
+class TopFeatures_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs, self.y = randomDocs()
+        self.vectorizer = CountVectorizer()
+        X = self.vectorizer.fit_transform(self.docs)
+        self.sgd = SGDClassifier(random_state=0).fit(X, self.y)
+        self.forest = RandomForestClassifier(n_estimators=5,
+                                        random_state=0).fit(X, self.y)
+
+    def checkTopFeatures(self, vectorizer, classifier, num):
+        ordered = oldOrderedFeatures(vectorizer, classifier)
+        top = getTopFeatures(vectorizer, classifier, num)
+        if 2*num >= len(ordered): self.assertEqual(top, ordered)
+        else: self.assertEqual(top, ordered[:num] + ordered[-num:])
+        self.assertEqual(trl.getTopFeaturesReport(top, num),
+                            trl.getTopFeaturesReport(ordered, num))
+
+    def test_sameAsSorted(self):
+        for num in [1, 5, 20, 150, 1000]:
+            self.checkTopFeatures(self.vectorizer, self.sgd, num)
+            # most importances are 0 - lots of ties
+            self.checkTopFeatures(self.vectorizer, self.forest, num)
+
+    def test_ties(self):
+        vectorizer = CountVectorizer().fit(['aa bb cc dd ee ff gg hh'])
+        for coef in [[1, 0, 0, 1, 0, 1, 0, 0], [0.5]*8, [-1, 2, -1, 2, 0, 0, 3, -1]]:
+            for num in [1, 2, 3, 4]:
+                self.checkTopFeatures(vectorizer, FixedCoef(coef), num)
+
+    def test_noCoefs(self):
+        self.assertEqual(getTopFeatures(self.vectorizer, object()), [])
+        self.assertEqual(getCoefficients(object()), None)
+
+    def test_featureNames(self):
+        allNames = self.vectorizer.get_feature_names_out().tolist()
+        self.assertEqual(getAllFeatureNames(self.vectorizer).tolist(), allNames)
+        self.assertEqual(getFeatureNames(self.vectorizer, [5, 0, 5, 299]),
+                        [allNames[5], allNames[0], allNames[5], allNames[299]])
+        self.assertEqual(getNumFeatures(self.vectorizer), len(allNames))
+# end class TopFeatures_tests
+######################################
+
+class FeatureReports_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs, self.y = randomDocs()
+        self.vectorizer = CountVectorizer()
+        self.X = self.vectorizer.fit_transform(self.docs)
+        self.values = self.X.sum(axis=0, dtype=int).tolist()[0]
+
+    def test_writeFeatures(self):
+        for classifier in [SGDClassifier(random_state=0),
+                        RandomForestClassifier(n_estimators=5, random_state=0)]:
+            classifier.fit(self.X, self.y)
+            for values in [None, self.values]:
+                old = io.StringIO()
+                oldWriteFeatures(self.vectorizer, classifier, old, values)
+                for chunkSize in [7, 10000]:
+                    new = io.StringIO()
+                    writeFeatures(self.vectorizer, classifier, new,
+                                            values=values, chunkSize=chunkSize)
+                    self.assertEqual(new.getvalue(), old.getvalue())
+
+    def test_getVectorizerReport(self):
+        for vectorizer in [self.vectorizer, CountVectorizer().fit(['aa bb cc'])]:
+            for nFeatures in [1, 10, 400]:
+                self.assertEqual(
+                    trl.getVectorizerReport(vectorizer, nFeatures=nFeatures),
+                    oldVectorizerReport(vectorizer, nFeatures=nFeatures))
+# end class FeatureReports_tests
+######################################
+
+class CompactPipeline_tests(unittest.TestCase):
+
+    def setUp(self):
+        from sklearn.pipeline import Pipeline
+        from MLsklearnHelper import FeatureDocCounter
+        self.docs, self.y = randomDocs()
+        self.pipeline = Pipeline( [
+            ('vectorizer', CountVectorizer(ngram_range=(1,2), min_df=2)),
+            ('featureEvaluator', FeatureDocCounter()),
+            ('classifier', SGDClassifier(penalty='l1', alpha=0.001,
+                                                        random_state=0)), ] )
+        self.pipeline.fit(self.docs, self.y)
+
+    def test_samePredictions(self):
+        vectorizer = self.pipeline.named_steps['vectorizer']
+        classifier = self.pipeline.named_steps['classifier']
+        counter    = self.pipeline.named_steps['featureEvaluator']
+        oldFeatures = getAllFeatureNames(vectorizer)
+        oldCoef     = classifier.coef_[0]
+        oldDocFreqs = counter.getDocFreqs()
+        decisions   = self.pipeline.decision_function(self.docs)
+        self.assertTrue(len(vectorizer.stop_words_) > 0)
+
+        numBefore, numAfter = compactPipeline(self.pipeline)
+        kept = oldCoef != 0
+        self.assertEqual((numBefore, numAfter), (len(oldCoef), kept.sum()))
+        self.assertTrue(0 < numAfter < numBefore)
+        self.assertFalse(hasattr(vectorizer, 'stop_words_'))
+        self.assertEqual(getAllFeatureNames(vectorizer).tolist(),
+                                                    oldFeatures[kept].tolist())
+        self.assertEqual(classifier.coef_[0].tolist(), oldCoef[kept].tolist())
+        self.assertEqual(counter.getDocFreqs().tolist(),
+                                                oldDocFreqs[kept].tolist())
+        self.assertEqual(self.pipeline.decision_function(self.docs).tolist(),
+                                                        decisions.tolist())
+    def test_threshold(self):
+        coef = self.pipeline.named_steps['classifier'].coef_[0]
+        threshold = np.median(np.abs(coef[coef != 0]))
+        numBefore, numAfter = compactPipeline(self.pipeline,threshold=threshold)
+        self.assertEqual(numAfter, (np.abs(coef) > threshold).sum())
+
+    def test_cannotCompact(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.feature_extraction.text import TfidfTransformer
+        # all coefs removed
+        self.assertRaises(ValueError, compactPipeline, self.pipeline,
+                                                            threshold=1e10)
+        # no coef_
+        self.pipeline.steps[-1] = ('classifier',
+            RandomForestClassifier(n_estimators=2).fit(
+                    self.pipeline[:-1].transform(self.docs), self.y))
+        self.assertRaises(ValueError, compactPipeline, self.pipeline)
+        # a step between the vectorizer & classifier it can't compact
+        pipeline = Pipeline( [ ('vectorizer', CountVectorizer()),
+                               ('tfidf', TfidfTransformer()),
+                               ('classifier', SGDClassifier()), ] )
+        pipeline.fit(self.docs, self.y)
+        self.assertRaises(ValueError, compactPipeline, pipeline)
+
+    def test_tfidf(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        def getPipeline(**params):
+            return Pipeline( [
+                ('vectorizer', TfidfVectorizer(min_df=2, **params)),
+                ('classifier', SGDClassifier(penalty='l1', alpha=0.001,
+                                            random_state=0)), ] ).fit(self.docs,
+                                                                    self.y)
+        # l2 norm: removing features changes the normalized values
+        pipeline = getPipeline()
+        coef = pipeline.named_steps['classifier'].coef_.copy()
+        self.assertTrue((coef == 0).any())
+        self.assertRaises(ValueError, compactPipeline, pipeline)
+        self.assertEqual(pipeline.named_steps['classifier'].coef_.tolist(),
+                                                    coef.tolist())  # unchanged
+        decisions = pipeline.decision_function(self.docs)
+        numBefore, numAfter = compactPipeline(pipeline, force=True)
+        self.assertTrue(numAfter < numBefore)
+        self.assertFalse(np.allclose(pipeline.decision_function(self.docs),
+                                                                    decisions))
+        # no norm: idf_ is remapped & the predictions are the same
+        pipeline = getPipeline(norm=None)
+        decisions = pipeline.decision_function(self.docs)
+        numBefore, numAfter = compactPipeline(pipeline)
+        self.assertTrue(numAfter < numBefore)
+        self.assertEqual(len(pipeline.named_steps['vectorizer'].idf_),numAfter)
+        self.assertTrue(np.allclose(pipeline.decision_function(self.docs),
+                                                                    decisions))
+# end class CompactPipeline_tests
+######################################
+
+class CompactVocabulary_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs, self.y = randomDocs()
+        self.vectorizer = CountVectorizer(ngram_range=(1,2)).fit(self.docs)
+        self.vocab = self.vectorizer.vocabulary_
+
+    def test_mapping(self):
+        vocab = {'caf\u00e9' : 2, 'a b' : 0, '' : 5, '\u03b1-actin' : 1}
+        cv = CompactVocabulary(vocab)
+        self.assertEqual(dict(cv), vocab)
+        self.assertEqual(len(cv), 4)
+        self.assertEqual(cv['caf\u00e9'], 2)
+        self.assertEqual(dict(cv.items()), vocab)
+        self.assertEqual(sorted(cv.values()), sorted(vocab.values()))
+        self.assertTrue('a b' in cv)
+        self.assertFalse('a' in cv)
+        self.assertRaises(KeyError, cv.__getitem__, 'cafe')
+        self.assertRaises(KeyError, cv.__getitem__, 2)
+        self.assertEqual(cv.get(b'a b'), None)
+        self.assertEqual(dict(CompactVocabulary({})), {})
+
+    def test_bigVocab(self):
+        cv = CompactVocabulary(self.vocab)
+        self.assertEqual(cv, self.vocab)
+        for term, i in self.vocab.items():
+            self.assertEqual(cv[term], i)
+        self.assertEqual(cv.table.itemsize, 4)
+        self.assertTrue(len(cv.table) * cv.loadFactor >= len(cv))
+
+    def test_pickle(self):
+        cv = CompactVocabulary(self.vocab)
+        cv2 = pickle.loads(pickle.dumps(cv))
+        self.assertEqual(type(cv2), CompactVocabulary)
+        self.assertEqual(dict(cv2.items()), self.vocab)
+
+    def test_dropIn(self):
+        X = self.vectorizer.transform(self.docs)
+        names = self.vectorizer.get_feature_names_out().tolist()
+        compactVocabulary(self.vectorizer)
+        self.assertEqual(type(self.vectorizer.vocabulary_), CompactVocabulary)
+        vectorizer = pickle.loads(pickle.dumps(self.vectorizer))
+        self.assertEqual((vectorizer.transform(self.docs) != X).nnz, 0)
+        self.assertEqual(vectorizer.get_feature_names_out().tolist(), names)
+        self.assertEqual(getAllFeatureNames(vectorizer).tolist(), names)
+
+    def test_compactPipeline(self):
+        from sklearn.pipeline import Pipeline
+        pipeline = Pipeline( [('vectorizer', self.vectorizer),
+                ('classifier', SGDClassifier(penalty='l1', alpha=0.001,
+                                                        random_state=0)), ] )
+        pipeline.fit(self.docs, self.y)
+        decisions = pipeline.decision_function(self.docs)
+        compactVocabulary(self.vectorizer)
+        numBefore, numAfter = compactPipeline(pipeline)
+        self.assertEqual(type(self.vectorizer.vocabulary_), CompactVocabulary)
+        self.assertEqual(len(self.vectorizer.vocabulary_), numAfter)
+        self.assertEqual(pipeline.decision_function(self.docs).tolist(),
+                                                            decisions.tolist())
+
+    def test_toIntArray(self):
+        self.assertEqual(toIntArray(np.array([1, -5, 2**31-1])).tolist(),
+                                                            [1, -5, 2**31-1])
+        self.assertEqual(toIntArray(np.array([1, -5])).itemsize, 4)
+        self.assertEqual(toIntArray(np.array([2**31, -1])).itemsize, 8)
+        self.assertEqual(toIntArray(np.array([2**31, -1])).tolist(),
+                                                                [2**31, -1])
+# end class CompactVocabulary_tests
+######################################
+
+if __name__ == "__main__":
+    unittest.main()
@@ -162,5 +162,103 @@ class LegsAndFigWords_tests(unittest.TestCase):
         self.assertEqual(legs[5], 'blurbs: table b1.1-b2.2 fig')
 # end class LegsAndFigWords_tests ----------------------------------
 
+class ScanParagraphs_tests(unittest.TestCase):
+
+    def setUp(self):
+        paraBnd = '\n\n'
+        self.text = paraBnd.join([' Figure 1 blah. ',
+                            '',         # should be ignored
+                            ' \n',      # should be ignored
+                            'a figure paragraph 2.',
+                            'a non interesting paragraph',
+                            'table 3 legend',
+                            'mentions tables',
+                            ]) + paraBnd
+
+    def test_paragraphSpans(self):
+        spans = list(paragraphSpans(self.text))
+        self.assertEqual([self.text[s:e] for s,e in spans],
+                                                list(paragraphs(self.text)))
+        self.assertEqual(spans[0], (1, 15))
+        self.assertEqual(list(paragraphSpans('')), [])
+        self.assertEqual(list(paragraphSpans(' \n\n ')), [])
+
+    def test_scanParagraphs(self):
+        kinds = [k for s,e,k in scanParagraphs(self.text)]
+        self.assertEqual(kinds, [PARA_LEGEND, PARA_FIGURE, PARA_OTHER,
+                                                    PARA_LEGEND, PARA_FIGURE])
+        self.assertEqual(countParagraphKinds(self.text),
+            {PARA_LEGEND: 2, PARA_FIGURE: 2, PARA_OTHER: 1})
+        self.assertEqual([self.text[s:e] for s,e in legendSpans(self.text)],
+                                                list(legends(self.text)))
+
+    def test_wordCharParaBnd(self):
+        # paraBnd ending in a word char: "fig" in "Xfig" is not a legend
+        #  if we ignore the paraBnd, and is a word on its own
+        paraBnd = 'PARX'
+        text = paraBnd.join(['fig 1 legend', 'see fig 2', 'tablet', 'figure'])
+        kinds = [k for s,e,k in scanParagraphs(text, paraBnd)]
+        self.assertEqual(kinds,
+                        [PARA_LEGEND, PARA_FIGURE, PARA_OTHER, PARA_LEGEND])
+        self.assertEqual(list(legendsAndFigWords(text, paraBnd, numWords=1)),
+                        ['fig 1 legend', 'see fig 2', 'figure'])
+# end class ScanParagraphs_tests ----------------------------------
+
+class FigureTextBatch_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.texts = [
+            'Figure 1 legend.\n\na b see Fig 2 c d e f g h fig 3\n\nnone',
+            '',
+            'nothing here',
+            'Table 1\n\nTable 2 legend\n\nin tables and figures',
+            ] * 5
+
+    def test_figureTextCounts(self):
+        figText, numLegends, numBlurbs = figureTextCounts(self.texts[0],
+                                                                numWords=1)
+        self.assertEqual(figText, '\n\n'.join(legendsAndFigWords(
+                                                self.texts[0], numWords=1)))
+        self.assertEqual((numLegends, numBlurbs), (1, 2))
+        self.assertEqual(figureTextCounts(self.texts[3])[1:], (2, 1))
+        self.assertEqual(figureTextCounts(''), ('', 0, 0))
+
+    def test_legendsAndFigWordsBatch(self):
+        serial = [ figureTextCounts(t, numWords=2) for t in self.texts ]
+        self.assertEqual(legendsAndFigWordsBatch(self.texts, numWords=2),
+                                                                    serial)
+        self.assertEqual(legendsAndFigWordsBatch(self.texts, numWords=2,
+                                        numJobs=2, chunkSize=3), serial)
+# end class FigureTextBatch_tests ----------------------------------
+
+class Prefilter_tests(unittest.TestCase):
+    """ isLegend() and hasFigureRef() should agree w/ legendRe and figureRe """
+
+    def setUp(self):
+        parts = ['Fig', 'F i g', 'F  I G', 'f\u0130g', 'f\u0131gure', 'figs',
+                'Table', 'T a b l e', 'tablet', 'xfig', '\u017fupp', 'S u p p',
+                'Supplemental', 'On line', 'ONLINE', 'Extended Data', 'ext',
+                '', ' ', '  ', '\n', '. ', '1', 'S1', 'the', '_']
+        self.texts = []
+        for p1 in parts:
+            for p2 in parts:
+                for p3 in ['', ' ', ' Figure', ' table 2', 'ure']:
+                    self.texts.append(p1 + p2 + p3)
+                    self.texts.append(p1 + ' ' + p2 + p3)
+
+    def test_isLegend(self):
+        for t in self.texts:
+            self.assertEqual(isLegend(t), bool(legendRe.match(t)), repr(t))
+            self.assertEqual(isLegend('x ' + t, 2),
+                                    bool(legendRe.match(t)), repr(t))
+        self.assertTrue(isLegend('xfig 1', 1))        # same as 'fig 1'
+
+    def test_hasFigureRef(self):
+        for t in self.texts:
+            self.assertEqual(hasFigureRef(t), bool(figureRe.search(t)), repr(t))
+            self.assertEqual(hasFigureRef('see ' + t + ' x', 4, 4+len(t)),
+                                    bool(figureRe.search(t)), repr(t))
+# end class Prefilter_tests ----------------------------------
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import pickle
+import numpy as np
+from MLsklearnHelper import *
+
+"""
+These are tests for MLsklearnHelper.py
+
+Usage:   python test_MLsklearnHelper.py [-v]
+"""
+######################################
+
+# the stemming preprocessors before StemCache, to compare against
+def oldStemText(text):
+    output = ''
+    for m in token_re.finditer(text):
+        output += " " + stemmer.stem(m.group())
+    return output
+
+def old_vectorizer_preprocessor_stem(input):
+    output = ''
+    for s in urls_re.split(input):
+        s.lower()
+        for m in token_re.finditer(s):
+            output += " " + stemmer.stem(m.group())
+    return output
+
+def old_vectorizer_preprocessor(input):
+    output = ''
+    for s in urls_re.split(input):
+        output += ' ' + s.lower()
+    return output
+
+DOCS = ['', '   ', '123 456',
+    'The Running dogs ran quickly, running http://x.org/run-fast runs',
+    'see https://doi.org/10.1/x\nand HTTP://FOO.COM.  Generalizations',
+    'mice mouse _under_scored words2 2words a b cd e-f',
+    'nohttp://x.org foo http://end',
+    ]
+
+class StemCache_tests(unittest.TestCase):
+
+    def test_stemText(self):
+        sc = StemCache(stemmer)
+        for doc in DOCS:
+            self.assertEqual(sc.stemText(doc), oldStemText(doc))
+            self.assertEqual(sc.stemText(doc), oldStemText(doc))    # cached
+
+    def test_hitRate(self):
+        sc = StemCache(stemmer)
+        self.assertEqual(sc.getHitRate(), 0.0)
+        sc.stemText('running runs running running')
+        self.assertEqual(sc.getNumMisses(), 2)
+        self.assertEqual(sc.getNumHits(), 2)
+        self.assertEqual(sc.getHitRate(), 0.5)
+        sc.clear()
+        self.assertEqual(sc.getSize(), 0)
+
+    def test_addCounts(self):
+        sc = StemCache(stemmer)
+        sc.stemText('running runs')
+        sc.addCounts(6, 2)
+        self.assertEqual(sc.getNumHits(), 6)
+        self.assertEqual(sc.getNumMisses(), 4)
+        self.assertEqual(sc.getHitRate(), 0.6)
+
+    def test_lru(self):
+        sc = StemCache(stemmer, maxSize=2)
+        sc.stem('runs')
+        sc.stem('dogs')
+        sc.stem('runs')                 # dogs is now least recently used
+        sc.stem('cats')
+        self.assertEqual(list(sc.stems.keys()), ['runs', 'cats'])
+        self.assertEqual(sc.stem('dogs'), 'dog')
+        self.assertEqual(sc.getNumMisses(), 4)
+
+    def test_saveLoad(self):
+        fileName = 'stemCacheTest.pkl'
+        sc = StemCache(stemmer)
+        sc.stemText('running dogs and cats')
+        sc.save(fileName)
+        try:
+            sc2 = StemCache(stemmer).load(fileName)
+            self.assertEqual(sc2.stems, sc.stems)
+            sc2.stemText('running dogs')
+            self.assertEqual(sc2.getHitRate(), 1.0)
+
+            sc3 = StemCache(stemmer, maxSize=2).load(fileName)
+            self.assertEqual(list(sc3.stems.keys()), ['and', 'cats'])
+        finally:
+            os.remove(fileName)
+# end class StemCache_tests
+######################################
+
+class StemmingPreprocessor_tests(unittest.TestCase):
+
+    def test_vectorizer_preprocessor_stem(self):
+        for doc in DOCS:
+            self.assertEqual(vectorizer_preprocessor_stem(doc),
+                                        old_vectorizer_preprocessor_stem(doc))
+
+    def test_vectorizer_preprocessor(self):
+        for doc in DOCS:
+            self.assertEqual(vectorizer_preprocessor(doc),
+                                        old_vectorizer_preprocessor(doc))
+
+    def test_StemmedVectorizers(self):
+        for vecType in [StemmedCountVectorizer, StemmedTfidfVectorizer]:
+            pp = vecType().build_preprocessor()
+            for doc in DOCS:
+                self.assertEqual(pp(doc), oldStemText(doc.lower()))
+
+            vec = vecType(min_df=1).fit(DOCS)
+            self.assertIn('run', vec.vocabulary_)
+            self.assertNotIn('running', vec.vocabulary_)
+
+    def test_StemmingPreprocessor(self):
+        pp = StemmedCountVectorizer().build_preprocessor()
+        expected = [ pp(doc) for doc in DOCS ]
+        for n_jobs in [1, 2]:
+            sp = StemmingPreprocessor(n_jobs=n_jobs, chunkSize=2)
+            self.assertEqual(sp.fit_transform(DOCS), expected)
+
+        sp = StemmingPreprocessor(removeURLs=True)
+        self.assertEqual(sp.transform(DOCS),
+                            [ vectorizer_preprocessor_stem(d) for d in DOCS ])
+
+    def test_StemmingPreprocessorCounts(self):
+        # the workers' stemCache hit/miss counts & stems are added to this
+        #   process's stemCache
+        words = [ w for d in DOCS for w in token_re.findall(d.lower()) ]
+        numWords = len(words)
+        expectedStems = { w : stemmer.stem(w) for w in words }
+        for n_jobs in [1, 2]:
+            stemCache.clear()
+            sp = StemmingPreprocessor(n_jobs=n_jobs, chunkSize=2)
+            sp.transform(DOCS)
+            self.assertEqual(stemCache.getNumHits() + stemCache.getNumMisses(),
+                                                                    numWords)
+            self.assertEqual(stemCache.getSize(), len(expectedStems))
+            self.assertEqual(dict(stemCache.stems), expectedStems)
+        stemCache.clear()
+
+    def test_StemmingPreprocessorPipeline(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        pipeline = Pipeline( [
+            ('stemmer',    StemmingPreprocessor(n_jobs=2, chunkSize=2)),
+            ('vectorizer', CountVectorizer()),
+            ('classifier', SGDClassifier(random_state=0)),
+            ] )
+        y = [ i % 2 for i in range(len(DOCS)) ]
+        pipeline.fit(DOCS, y)
+        self.assertIn('run', pipeline.named_steps['vectorizer'].vocabulary_)
+
+        model = pickle.loads(pickle.dumps(pipeline))
+        self.assertEqual(model.named_steps['stemmer'].n_jobs, 2)
+        self.assertEqual(list(model.predict(DOCS)), list(pipeline.predict(DOCS)))
+# end class StemmingPreprocessor_tests
+######################################
+
+class TransformerCache_tests(unittest.TestCase):
+
+    def test_getTransformerCacheStats(self):
+        import tempfile
+        import shutil
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.model_selection import GridSearchCV
+        docs = [ 'doc%d has has words %s' % (i, 'yes' if i % 2 else 'no')
+                                                        for i in range(20) ]
+        y = [ i % 2 for i in range(20) ]
+        cacheDir = tempfile.mkdtemp()
+        try:
+            pipeline = Pipeline( [
+                ('vectorizer', CountVectorizer()),
+                ('classifier', SGDClassifier(random_state=0)),
+                ], memory=cacheDir)
+            params = {'vectorizer__binary' : [True, False],
+                      'classifier__alpha'  : [1, 0.1, 0.01],}
+            gs = GridSearchCV(pipeline, params, cv=2).fit(docs, y)
+
+            # vectorizer used in 6 candidates * 2 folds + refit, but only
+            #  fit for 2 vectorizer params * 2 folds + refit
+            numFits, numHits = getTransformerCacheStats(gs, cacheDir)
+            self.assertEqual(numFits, 13)
+            self.assertEqual(countCachedFits(cacheDir), 5)
+            self.assertEqual(numHits, 8)
+        finally:
+            shutil.rmtree(cacheDir)
+# end class TransformerCache_tests
+######################################
+
+class FeatureDocCounter_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = ['foo foo bar', 'bar baz', 'foo foo foo', 'baz']
+        self.y    = [1, 0, 1, 1]
+        self.X    = CountVectorizer().fit_transform(self.docs) # bar, baz, foo
+
+    def test_fitStats(self):
+        counter = FeatureDocCounter().fit(self.X, self.y)
+        self.assertEqual(counter.getValues(), [2, 2, 2])
+        self.assertEqual(counter.getTermFreqs().tolist(), [2, 2, 5])
+        self.assertEqual(counter.getClasses().tolist(), [0, 1])
+        self.assertEqual(counter.getClassDocFreqs().tolist(),
+                                                    [[1, 1, 0], [1, 1, 2]])
+        # dense X, no y
+        counter = FeatureDocCounter().fit(self.X.toarray())
+        self.assertEqual(counter.getDocFreqs().tolist(), [2, 2, 2])
+        self.assertEqual(counter.getClassDocFreqs(), None)
+
+    def test_explicitZeros(self):
+        X = self.X.copy()
+        X.data[0] = 0                   # doc 0, 1st stored value
+        before = X.nnz
+        counter = FeatureDocCounter().fit(X)
+        self.assertEqual(sum(counter.getValues()), 5)
+        self.assertEqual(X.nnz, before) # X not changed
+
+    def test_transformNoop(self):
+        counter = FeatureDocCounter()
+        self.assertIs(counter.fit_transform(self.X, self.y), self.X)
+        other = CountVectorizer(vocabulary=['bar','baz','foo']).transform(
+                                                                    ['bar'])
+        self.assertIs(counter.transform(other), other)
+        self.assertEqual(counter.getValues(), [2, 2, 2])
+# end class FeatureDocCounter_tests
+######################################
+
+class CountOnceVectorizer_tests(unittest.TestCase):
+
+    def setUp(self):
+        import random
+        random.seed(1)
+        words = [ 'w%d' % i for i in range(40) ]
+        self.docs = [ ' '.join(random.choices(words, k=random.randint(0,30)))
+                                                        for i in range(60) ]
+        CountOnceVectorizer.clearCache()
+
+    def tearDown(self):
+        CountOnceVectorizer.clearCache()
+
+    def assertSameVectorizers(self, params):
+        cv  = CountVectorizer(**params)
+        cov = CountOnceVectorizer(cacheCounts=True, **params)
+        X   = cv.fit_transform(self.docs)
+        coX = cov.fit_transform(self.docs)
+        self.assertEqual(cov.vocabulary_, cv.vocabulary_)
+        self.assertEqual(cov.stop_words_, cv.stop_words_)
+        self.assertEqual((coX != X).nnz, 0)
+        self.assertEqual((cov.transform(self.docs[:5]) != \
+                                        cv.transform(self.docs[:5])).nnz, 0)
+
+    def test_sameAsCountVectorizer(self):
+        for ngram_range in [(1,1), (1,2)]:
+            for binary in [True, False]:
+                for min_df, max_df, max_features in [(1, 1.0, None),
+                            (2, 0.5, None), (0.1, 30, None), (3, 0.9, 20),
+                            (1, 1.0, 5),]:
+                    self.assertSameVectorizers( {'ngram_range' : ngram_range,
+                            'binary' : binary, 'min_df' : min_df,
+                            'max_df' : max_df, 'max_features' : max_features})
+        # only tokenized once for each ngram_range, binary combination
+        #   (docs & docs[:5])
+        self.assertEqual(len(CountOnceVectorizer.countsCache), 2*4)
+
+        cov = CountOnceVectorizer(min_df=3, cacheCounts=True).fit(self.docs)
+        cv = pickle.loads(pickle.dumps(cov))
+        self.assertFalse(hasattr(cv, 'countsKey'))
+        self.assertEqual((cov.transform(self.docs) != \
+                                        cv.transform(self.docs)).nnz, 0)
+
+        cov = CountOnceVectorizer(min_df=5, max_df=2, cacheCounts=True)
+        self.assertRaises(ValueError, cov.fit, self.docs)
+        cov = CountOnceVectorizer(min_df=1000, cacheCounts=True)
+        self.assertRaises(ValueError, cov.fit, self.docs)
+
+    def test_noCaching(self):
+        # by default (e.g., trainModel.py), just a CountVectorizer
+        cov = CountOnceVectorizer(min_df=2)
+        X = cov.fit_transform(self.docs)
+        self.assertEqual(len(CountOnceVectorizer.countsCache), 0)
+        self.assertEqual(CountOnceVectorizer.getCacheBytes(), 0)
+        cv = CountVectorizer(min_df=2)
+        self.assertEqual((X != cv.fit_transform(self.docs)).nnz, 0)
+        self.assertEqual(cov.vocabulary_, cv.vocabulary_)
+
+    def test_maxCacheBytes(self):
+        saved = CountOnceVectorizer.maxCacheBytes
+        try:
+            CountOnceVectorizer(cacheCounts=True).fit(self.docs)
+            entrySize = CountOnceVectorizer.getCacheBytes()
+            self.assertTrue(entrySize > 0)
+
+            # room for 2 entries like that
+            CountOnceVectorizer.maxCacheBytes = 2 * entrySize + 1
+            for binary in [True, False]:
+                for ngram_range in [(1,1), (1,2)]:
+                    CountOnceVectorizer(cacheCounts=True, binary=binary,
+                                    ngram_range=ngram_range).fit(self.docs)
+                    self.assertTrue(CountOnceVectorizer.getCacheBytes() <= \
+                                        CountOnceVectorizer.maxCacheBytes
+                                    or len(CountOnceVectorizer.countsCache)==1)
+            self.assertTrue(len(CountOnceVectorizer.countsCache) <= 2)
+            self.assertEqual(CountOnceVectorizer.getCacheBytes(),
+                        sum(map(getCountsSize,
+                                CountOnceVectorizer.countsCache.values())))
+
+            # newest entry is kept even if it is too big
+            CountOnceVectorizer.maxCacheBytes = 1
+            CountOnceVectorizer(cacheCounts=True, min_df=2).fit(self.docs[:9])
+            self.assertEqual(len(CountOnceVectorizer.countsCache), 1)
+        finally:
+            CountOnceVectorizer.maxCacheBytes = saved
+
+    def test_setCountOnceCaching(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        pipeline = Pipeline( [ ('vectorizer', CountOnceVectorizer()),
+                            ('classifier', SGDClassifier(random_state=0)),] )
+        self.assertEqual(setCountOnceCaching(pipeline, True), 1)
+        self.assertTrue(pipeline.named_steps['vectorizer'].cacheCounts)
+        self.assertEqual(setCountOnceCaching(pipeline, False), 1)
+        self.assertFalse(pipeline.named_steps['vectorizer'].cacheCounts)
+        self.assertEqual(setCountOnceCaching(Pipeline(
+                [('v', CountVectorizer()), ('c', SGDClassifier())]), True), 0)
+
+    def test_gridSearch(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.model_selection import GridSearchCV
+        y = [ i % 2 for i in range(len(self.docs)) ]
+        params = {'vectorizer__min_df' : [1, 2, 5],
+                  'vectorizer__max_df' : [0.5, 1.0],}
+        results = []
+        for vectorizer in [CountVectorizer(),
+                            CountOnceVectorizer(cacheCounts=True)]:
+            pipeline = Pipeline( [ ('vectorizer', vectorizer),
+                            ('classifier', SGDClassifier(random_state=0)),] )
+            gs = GridSearchCV(pipeline, params, cv=3).fit(self.docs, y)
+            results.append( (list(gs.cv_results_['mean_test_score']),
+                        gs.best_estimator_.named_steps['vectorizer'].vocabulary_))
+        self.assertEqual(results[0], results[1])
+        # each fold's train & test docs + the refit tokenized once
+        self.assertEqual(len(CountOnceVectorizer.countsCache), 3*2 + 1)
+# end class CountOnceVectorizer_tests
+######################################
+
+class MappedCorpus_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = ['first doc', '', 'caf\u00e9 \u03b1-actin', 'last\ndoc']
+        self.corpus = MappedCorpus(self.docs)
+
+    def tearDown(self):
+        self.corpus.remove()
+
+    def test_list(self):
+        c = self.corpus
+        self.assertEqual(len(c), 4)
+        self.assertEqual(list(c), self.docs)
+        self.assertEqual(c[2], self.docs[2])
+        self.assertEqual(c[-1], self.docs[-1])
+        self.assertEqual(c[np.int64(1)], '')
+        self.assertEqual(c[1:3], self.docs[1:3])
+        self.assertRaises(IndexError, c.__getitem__, 4)
+
+        empty = MappedCorpus([])
+        self.assertEqual(list(empty), [])
+        empty2 = MappedCorpus(['', ''])
+        self.assertEqual(list(empty2), ['', ''])
+        for c in [empty, empty2]:
+            c.remove()
+            self.assertFalse(os.path.exists(c.fileName))
+            self.assertFalse(os.path.exists(c.offsetsFileName))
+
+    def test_pickle(self):
+        bigDocs = [ 'doc %d ' % i * 100 for i in range(1000) ]
+        big = MappedCorpus(bigDocs)
+        try:
+            pickled = pickle.dumps(big)
+            self.assertLess(len(pickled), 500)
+            self.assertEqual(list(pickle.loads(pickled)), bigDocs)
+        finally:
+            big.remove()
+
+    def test_gridSearch(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.model_selection import GridSearchCV
+        docs = [ 'doc%d has has words %s' % (i, 'yes' if i % 2 else 'no')
+                                                        for i in range(40) ]
+        y = np.array([ i % 2 for i in range(40) ])
+        corpus = MappedCorpus(docs)
+        try:
+            results = []
+            for X in [docs, corpus]:
+                pipeline = Pipeline( [ ('vectorizer', CountVectorizer()),
+                            ('classifier', SGDClassifier(random_state=0)),] )
+                gs = GridSearchCV(pipeline, {'classifier__alpha' : [1, 0.1]},
+                                                    cv=2, n_jobs=2).fit(X, y)
+                results.append(list(gs.cv_results_['mean_test_score']))
+            self.assertEqual(results[0], results[1])
+        finally:
+            corpus.remove()
+# end class MappedCorpus_tests
+######################################
+
+class VectorizedDocCache_tests(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.cacheDir = tempfile.mkdtemp()
+        self.docs = [ 'doc%d has has words %s' % (i, 'yes' if i % 2 else 'no')
+                                                        for i in range(20) ]
+        self.y = [ i % 2 for i in range(20) ]
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.cacheDir)
+
+    def getPipeline(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        return Pipeline( [
+                ('stemmer',    StemmingPreprocessor()),
+                ('vectorizer', CountVectorizer(min_df=2)),
+                ('classifier', SGDClassifier(random_state=0)),] )
+
+    def test_splitPipeline(self):
+        pipeline = self.getPipeline()
+        front, rest = splitPipeline(pipeline)
+        self.assertEqual([ n for n, s in front.steps], ['stemmer','vectorizer'])
+        self.assertEqual([ n for n, s in rest.steps], ['classifier'])
+        self.assertIs(front.named_steps['vectorizer'],
+                                        pipeline.named_steps['vectorizer'])
+        self.assertRaises(ValueError, splitPipeline, pipeline, 'classifier')
+        self.assertRaises(ValueError, splitPipeline, pipeline, 'foo')
+
+    def test_fitTransform(self):
+        expected = self.getPipeline().fit(self.docs, self.y)
+
+        for i in range(2):
+            cache = VectorizedDocCache(self.cacheDir)
+            model = self.getPipeline()
+            front, rest = splitPipeline(model)
+            front, X = cache.fitTransform(front, self.docs, self.y)
+            rest.fit(X, self.y)
+            model.set_params(**dict(front.steps))
+            self.assertEqual((cache.getNumHits(), cache.getNumMisses()),
+                                                            (i, 1 - i))
+            self.assertEqual(model.named_steps['vectorizer'].vocabulary_,
+                                expected.named_steps['vectorizer'].vocabulary_)
+            self.assertEqual(list(model.predict(self.docs)),
+                                        list(expected.predict(self.docs)))
+
+        # different vectorizer params
+        front, rest = splitPipeline(self.getPipeline())
+        front.set_params(vectorizer__min_df=1)
+        cache.fitTransform(front, self.docs, self.y)
+        self.assertEqual(cache.getNumMisses(), 1)
+
+    def test_fitTransformPartialEntry(self):
+        # a run killed between writing the .pkl & .npz (or a bad .pkl) is
+        #   a miss, not a crash
+        cache = VectorizedDocCache(self.cacheDir)
+        front, rest = splitPipeline(self.getPipeline())
+        cache.fitTransform(front, self.docs, self.y)
+        pklFiles = [ f for f in os.listdir(self.cacheDir) if f.endswith('.pkl')]
+        self.assertEqual(len(pklFiles), 1)
+        pklFile = os.path.join(self.cacheDir, pklFiles[0])
+
+        for damage in ['remove', 'truncate']:
+            if damage == 'remove': os.remove(pklFile)
+            else: open(pklFile, 'wb').close()
+            cache = VectorizedDocCache(self.cacheDir)
+            front, rest = splitPipeline(self.getPipeline())
+            fitted, X = cache.fitTransform(front, self.docs, self.y)
+            self.assertIs(fitted, front)
+            self.assertEqual((cache.getNumHits(), cache.getNumMisses()), (0,1))
+            self.assertTrue(os.path.exists(pklFile))    # rewritten
+
+        cache = VectorizedDocCache(self.cacheDir)
+        cache.fitTransform(splitPipeline(self.getPipeline())[0], self.docs,
+                                                                        self.y)
+        self.assertEqual(cache.getNumHits(), 1)
+
+    def test_fitTransformY(self):
+        # a supervised front: its fit depends on y, not just the docs
+        from sklearn.pipeline import Pipeline
+        from sklearn.base import clone
+        from sklearn.feature_selection import SelectKBest, chi2
+        front = Pipeline( [
+                ('vectorizer', CountVectorizer()),
+                ('selector',   SelectKBest(chi2, k=2)),] )
+        y2 = [ 1 if i < 10 else 0 for i in range(20) ]
+        cache = VectorizedDocCache(self.cacheDir)
+        for y in [self.y, y2, np.array(y2)]:
+            fitted, X = cache.fitTransform(clone(front), self.docs, y)
+            expected = clone(front).fit_transform(self.docs, y)
+            self.assertEqual((X != expected).nnz, 0)
+        self.assertEqual((cache.getNumHits(), cache.getNumMisses()), (1, 2))
+
+    def test_transform(self):
+        model = self.getPipeline().fit(self.docs, self.y)
+        front, rest = splitPipeline(model)
+        cache = VectorizedDocCache(self.cacheDir)
+        for i in range(2):
+            X = cache.transform(front, self.docs[:5])
+            self.assertEqual(list(rest.predict(X)),
+                                        list(model.predict(self.docs[:5])))
+        self.assertEqual((cache.getNumHits(), cache.getNumMisses()), (1, 1))
+
+        X = cache.transform(front, self.docs[:6])
+        self.assertEqual(X.shape[0], 6)
+        self.assertEqual(cache.getNumMisses(), 2)
+
+        # keyed by the pickled fitted vectorizer: the same for each load of
+        #   the same model pkl (as in each predict.py run)
+        modelPkl = pickle.dumps(front)
+        for i in range(2):
+            cache = VectorizedDocCache(self.cacheDir)
+            cache.transform(pickle.loads(modelPkl), self.docs[:5])
+            self.assertEqual((cache.getNumHits(), cache.getNumMisses()),
+                                                                    (i, 1 - i))
+# end class VectorizedDocCache_tests
+######################################
+
+class CountingVectorizer(CountVectorizer):
+    """ CountVectorizer that counts its transform() calls """
+    numTransforms = 0
+    def transform(self, raw_documents):
+        CountingVectorizer.numTransforms += 1
+        return super().transform(raw_documents)
+
+class PredictWithConfidences_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = [ 'doc%d has has words %s %s' % (i,
+                        'yes' if i % 2 else 'no', 'maybe' if i % 3 else '')
+                                                        for i in range(30) ]
+        self.y = [ i % 2 for i in range(30) ]
+
+    def getModel(self, classifier):
+        from sklearn.pipeline import Pipeline
+        return Pipeline( [ ('vectorizer', CountingVectorizer()),
+                           ('classifier', classifier),] ).fit(self.docs, self.y)
+
+    def test_predictWithConfidences(self):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.neighbors import NearestCentroid
+        for classifier in [SGDClassifier(random_state=0),
+                            RandomForestClassifier(n_estimators=5,random_state=0)]:
+            for positiveClass in [0, 1]:
+                model = self.getModel(classifier)
+                CountingVectorizer.numTransforms = 0
+                preds, confs = predictWithConfidences(model, self.docs,
+                                                    positiveClass=positiveClass)
+                self.assertEqual(CountingVectorizer.numTransforms, 1)
+                self.assertIsInstance(preds, np.ndarray)
+                self.assertIsInstance(confs, np.ndarray)
+                self.assertEqual(preds.tolist(), model.predict(self.docs).tolist())
+                self.assertEqual(confs.tolist(), getConfidenceValues(model,
+                                    self.docs, positiveClass=positiveClass))
+
+        model = self.getModel(SGDClassifier(random_state=0))
+        preds, confs = predictWithConfidences(model, self.docs,
+                                                        doConfidences=False)
+        self.assertIsNone(confs)
+
+        # no confidences available
+        model = self.getModel(NearestCentroid())
+        preds, confs = predictWithConfidences(model, self.docs)
+        self.assertIsNone(confs)
+        self.assertEqual(preds.tolist(), model.predict(self.docs).tolist())
+
+        # not a Pipeline
+        X = CountVectorizer().fit_transform(self.docs)
+        classifier = SGDClassifier(random_state=0).fit(X, self.y)
+        preds, confs = predictWithConfidences(classifier, X)
+        self.assertEqual(confs.tolist(), getConfidenceValues(classifier, X))
+# end class PredictWithConfidences_tests
+######################################
+
+# the loop versions, to compare against
+def oldGetFalsePosNeg(y_true, y_predicted, sampleNames, positiveClass=1):
+    falsePositives = []
+    falseNegatives = []
+    for trueY, predY, name in zip(y_true, y_predicted, sampleNames):
+        predType = predictionType(trueY, predY, positiveClass=positiveClass)
+        if   predType == 'FP': falsePositives.append(name)
+        elif predType == 'FN': falseNegatives.append(name)
+    return falsePositives, falseNegatives
+
+class FixedProba(object):
+    """ classifier w/ predict_proba() that returns the samples """
+    def predict_proba(self, samples): return np.array(samples)
+
+class PredictionTypes_tests(unittest.TestCase):
+
+    def test_getPredictionTypes(self):
+        for positiveClass in [0, 1]:
+            y_true = [0, 0, 1, 1]
+            y_pred = [0, 1, 0, 1]
+            self.assertEqual(getPredictionTypes(y_true, y_pred,
+                                        positiveClass=positiveClass).tolist(),
+                [ predictionType(t, p, positiveClass=positiveClass)
+                                            for t, p in zip(y_true, y_pred) ])
+        self.assertEqual(getPredictionTypes(['yes', 'no'], ['no', 'no'],
+                                    positiveClass='yes').tolist(), ['FN','TN'])
+        self.assertEqual(getPredictionTypeCodes([], []).tolist(), [])
+
+    def test_getFalsePosNeg(self):
+        import random
+        random.seed(1)
+        y_true = [ random.randint(0,1) for i in range(200) ]
+        y_pred = np.array([ random.randint(0,1) for i in range(200) ])
+        names  = [ 'sample%d' % i for i in range(200) ]
+        for positiveClass in [0, 1]:
+            self.assertEqual(getFalsePosNeg(y_true, y_pred, names,
+                                                positiveClass=positiveClass),
+                            oldGetFalsePosNeg(y_true, y_pred, names,
+                                                positiveClass=positiveClass))
+        self.assertEqual(getFalsePosNeg([], [], []), ([], []))
+        self.assertEqual(getFalsePosNeg(['yes','no'], ['no','yes'], [(1,), 2],
+                                positiveClass='yes'), ([2], [(1,)]))
+
+    def test_getProbaConfidences(self):
+        probas = [[0.9, 0.1], [0.2, 0.8], [0.5, 0.5], [0.0, 1.0]]
+        self.assertEqual(getProbaConfidences(FixedProba(), probas,
+                                positiveClass=1), [-0.9, 0.8, -0.5, 1.0])
+        self.assertEqual(getProbaConfidences(FixedProba(), probas,
+                                positiveClass=0), [0.9, -0.8, -0.5, -1.0])
+# end class PredictionTypes_tests
+######################################
+
+class PartialFitPipeline_tests(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = [ 'mouse %s gene knockout %d' % (w, i % 7) for i, w in
+                    enumerate(['running', 'runs', 'jumped', 'jumps'] * 10) ]
+        self.y = [ i % 2 for i in range(len(self.docs)) ]
+        self.batches = [ (self.docs[i:i+8], self.y[i:i+8])
+                                        for i in range(0, len(self.docs), 8) ]
+
+    def test_sameAsManual(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.feature_extraction.text import HashingVectorizer
+        pipeline = Pipeline( [
+                ('stemmer',    StemmingPreprocessor()),
+                ('vectorizer', HashingVectorizer(n_features=2**10)),
+                ('classifier', SGDClassifier(random_state=0)), ] )
+        # two epochs, empty minibatches (e.g., all rejects) are skipped
+        empty = [ ([], []) ]
+        trained = partialFitPipeline(pipeline,
+                            empty + self.batches + empty + self.batches, [0, 1])
+        self.assertIs(trained, pipeline)
+
+        vectorizer = HashingVectorizer(n_features=2**10)
+        classifier = SGDClassifier(random_state=0)
+        for docs, y in self.batches * 2:
+            X = vectorizer.transform(stemDocuments(docs))
+            classifier.partial_fit(X, y, classes=[0, 1])
+        self.assertEqual(pipeline.named_steps['classifier'].coef_.tolist(),
+                                                    classifier.coef_.tolist())
+        self.assertEqual(pipeline.predict(self.docs).tolist(),
+            classifier.predict(vectorizer.transform(stemDocuments(self.docs))
+                                                                    ).tolist())
+
+    def test_notIncremental(self):
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.svm import LinearSVC
+        from sklearn.feature_extraction.text import HashingVectorizer
+        for pipeline in [
+                Pipeline([('vectorizer', CountVectorizer()),
+                          ('classifier', SGDClassifier()), ]),
+                Pipeline([('vectorizer', HashingVectorizer()),
+                          ('classifier', LinearSVC()), ]), ]:
+            self.assertRaises(ValueError, checkPartialFitPipeline, pipeline)
+            self.assertRaises(ValueError, partialFitPipeline, pipeline,
+                                                        self.batches, [0, 1])
+
+    def test_checkBeforeBatches(self):
+        # the pipeline is checked before reading any minibatches, and
+        #   errors reading them are not reported as a pipeline problem
+        from sklearn.pipeline import Pipeline
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.feature_extraction.text import HashingVectorizer
+        def badBatches():
+            yield self.batches[0]
+            raise IOError('bad sample file')
+        pipeline = Pipeline([('vectorizer', CountVectorizer()),
+                             ('classifier', SGDClassifier()), ])
+        self.assertRaises(ValueError, partialFitPipeline, pipeline,
+                                                        badBatches(), [0, 1])
+        pipeline = Pipeline([('vectorizer', HashingVectorizer()),
+                             ('classifier', SGDClassifier()), ])
+        self.assertEqual(len(checkPartialFitPipeline(pipeline)[0]), 1)
+        self.assertRaises(IOError, partialFitPipeline, pipeline,
+                                                        badBatches(), [0, 1])
+# end class PartialFitPipeline_tests
+######################################
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 
 import unittest
+import os
+import io
+import tempfile
+import shutil
 from MLtextUtils import *
 
 """
@@ -54,6 +58,22 @@ class TextTransformer_tests(unittest.TestCase):
         matches = t.getMatches()
         self.assertEqual(len(matches), 8)
 
+    def test_getMatchSpans(self):
+        t = TextTransformer(self.THEmappings)
+        text = "there are These things & these, and then the end"
+        spans = t.getMatchSpans(text)
+        self.assertEqual(spans, [('THESE', 10, 15), ('THESE', 25, 30),
+                                                            ('THE', 41, 44)])
+        self.assertEqual(t.getMatches(), [])    # spans aren't recorded
+
+    def test_innerGroups(self):
+        # mapping regexes w/ their own (named) groups
+        t = TextTransformer([
+            TextMapping('A', r'\b(?P<inner>x)(y)?\b', 'A_'),
+            TextMapping('B', r'\b((z)|w)\b', 'B_'),
+            ])
+        self.assertEqual(t.transformText('x xy z w q'), 'A_ A_ B_ B_ q')
+
     def test_resetMatches(self):
         t = TextTransformer(self.THEmappings)
         text = "there are These things & these & these, and then the end"
@@ -69,6 +89,178 @@ class TextTransformer_tests(unittest.TestCase):
 # end class TextTransformer_tests
 ######################################
 
+class CountsOnly_tests(unittest.TestCase):
+    def setUp(self):
+        self.text = "there are These things & these & these, and then the end"
+
+    def getMappings(self):
+        return [
+            TextMapping('THE', r'\b(?:the)\b', 'the_', context=5),
+            TextMapping('THESE', r'\b(?:these)\b', 'these_', context=5),
+        ]
+
+    def test_sameReport(self):
+        t1 = TextTransformer(self.getMappings())
+        t2 = TextTransformer(self.getMappings(), countsOnly=True)
+        for i in range(2):
+            self.assertEqual(t1.transformText(self.text),
+                                                t2.transformText(self.text))
+        self.assertEqual(t1.getReport(), t2.getReport())
+        self.assertEqual(t2.getMatches(), [])
+        self.assertEqual(t2.getMatchCounts().getNumMatches(), 8)
+        self.assertEqual(t1.getMatchCounts().getCounts(),
+                                        t2.getMatchCounts().getCounts())
+
+        t2.resetMatches()
+        self.assertEqual(t2.getMatchCounts().getNumMatches(), 0)
+
+    def test_maxReportKeys(self):
+        t = TextTransformer(self.getMappings(), countsOnly=True,
+                                                            maxReportKeys=1)
+        t.transformText(self.text)
+        t.transformText(self.text)
+        counts = t.getMatchCounts()
+        self.assertEqual(counts.getNumMatches(), 8)
+        # THESE: "These" & "these" keys, only 1 kept per mapping
+        self.assertEqual(len(counts.getCounts()), 2)
+        self.assertEqual(counts.getOverflow(), {'THESE': 4})
+        report = t.getReport()
+        self.assertIn('# THESE: 4 more matches not itemized', report)
+
+    def test_sharedMappings(self):
+        # a countsOnly transformer doesn't change mappings shared w/ others
+        mappings = self.getMappings()
+        t1 = TextTransformer(mappings)
+        t2 = TextTransformer(mappings, countsOnly=True, maxReportKeys=1)
+        self.assertFalse(any([m.countsOnly for m in mappings]))
+        self.assertTrue(all([m.countsOnly for m in t2.mappings]))
+        t1.transformText(self.text)
+        t2.transformText(self.text)
+        self.assertEqual(len(t1.getMatches()), 4)
+        self.assertEqual(t2.getMatchCounts().getNumMatches(), 4)
+        self.assertEqual(t2.getMatchCounts().getOverflow(), {'THESE': 2})
+
+        t3 = TextTransformer(mappings)          # same mode: not copied
+        self.assertIs(t3.mappings[0], mappings[0])
+
+    def test_merge(self):
+        c1 = MatchCounts()
+        c1.add(('a', 'x', '', '', 'y'))
+        c2 = MatchCounts(maxKeys=1)
+        c2.add(('a', 'x', '', '', 'y'), 2)
+        c2.add(('b', 'z', '', '', 'y'))
+        c1.merge(c2)
+        self.assertEqual(c1.getCounts(), {('a', 'x', '', '', 'y'): 3})
+        self.assertEqual(c1.getOverflow(), {'b': 1})
+        self.assertEqual(c1.getNumMatches(), 4)
+
+# end class CountsOnly_tests
+######################################
+
+def upperCase(s): return s.upper()      # picklable replacement function
+
+class StatelessTransform_tests(unittest.TestCase):
+    def getMappings(self):
+        return [
+            TextMapping('THE', r'\b(?:the)\b', 'the_', context=5),
+            TextMappingFromStrings('STRS', ['these', 'end'], upperCase,
+                                                                context=5),
+        ]
+
+    def setUp(self):
+        self.texts = ["there are These things & these & these, and then the end",
+                      "no matches", "", "the end. The End"] * 5
+
+    def test_sameAsTransformText(self):
+        t1 = TextTransformer(self.getMappings())
+        t2 = TextTransformer(self.getMappings())
+        counts = MatchCounts()
+        for text in self.texts:
+            transformed, c = t2.transformTextWithCounts(text)
+            self.assertEqual(transformed, t1.transformText(text))
+            counts.merge(c)
+        self.assertEqual(t2.getMatches(), [])       # no state changed
+        self.assertEqual(t1.getReport(), t2.getReport(counts=counts))
+
+    def test_threads(self):
+        from multiprocessing.pool import ThreadPool
+        t = TextTransformer(self.getMappings())
+        with ThreadPool(4) as pool:
+            results = pool.map(t.transformTextWithCounts, self.texts)
+        counts = MatchCounts()
+        for transformed, c in results:
+            counts.merge(c)
+
+        t1 = TextTransformer(self.getMappings())
+        self.assertEqual([r[0] for r in results],
+                                [t1.transformText(x) for x in self.texts])
+        self.assertEqual(t1.getReport(), t.getReport(counts=counts))
+
+    def test_pickle(self):
+        import pickle
+        t = TextTransformer(self.getMappings())
+        t.transformText(self.texts[0])
+        t2 = pickle.loads(pickle.dumps(t))
+        self.assertEqual(t2.getMatches(), [])       # matches not pickled
+        self.assertEqual(t2.transformText(self.texts[0]),
+                                            t.transformText(self.texts[0]))
+
+        t = TextTransformer(self.getMappings(), countsOnly=True)
+        t.transformText(self.texts[0])
+        t2 = pickle.loads(pickle.dumps(t))
+        self.assertEqual(t2.getMatchCounts().getNumMatches(), 0)
+        t2.transformText(self.texts[0])
+        self.assertEqual(t2.getMatchCounts().getNumMatches(), 5)
+
+# end class StatelessTransform_tests
+######################################
+
+class TransformStream_tests(unittest.TestCase):
+    def getMappings(self):
+        return [
+            TextMapping('THE', r'\b(?:the)\b', 'the_', context=5),
+            TextMapping('GENE', r'\bgene\s+x\b', 'GENEX', context=3),
+            TextMappingFromStrings('STRS', ['these', 'end'], 'S', context=2),
+            TextMappingFromFile('FILE', io.StringIO('two  words\n'), 'W'),
+        ]
+
+    def assertSameAsTransformText(self, text, chunkSize, overlap=20):
+        t1 = TextTransformer(self.getMappings())
+        t2 = TextTransformer(self.getMappings())
+        outFp = io.StringIO()
+        t2.transformStream(io.StringIO(text), outFp, chunkSize=chunkSize,
+                                                            overlap=overlap)
+        self.assertEqual(outFp.getvalue(), t1.transformText(text))
+        self.assertEqual([m.__dict__ for m in t1.getMatches()],
+                         [m.__dict__ for m in t2.getMatches()])
+
+    def test_chunkBoundaries(self):
+        text = "there are These things & these, and then the end. " \
+                "gene   x and two\n words; theend the\tend gene x"
+        for chunkSize in [1, 2, 3, 5, 7, 16, 1000]:
+            self.assertSameAsTransformText(text, chunkSize)
+        self.assertSameAsTransformText('', 3)
+        self.assertSameAsTransformText('the', 1)
+        self.assertSameAsTransformText('no matches at all', 4)
+
+    def test_files(self):
+        tmpDir = tempfile.mkdtemp()
+        inFile = os.path.join(tmpDir, 'transformStreamTestIn.txt')
+        outFile = os.path.join(tmpDir, 'transformStreamTestOut.txt')
+        with open(inFile, 'w') as fp:
+            fp.write("the end\n" * 100)
+        try:
+            t = TextTransformer(self.getMappings())
+            t.transformStream(inFile, outFile, chunkSize=64)
+            with open(outFile, 'r') as fp:
+                self.assertEqual(fp.read(), "the_ S\n" * 100)
+            self.assertEqual(t.getMatches()[-1].start, 8*99 + 4)
+        finally:
+            shutil.rmtree(tmpDir)
+
+# end class TransformStream_tests
+######################################
+
 class HelperFunction_tests(unittest.TestCase):
 
     def test_escAndWordBoundaries(self):
@@ -97,6 +289,41 @@ class HelperFunction_tests(unittest.TestCase):
 # end class TextMappingFromStrings_tests
 ######################################
 
+class TextPreprocessor_tests(unittest.TestCase):
+    """ the fast paths should give the same results as the plain regexes """
+    def setUp(self):
+        self.texts = ['', 'plain ascii text, w/ punct_uation: 3.5-fold!\n',
+            'see http://foo.org/x and WWW.bar.com (DOI:10.1/abc) done',
+            'Dotless do\u0131:123 and Do\u0130:456 and https://x',
+            'non-ascii \u00b5m caf\u00e9 \u03b1-actin \ud800 \u2013 end',
+            'na\u00efve\tdoing \u00c9COLE http\u017f://x \u212aelvin',
+            ]
+
+    def test_removeNonAscii(self):
+        for t in self.texts:
+            self.assertEqual(removeNonAscii(t), nonAsciiRE.sub(' ', t))
+        self.assertEqual(removeNonAsciiBatch(self.texts),
+                    [ nonAsciiRE.sub(' ', t) for t in self.texts ])
+
+    def test_removeURLsLower(self):
+        for t in self.texts:
+            self.assertEqual(removeURLsLower(t),
+                                    ' '.join(urls_re.split(t)).lower())
+        self.assertEqual(removeURLsLower('see doi:10.1/abc'), 'see  ')
+        self.assertEqual(removeURLsLowerBatch(self.texts),
+                                    [ removeURLsLower(t) for t in self.texts ])
+
+    def test_tokenPerLine(self):
+        for t in self.texts:
+            self.assertEqual(tokenPerLine(t),
+                '\n'.join([m.group() for m in token_re.finditer(t)]) + '\n')
+        self.assertEqual(tokenPerLine('a-b c_d'), 'a\nb\nc_d\n')
+        self.assertEqual(tokenPerLineBatch(self.texts),
+                                    [ tokenPerLine(t) for t in self.texts ])
+
+# end class TextPreprocessor_tests
+######################################
+
 class TextMappingFromStrings_tests(unittest.TestCase):
 
     def test_FromStringsBasic(self):
@@ -113,9 +340,53 @@ class TextMappingFromStrings_tests(unittest.TestCase):
         self.assertEqual(transformed, expect)
         #print('\n' + t.getsReport())
 
+    def test_FromStringsTrieRegex(self):
+        strings = [r'abc', r'word (in) parens', 'abcd', 'ab-c', 'ab']
+        tm = TextMappingFromStrings('myname', strings, 'foo', trieRegex=True)
+        flat = TextMappingFromStrings('myname', strings, 'foo')
+        self.assertNotEqual(tm.regex, flat.regex)
+
+        text = 'start abc, abcdef. Word (in) parens. ab-c ab-d abcd end'
+        for t in [ TextTransformer([tm], useAhoCorasick=False),
+                   TextTransformer([flat], useAhoCorasick=False), ]:
+            expect = 'start foo, abcdef. foo. foo foo-d foo end'
+            self.assertEqual(t.transformText(text), expect)
+
 # end class TextMappingFromStrings_tests
 ######################################
 
+class BuildTrieRegex_tests(unittest.TestCase):
+
+    def test_prefixes(self):
+        regex = buildTrieRegex(['gene', 'genes', 'genome'])
+        self.assertEqual(regex, r'\b(?:gen(?:e(?:s)??|ome))\b')
+
+    def test_orderPreserved(self):
+        # when a prefix of another string matches, the 1st listed one wins
+        text = 'ab-c'
+        for strings in [['ab', 'ab-c'], ['ab-c', 'ab'], ['ab-q', 'ab', 'ab-c']]:
+            flat = '|'.join([escAndWordBoundaries(s) for s in strings])
+            trie = buildTrieRegex(strings)
+            self.assertEqual(re.match(trie, text).group(),
+                                                re.match(flat, text).group())
+
+    def test_squeezeSpaces(self):
+        regex = buildTrieRegex(['two  words', 'two'], squeezeSpaces=True)
+        self.assertEqual(regex, r'\b(?:two(?:\s+words)?)\b')
+        r = re.compile(regex, re.IGNORECASE)
+        self.assertEqual(r.search('a Two \n words').group(), 'Two \n words')
+
+    def test_ignoreCase(self):
+        strings = ['Ab', 'ab', 'aBc']
+        trie = re.compile(buildTrieRegex(strings))
+        self.assertIsNone(trie.search('aB'))
+        self.assertEqual(trie.search('x ab').group(), 'ab')
+        trie = re.compile(buildTrieRegex(strings), re.IGNORECASE)
+        self.assertEqual(trie.search('x ABC').group(), 'ABC')
+
+# end class BuildTrieRegex_tests
+######################################
+
 class TextMappingFromFile_tests(unittest.TestCase):
 
     def setUp(self):
@@ -168,5 +439,137 @@ class TextMappingFromFile_tests(unittest.TestCase):
 # end class TextMappingFromFile_tests
 ######################################
 
+class AhoCorasick_tests(unittest.TestCase):
+
+    def test_findAll(self):
+        ac = AhoCorasick()
+        for i, s in enumerate(['gene', 'genes', 'genome', 'nome']):
+            ac.addString(s, i)
+        ac.build()
+        found = ac.findAll('Genes and genomes, gene_x and gene.')
+        self.assertEqual(found, [(0, 5, 1), (30, 34, 0)])
+
+    def test_noWordBoundaries(self):
+        ac = AhoCorasick(wordBoundaries=False, ignoreCase=False)
+        for i, s in enumerate(['gene', 'genes', 'nome']):
+            ac.addString(s, i)
+        found = ac.findAll('Genes genomes')
+        self.assertEqual(found, [(8, 12, 2)])
+
+    def test_squeezeSpaces(self):
+        ac = AhoCorasick(squeezeSpaces=True)
+        ac.addString(' two  words ', 'tw')
+        text = 'one two \n\t Words three two words'
+        found = ac.findAll(text)
+        self.assertEqual(len(found), 2)
+        start, end, value = found[0]
+        self.assertEqual(text[start:end], 'two \n\t Words')
+        start, end, value = found[1]
+        self.assertEqual(text[start:end], 'two words')
+
+    def test_firstValueWins(self):
+        ac = AhoCorasick()
+        ac.addString('abc', 0)
+        ac.addString('ABC', 1)          # same string when ignoring case
+        self.assertEqual(ac.getNumStrings(), 1)
+        self.assertEqual(ac.findAll('x abc'), [(2, 5, 0)])
+
+    def test_findAllFromPos(self):
+        ac = AhoCorasick()
+        ac.addString('gene', 0)
+        ac.addString('two words', 1)
+        text = 'gene xgene gene   two\n words'
+        self.assertEqual(ac.findAll(text, 6), [(11, 15, 0)])   # not 'xgene'
+        self.assertEqual(ac.findAll(text, 11), [(11, 15, 0)])
+        self.assertEqual(ac.findAll(text, 12), [])
+        ac = AhoCorasick(squeezeSpaces=True)
+        ac.addString('two words', 1)
+        self.assertEqual(ac.findAll(text, 15), [(18, 28, 1)])
+        self.assertEqual(ac.findAll(text, 15), [ f for f in ac.findAll(text)
+                                                        if f[0] >= 15 ])
+
+# end class AhoCorasick_tests
+######################################
+
+class TextTransformerAhoCorasick_tests(unittest.TestCase):
+    """ TextTransformers w/ and w/o AhoCorasick should be indistinguishable
+        except for the case folding & empty string differences pinned down in
+        test_differences()
+    """
+    def getMappings(self):
+        return [
+            TextMapping('aRegex', r'\bgene\s+x\b', 'GENEX', context=4),
+            TextMappingFromStrings('strs', ['gene', 'gene x', 'a.b', 'x-'],
+                                    lambda x: x.upper(), context=4),
+            TextMapping('bRegex', r'\bgen\w*', 'GEN', context=4),
+            TextMappingFromFile('file', io.StringIO('two words\ngene x y\n'),
+                                    'FILE', context=4),
+            ]
+
+    def assertSameTransform(self, text, reFlags=re.IGNORECASE):
+        t1 = TextTransformer(self.getMappings(), reFlags=reFlags,
+                                                        useAhoCorasick=True)
+        t2 = TextTransformer(self.getMappings(), reFlags=reFlags)
+        self.assertEqual(t1.transformText(text), t2.transformText(text))
+        self.assertEqual(t1.getReport(), t2.getReport())
+
+    def test_bigRegex(self):
+        t1 = TextTransformer(self.getMappings(), useAhoCorasick=True)
+        t2 = TextTransformer(self.getMappings())
+        self.assertEqual(t1.getBigRegex(), t2.getBigRegex())
+        self.assertIn('strs', t1.getBigRegex())
+        self.assertEqual(t1.getBigRegex(), t1.getBigRe().pattern)
+
+        t = TextTransformer(self.getMappings()[1:2],    # only string mapping
+                                                        useAhoCorasick=True)
+        self.assertEqual(t.transformText('a gene'), 'a GENE')
+        self.assertEqual(t.getBigRe().pattern, t.getBigRegex())
+
+    def test_differences(self):
+        def transform(strings, text, useAhoCorasick):
+            m = TextMappingFromStrings('strs', strings, 'X')
+            t = TextTransformer([m], useAhoCorasick=useAhoCorasick)
+            return t.transformText(text)
+
+        # re.IGNORECASE folds long s to s, str.lower() doesn't
+        self.assertEqual(transform(['s'], '\u017f S s', False), 'X X X')
+        self.assertEqual(transform(['s'], '\u017f S s', True),  '\u017f X X')
+        # 'I' w/ dot lower cases to 2 chars, so only matches itself
+        self.assertEqual(transform(['\u0130'], '\u0130 i I', False), 'X X X')
+        self.assertEqual(transform(['\u0130'], '\u0130 i I', True),
+                                                            'X i I')
+        # empty strings match at each word boundary, unless AhoCorasick
+        self.assertEqual(transform(['', 'ab'], 'x ab', False), 'XxX XXX')
+        self.assertEqual(transform(['', 'ab'], 'x ab', True),  'x X')
+
+    def test_sameAsRegex(self):
+        texts = ['', 'no matches here',
+            'Gene x y and gene  x, gene xy, genes, a.b a.bc x- x-y',
+            'two\n words, TWO words. gene\tx y gene x',
+            'gene x-',
+            ]
+        for text in texts:
+            self.assertSameTransform(text)
+            self.assertSameTransform(text, reFlags=0)
+
+    def test_mappingOrder(self):
+        # regex mapping listed first wins at the same start position
+        t = TextTransformer(self.getMappings(), useAhoCorasick=True)
+        self.assertEqual(t.transformText('a gene x b'), 'a GENEX b')
+        # leftmost match wins regardless of mapping order
+        self.assertEqual(t.transformText('generic gene'), 'GEN GENE')
+
+    def test_overriddenStr2regex(self):
+        class MyMapping (TextMappingFromStrings):
+            def _str2regex(self, s): return re.escape(s)  # no \b's
+
+        m = MyMapping('mine', ['abc'], 'X')
+        self.assertIsNone(m.getStringMatchMode())
+        t = TextTransformer([m], useAhoCorasick=True)
+        self.assertEqual(t.transformText('abcd'), 'Xd')
+
+# end class TextTransformerAhoCorasick_tests
+######################################
+
 if __name__ == '__main__':
     unittest.main()
@@ -188,6 +188,22 @@ class Predict_tests(unittest.TestCase):
         retCode, stout, sterr = runShCommand(cmd)
         reportCmdDetails(cmd, retCode, stout, sterr)
         self.assertEqual(retCode, 0)
+
+    def test_stemCache(self):
+        STEMCACHEFILE = tmpFile('stemCache.pkl')
+        if os.path.exists(STEMCACHEFILE): os.remove(STEMCACHEFILE)
+        self.trainModel()
+
+        # 1st run writes the stem cache file, 2nd run loads it
+        cmd = '%s -m %s --stemcache %s %s %s > %s' \
+        % (self.pgm, self.MODELFILE, STEMCACHEFILE,
+                    SAMPLEDATALIBPARAM, self.SAMPLEFILE, self.PREDICTIONS )
+        for i in range(2):
+            retCode, stout, sterr = runShCommand(cmd)
+            reportCmdDetails(cmd, retCode, stout, sterr)
+            self.assertEqual(retCode, 0)
+            self.assertTrue(os.path.exists(STEMCACHEFILE))
+        self.assertIn('Loading stem cache', sterr)
 # end class Predict_tests --------------------------------------------
 
 class PreprocessSamples_tests(unittest.TestCase):
@@ -254,8 +270,47 @@ class TrainModel_tests(unittest.TestCase):
         retCode, stout, sterr = runShCommand(cmd)
         reportCmdDetails(cmd, retCode, stout, sterr)
         self.assertEqual(retCode, 0)
+
+    def test_stream(self):
+        # two input files, small minibatches, a few epochs
+        cmd = '%s --stream --batchsize 2 --epochs 3 --seed 1 -m %s -o %s -f %s %s %s %s' \
+        % (self.pgm, 'testStreamPipeline.py', self.OUTPUTPKLFILE,
+            self.FEATUREFILE, SAMPLEDATALIBPARAM, self.SAMPLEFILE,
+            self.SAMPLEFILE, )
+
+        retCode, stout, sterr = runShCommand(cmd)
+        reportCmdDetails(cmd, retCode, stout, sterr)
+        self.assertEqual(retCode, 0)
 # end class TrainModel_tests --------------------------------------------
 
+class CompactModel_tests(unittest.TestCase):
+    pgm = 'compactModel.py'
+
+    def setUp(self):
+        self.PIPELINEFILE = 'testLinearPipeline.py'
+        self.SAMPLEFILE   = tmpFile('sampleFile.txt')
+        self.MODELFILE    = tmpFile('modelForCompact.pkl')
+        self.COMPACTFILE  = tmpFile('compactModel.pkl')
+        populateSampleSet()
+        sampleSet.write(self.SAMPLEFILE)
+
+    def test_withSampleDataLib(self):
+        cmd = 'trainModel.py -m %s -o %s %s %s' \
+        % (self.PIPELINEFILE, self.MODELFILE, SAMPLEDATALIBPARAM,
+            self.SAMPLEFILE, )
+        retCode, stout, sterr = runShCommand(cmd)
+        reportCmdDetails(cmd, retCode, stout, sterr)
+        self.assertEqual(retCode, 0)
+
+        cmd = '%s --compactvocab --samples %s %s %s %s' \
+        % (self.pgm, self.SAMPLEFILE, SAMPLEDATALIBPARAM, self.MODELFILE,
+            self.COMPACTFILE, )
+        retCode, stout, sterr = runShCommand(cmd)
+        reportCmdDetails(cmd, retCode, stout, sterr)
+        self.assertEqual(retCode, 0)
+        self.assertIn('10 of 10 the same', stout)
+# end class CompactModel_tests --------------------------------------------
+
 class TuningScript_tests(unittest.TestCase):
     pgm = './tuningScript.py'
        